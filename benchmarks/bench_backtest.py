@@ -0,0 +1,60 @@
+"""
+Benchmark: phase_1 backtest throughput from 1e3 to 1e7 rows.
+
+For each size the deterministic series from generate_sample_prices is run
+through the same steps as phase_1_backtesting/main.py: rolling 10/30 means,
+generate_signals and run_backtest. Starting cash is large enough that
+every signal can fill, so the fill loop is exercised too. Data generation
+is not timed.
+
+    python benchmarks/bench_backtest.py [--max-rows 10000000]
+"""
+import argparse
+
+from common import best_seconds, sample_prices
+
+from backtest import generate_signals, rolling_mean, run_backtest  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STARTING_CASH = 1e12
+
+
+def _pipeline(prices):
+    short_ma = rolling_mean(prices, 10)[29:]
+    long_ma = rolling_mean(prices, 30)[29:]
+    signals = generate_signals(short_ma, long_ma)
+    return run_backtest(prices[29:], signals, starting_cash=STARTING_CASH)
+
+
+def run(max_rows=1_000_000):
+    results = {"rows_per_sec": {}, "backtest_only_rows_per_sec": {}, "fills": {}}
+    for n in SIZES:
+        if n > max_rows:
+            break
+        prices = sample_prices(n)
+        repeat = 3 if n <= 1_000_000 else 1
+        results["rows_per_sec"][str(n)] = n / best_seconds(lambda: _pipeline(prices), repeat)
+
+        short_ma = rolling_mean(prices, 10)[29:]
+        long_ma = rolling_mean(prices, 30)[29:]
+        signals = generate_signals(short_ma, long_ma)
+        rows = len(signals)
+        results["backtest_only_rows_per_sec"][str(n)] = rows / best_seconds(
+            lambda: run_backtest(prices[29:], signals, starting_cash=STARTING_CASH), repeat)
+        results["fills"][str(n)] = int(len(_pipeline(prices).trades))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-rows", type=int, default=1_000_000, help="largest series size to run")
+    args = parser.parse_args()
+
+    results = run(args.max_rows)
+    print(f"{'rows':>10}{'pipeline rows/s':>18}{'backtest rows/s':>18}{'fills':>10}")
+    for n, rate in results["rows_per_sec"].items():
+        print(f"{n:>10}{rate:>18,.0f}{results['backtest_only_rows_per_sec'][n]:>18,.0f}{results['fills'][n]:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark: per-tick cost of the ingest path, before and after Tick slots.
+
+"before" is the previous path, reproduced here: json.loads the whole trade
+message, float() the price, build a dataclass Tick stamped with
+datetime.now().strftime(...). "after" is scraper.decode_trade, which reads
+only the price and trade time into a slots Tick whose timestamp is
+formatted lazily. Both are timed for decoding alone and end to end through
+a TradingEngine (MovingAverageStrategy + dry-run ExecutionEngine).
+
+    python benchmarks/bench_ingest.py [--number 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+from dataclasses import dataclass
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "trading_app"))
+
+from engine import TradingEngine  # noqa: E402
+from execution import ExecutionEngine  # noqa: E402
+from models import TIMESTAMP_FORMAT, Tick  # noqa: E402
+from scraper import decode_trade  # noqa: E402
+from strategy import MovingAverageStrategy  # noqa: E402
+
+MESSAGE = json.dumps({
+    "stream": "btcusdt@trade",
+    "data": {
+        "e": "trade", "E": 1700000000123, "s": "BTCUSDT", "t": 3123456789,
+        "p": "43123.45000000", "q": "0.00123000", "T": 1700000000122, "m": True, "M": True,
+    },
+}, separators=(",", ":"))
+
+
+@dataclass
+class LegacyTick:
+    price: float
+    timestamp: datetime
+
+
+def legacy_decode(message):
+    data = json.loads(message)["data"]
+    return LegacyTick(price=float(data["p"]), timestamp=datetime.now().strftime(TIMESTAMP_FORMAT))
+
+
+def new_decode(message):
+    return decode_trade(message, time.time_ns())
+
+
+def per_call_ns(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+def _engine():
+    return TradingEngine(MovingAverageStrategy(2, 50), ExecutionEngine())
+
+
+def run(number=100000):
+    legacy_engine = _engine()
+    engine = _engine()
+
+    def legacy_tick():
+        tick = legacy_decode(MESSAGE)
+        signal = legacy_engine.strategy.on_tick(tick)
+        legacy_engine.execution.on_signal(signal, tick)
+
+    def new_tick():
+        engine.on_tick(new_decode(MESSAGE))
+
+    return {
+        "decode_ns": {
+            "before": per_call_ns(lambda: legacy_decode(MESSAGE), number),
+            "after": per_call_ns(lambda: new_decode(MESSAGE), number),
+        },
+        "end_to_end_ns": {
+            "before": per_call_ns(legacy_tick, number),
+            "after": per_call_ns(new_tick, number),
+        },
+        "tick_bytes": {
+            "before": sys.getsizeof(legacy_decode(MESSAGE)) + sys.getsizeof(legacy_decode(MESSAGE).__dict__),
+            "after": sys.getsizeof(Tick(1.0, 1, 1)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=100000, help="calls per timing run")
+    args = parser.parse_args()
+
+    results = run(args.number)
+    print(f"{'':20}{'before':>12}{'after':>12}")
+    for name, values in results.items():
+        print(f"{name:20}{values['before']:>12.1f}{values['after']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
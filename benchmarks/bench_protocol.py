@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: JSON vs binary encoding for Python <-> C++ messages.
+
+Measures encode cost for signals (what OrderGateway sends), decode cost for
+confirmations (what cpp_confirmation_listener receives) and bytes per message.
+
+    python benchmarks/bench_protocol.py [--number 200000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "trading_app"))
+
+from protocol import decode_confirmation, encode_confirmation, encode_order  # noqa: E402
+
+ORDER = {
+    "id": 123456,
+    "time": "2024-01-01 12:34:56",
+    "ts_ns": time.time_ns(),
+    "action": "SELL",
+    "price": 42123.45,
+}
+
+JSON_CONFIRMATION = json.dumps({
+    "action": "SELL",
+    "price": 42123.45,
+    "time": "2024-01-01 12:34:56",
+    "position": 0,
+    "total_pnl": 1234.56,
+    "pnl": 12.34,
+}).encode()
+
+BINARY_CONFIRMATION = encode_confirmation("SELL", 42123.45, ORDER["ts_ns"], ORDER["id"], 0, 12.34, 1234.56)
+
+
+def per_call_ns(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+def run(number=200000):
+    json_signal = json.dumps(ORDER).encode()
+    binary_signal = encode_order(ORDER)
+    binary_view = memoryview(BINARY_CONFIRMATION)
+
+    return {
+        "signal_encode_ns": {
+            "json": per_call_ns(lambda: json.dumps(ORDER).encode(), number),
+            "binary": per_call_ns(lambda: encode_order(ORDER), number),
+        },
+        "confirmation_decode_ns": {
+            "json": per_call_ns(lambda: json.loads(JSON_CONFIRMATION), number),
+            "binary": per_call_ns(lambda: decode_confirmation(binary_view), number),
+        },
+        "signal_bytes": {"json": len(json_signal), "binary": len(binary_signal)},
+        "confirmation_bytes": {"json": len(JSON_CONFIRMATION), "binary": len(BINARY_CONFIRMATION)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200000, help="calls per timing run")
+    args = parser.parse_args()
+
+    results = run(args.number)
+    print(f"{'':28}{'json':>12}{'binary':>12}")
+    for name, values in results.items():
+        print(f"{name:28}{values['json']:>12.1f}{values['binary']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
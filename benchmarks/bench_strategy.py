@@ -0,0 +1,122 @@
+"""
+Micro-benchmark: strategy, execution and engine cost per tick.
+
+Feeds the same deterministic price series (generate_sample_prices, fixed
+seed) through MovingAverageStrategy.on_tick at several window sizes,
+ExecutionEngine.on_signal, TradingEngine.on_price / on_ticks (dry run,
+with and without latency metrics), and N strategy variants run as N
+TradingEngines vs one MultiStrategyEngine on shared indicators.
+
+    python benchmarks/bench_strategy.py [--ticks 200000]
+"""
+import argparse
+import time
+
+from common import best_seconds, sample_prices
+
+from engine import MultiStrategyEngine, TradingEngine  # noqa: E402
+from execution import ExecutionEngine  # noqa: E402
+from metrics import PipelineMetrics  # noqa: E402
+from models import Signal, Tick  # noqa: E402
+from strategy import MovingAverageStrategy  # noqa: E402
+
+WINDOWS = ((2, 5), (10, 50), (50, 200), (200, 1000))
+
+# Variants drawn from 3 short x 2 long windows and 2 RSI periods (cooldowns vary freely)
+VARIANT_COUNTS = (1, 8, 32)
+
+
+def _variants(n):
+    return [
+        {"short_window": (2, 5, 10)[i % 3], "long_window": (20, 50)[i // 3 % 2],
+         "rsi_period": (14, 21)[i // 6 % 2], "cooldown_ticks": i // 12}
+        for i in range(n)
+    ]
+
+
+def _ticks(n):
+    return [Tick(float(price), 0, 0) for price in sample_prices(n)]
+
+
+def _ns_per_tick(fn, n):
+    return best_seconds(fn) / n * 1e9
+
+
+def run(ticks=200000):
+    data = _ticks(ticks)
+    results = {"strategy_on_tick_ns": {}}
+
+    for short, long in WINDOWS:
+        def feed():
+            on_tick = MovingAverageStrategy(short, long).on_tick
+            for tick in data:
+                on_tick(tick)
+        results["strategy_on_tick_ns"][f"{short}_{long}"] = _ns_per_tick(feed, ticks)
+
+    signals = [Signal.BUY, Signal.HOLD, Signal.SELL, Signal.HOLD] * (ticks // 4)
+
+    def execute():
+        on_signal = ExecutionEngine().on_signal
+        for signal, tick in zip(signals, data):
+            on_signal(signal, tick)
+    results["execution_on_signal_ns"] = _ns_per_tick(execute, len(signals))
+
+    prices = [tick.price for tick in data]
+
+    def on_price():
+        engine = TradingEngine(MovingAverageStrategy(10, 50), ExecutionEngine())
+        for price in prices:
+            engine.on_price(price)
+
+    def on_ticks(metrics=None):
+        engine = TradingEngine(MovingAverageStrategy(10, 50), ExecutionEngine(), metrics=metrics)
+        for i in range(0, ticks, 1000):
+            engine.on_ticks(data[i:i + 1000])
+
+    results["engine_ticks_per_sec"] = {
+        "on_price": ticks / best_seconds(on_price),
+        "on_ticks": ticks / best_seconds(on_ticks),
+        "on_ticks_metrics": ticks / best_seconds(lambda: on_ticks(PipelineMetrics())),
+    }
+
+    results["variants_ns_per_tick"] = {}
+    for count in VARIANT_COUNTS:
+        variants = _variants(count)
+
+        def separate():
+            engines = [TradingEngine(MovingAverageStrategy(**params), ExecutionEngine()) for params in variants]
+            for engine in engines:
+                engine.on_ticks(data)
+
+        def shared():
+            engine = MultiStrategyEngine()
+            for i, params in enumerate(variants):
+                engine.add(str(i), MovingAverageStrategy(**params), ExecutionEngine())
+            engine.on_ticks(data)
+
+        results["variants_ns_per_tick"][str(count)] = {
+            "separate": _ns_per_tick(separate, ticks),
+            "shared": _ns_per_tick(shared, ticks),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ticks", type=int, default=200000, help="ticks per timing run")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run(args.ticks)
+    for short_long, ns in results["strategy_on_tick_ns"].items():
+        print(f"strategy {short_long:>10} {ns:>10.1f} ns/tick")
+    print(f"execution on_signal  {results['execution_on_signal_ns']:>10.1f} ns/tick")
+    for name, rate in results["engine_ticks_per_sec"].items():
+        print(f"engine {name:<16} {rate:>12,.0f} ticks/sec")
+    for count, timings in results["variants_ns_per_tick"].items():
+        print(f"{count:>3} variants  separate {timings['separate']:>10.1f}  shared {timings['shared']:>10.1f} ns/tick")
+    print(f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: signal -> confirmation round trips over ZeroMQ.
+
+An in-process stand-in for the C++ engine (trading_app/cpp_standin.py)
+answers on real TCP loopback sockets, so this measures the socket hops
+plus both codecs, without a C++ build. Reports ping-pong round-trip
+latency (one order in flight) and pipelined throughput (all orders sent
+before confirmations are read) for the binary and JSON wire formats.
+
+    python benchmarks/bench_zmq.py [--orders 20000]
+"""
+import argparse
+import json
+import time
+
+import zmq
+
+from common import ROOT  # noqa: F401  (sets up import paths)
+
+from cpp_standin import CppStandIn  # noqa: E402
+from metrics import Histogram  # noqa: E402
+from protocol import decode_confirmation, encode_signal  # noqa: E402
+
+SIGNAL_PORT = 25555
+CONFIRMATION_PORT = 25556
+
+
+def _signals(n, wire_format):
+    """Alternating BUY/SELL so the stand-in fills (and confirms) every one."""
+    signals = []
+    for seq in range(1, n + 1):
+        action = "BUY" if seq % 2 else "SELL"
+        price = 42000.0 + seq % 100
+        if wire_format == "binary":
+            signals.append(encode_signal(action, price, time.time_ns(), seq))
+        else:
+            signals.append(json.dumps({"id": seq, "time": "2024-01-01 00:00:00", "action": action,
+                                       "price": price}).encode())
+    return signals
+
+
+def _measure(wire_format, orders, signal_port, confirmation_port):
+    ctx = zmq.Context()
+    pull = ctx.socket(zmq.PULL)
+    pull.bind(f"tcp://127.0.0.1:{confirmation_port}")
+    push = ctx.socket(zmq.PUSH)
+    push.setsockopt(zmq.LINGER, 0)
+    push.connect(f"tcp://127.0.0.1:{signal_port}")
+
+    standin = CppStandIn(f"tcp://127.0.0.1:{signal_port}", f"tcp://127.0.0.1:{confirmation_port}")
+    try:
+        with standin:
+            # Warm up the connection
+            for frame in _signals(2, wire_format):
+                push.send(frame)
+                decode_confirmation(pull.recv())
+
+            histogram = Histogram("round_trip", "")
+            clock = time.perf_counter_ns
+            for frame in _signals(orders, wire_format):
+                start = clock()
+                push.send(frame)
+                decode_confirmation(pull.recv(copy=False).buffer)
+                histogram.record(clock() - start)
+
+            frames = _signals(orders, wire_format)
+            start = time.perf_counter()
+            for frame in frames:
+                push.send(frame)
+            for _ in frames:
+                decode_confirmation(pull.recv(copy=False).buffer)
+            elapsed = time.perf_counter() - start
+    finally:
+        pull.close(0)
+        push.close(0)
+        ctx.term()
+
+    summary = histogram.summary()
+    return {
+        "round_trip_p50_us": summary["p50_us"],
+        "round_trip_p99_us": summary["p99_us"],
+        "round_trip_mean_us": summary["mean_us"],
+        "pipelined_orders_per_sec": orders / elapsed,
+    }
+
+
+def run(orders=20000, signal_port=SIGNAL_PORT, confirmation_port=CONFIRMATION_PORT):
+    return {
+        wire_format: _measure(wire_format, orders, signal_port, confirmation_port)
+        for wire_format in ("binary", "json")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20000, help="orders per measurement")
+    parser.add_argument("--signal-port", type=int, default=SIGNAL_PORT)
+    parser.add_argument("--confirmation-port", type=int, default=CONFIRMATION_PORT)
+    args = parser.parse_args()
+
+    results = run(args.orders, args.signal_port, args.confirmation_port)
+    names = list(results["binary"])
+    print(f"{'':28}{'binary':>14}{'json':>14}")
+    for name in names:
+        print(f"{name:28}{results['binary'][name]:>14,.1f}{results['json'][name]:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
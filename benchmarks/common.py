@@ -0,0 +1,38 @@
+"""
+Shared helpers for the benchmark scripts: import paths, deterministic data
+and timing.
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "trading_app"))
+sys.path.insert(0, os.path.join(ROOT, "phase_1_backtesting"))
+
+from generate_data import generate_sample_prices  # noqa: E402
+
+SEED = 42
+
+_prices = {}
+
+
+def sample_prices(n, seed=SEED):
+    """n synthetic prices from generate_sample_prices, identical on every run."""
+    key = (n, seed)
+    if key not in _prices:
+        np.random.seed(seed)
+        _prices[key] = generate_sample_prices(num_days=n)["price"].to_numpy()
+    return _prices[key]
+
+
+def per_call_ns(fn, number, repeat=5):
+    """Best-of-`repeat` time per call of fn, in nanoseconds."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e9
+
+
+def best_seconds(fn, repeat=3):
+    """Best-of-`repeat` wall time of one fn() call, in seconds."""
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
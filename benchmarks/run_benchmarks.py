@@ -0,0 +1,151 @@
+"""
+Run the benchmark suite, save the results as JSON and compare with a baseline.
+
+    python benchmarks/run_benchmarks.py                   # full run
+    python benchmarks/run_benchmarks.py --quick           # smaller sizes, for a quick check
+    python benchmarks/run_benchmarks.py --only strategy backtest
+    python benchmarks/run_benchmarks.py --save-baseline   # store this run as the baseline
+
+Every run is written to benchmarks/results/<UTC time>.json. When a baseline
+exists (benchmarks/baseline.json by default), each metric is compared with
+it: names containing _ns/_us are lower-is-better, names containing _per_sec
+higher-is-better, anything else (sizes, fill counts) is informational. A
+metric that is worse by more than --threshold is a regression and the exit
+status is 1. Baselines are machine-specific; record one per machine.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+import bench_backtest
+import bench_ingest
+import bench_protocol
+import bench_strategy
+import bench_zmq
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+BASELINE = os.path.join(HERE, "baseline.json")
+
+# name -> (run function, full-size arguments, --quick arguments)
+SUITE = {
+    "strategy": (bench_strategy.run, {"ticks": 200000}, {"ticks": 20000}),
+    "backtest": (bench_backtest.run, {"max_rows": 10_000_000}, {"max_rows": 100_000}),
+    "protocol": (bench_protocol.run, {"number": 200000}, {"number": 20000}),
+    "ingest": (bench_ingest.run, {"number": 100000}, {"number": 10000}),
+    "zmq": (bench_zmq.run, {"orders": 20000}, {"orders": 2000}),
+}
+
+
+def flatten(results, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def direction(name):
+    """+1 if higher is better, -1 if lower is better, 0 if not comparable."""
+    if "_per_sec" in name:
+        return 1
+    if "_ns" in name or "_us" in name:
+        return -1
+    return 0
+
+
+def compare(current, baseline, threshold):
+    """Return (regressions, improvements) as lists of (name, baseline, current, change)."""
+    regressions = []
+    improvements = []
+    base = flatten(baseline)
+    for name, value in flatten(current).items():
+        sign = direction(name)
+        old = base.get(name)
+        if sign == 0 or not old:
+            continue
+        change = (value - old) / old
+        if change * sign < -threshold:
+            regressions.append((name, old, value, change))
+        elif change * sign > threshold:
+            improvements.append((name, old, value, change))
+    return regressions, improvements
+
+
+def run_suite(names, quick):
+    results = {}
+    for name in names:
+        fn, full, small = SUITE[name]
+        print(f"▶ {name} ...", flush=True)
+        start = time.perf_counter()
+        results[name] = fn(**(small if quick else full))
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", nargs="+", choices=list(SUITE), help="run only these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes")
+    parser.add_argument("--output", default=None, help="results file (default: results/<time>.json)")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change flagged as regression")
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the baseline")
+    args = parser.parse_args()
+
+    names = args.only or list(SUITE)
+    report = {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "node": platform.node(),
+            "quick": args.quick,
+        },
+        "results": run_suite(names, args.quick),
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to {output}")
+
+    status = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("quick") != args.quick:
+            print("⚠️  Baseline was recorded with a different --quick setting; sizes may not match")
+        regressions, improvements = compare(report["results"], baseline["results"], args.threshold)
+        for title, rows in (("Regressions", regressions), ("Improvements", improvements)):
+            if rows:
+                print(f"{title} (beyond {args.threshold:.0%}):")
+                for name, old, new, change in rows:
+                    print(f"  {name:55} {old:>14,.1f} -> {new:>14,.1f}  ({change:+.1%})")
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline}")
+            status = 1
+        else:
+            print(f"✅ No regressions against {args.baseline}")
+
+    if args.save_baseline:
+        shutil.copyfile(output, args.baseline)
+        print(f"📌 Baseline stored at {args.baseline}")
+
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,67 @@
 #include <iomanip>
 #include <string>
 #include <vector>
+#include <map>
+#include <cstdint>
+#include <cstring>
+#include <ctime>
 #include <zmq.hpp>
 #include <nlohmann/json.hpp>
 
+// -----------------------------
+// Binary wire protocol (mirrors trading_app/protocol.py)
+// Fixed-layout little-endian records; anything whose first byte is not
+// MAGIC is treated as legacy JSON.
+// -----------------------------
+namespace wire {
+    constexpr uint8_t MAGIC = 0xB7;
+    constexpr uint8_t VERSION = 2;
+
+    constexpr uint8_t MSG_SIGNAL = 1;
+    constexpr uint8_t MSG_CONFIRMATION = 2;
+
+    constexpr uint8_t ACTION_BUY = 1;
+    constexpr uint8_t ACTION_SELL = 2;
+
+#pragma pack(push, 1)
+    struct Header {
+        uint8_t magic;
+        uint8_t version;
+        uint8_t type;
+        uint8_t action;
+        int8_t position;        // confirmations only
+        uint8_t pad;
+        uint16_t symbol_id;     // echoed in the confirmation
+    };
+
+    struct SignalMsg {
+        Header header;
+        uint64_t seq;
+        int64_t ts_ns;
+        double price;
+    };
+
+    struct ConfirmationMsg {
+        Header header;
+        uint64_t seq;
+        int64_t ts_ns;
+        double price;
+        double pnl;
+        double total_pnl;
+    };
+#pragma pack(pop)
+
+    static_assert(sizeof(SignalMsg) == 32, "SignalMsg must match protocol.py");
+    static_assert(sizeof(ConfirmationMsg) == 48, "ConfirmationMsg must match protocol.py");
+
+    inline std::string format_ns(int64_t ts_ns) {
+        std::time_t secs = static_cast<std::time_t>(ts_ns / 1000000000LL);
+        char buf[32];
+        std::strftime(buf, sizeof(buf), "%Y-%m-%d %H:%M:%S", std::localtime(&secs));
+        return buf;
+    }
+}
+
 struct Trade {
     std::string timestamp;
     std::string action;
@@ -15,10 +73,16 @@ struct Trade {
         : timestamp(ts), action(act), price(p), pnl(pnl_val) {}
 };
 
+// One-unit book of a single symbol
+struct Book {
+    int position = 0;           // 0 = flat, 1 = long
+    double entry_price = 0.0;
+};
+
 class ExecutionEngine {
 private:
-    int position;               // 0 = flat, 1 = long
-    double entry_price;
+    // Keyed by the symbol: "#<id>" for binary signals, the name for JSON ones
+    std::map<std::string, Book> books;
     double cash;
     double total_pnl;
     std::vector<Trade> trades;
@@ -29,7 +93,7 @@ private:
 
 public:
     ExecutionEngine(double starting_cash, zmq::socket_t& conf_sock)
-        : position(0), entry_price(0.0), cash(starting_cash), total_pnl(0.0), confirmation_socket(conf_sock) 
+        : cash(starting_cash), total_pnl(0.0), confirmation_socket(conf_sock) 
     {
         std::cout << std::string(70, '=') << "\n"
                   << "🚀 C++ EXECUTION ENGINE INITIALIZED\n"
@@ -41,52 +105,60 @@ public:
                   << "⏳ Waiting for signals from Python...\n\n";
     }
 
-    void on_signal(const std::string& action, double price, const std::string& timestamp) {
+    // Each symbol has its own book. seq/ts_ns/symbol_id/binary come from
+    // binary signals and are echoed back in the confirmation; JSON signals
+    // leave them at their defaults.
+    void on_signal(const std::string& symbol, const std::string& action, double price,
+                   const std::string& timestamp, uint64_t seq = 0, int64_t ts_ns = 0,
+                   uint16_t symbol_id = 0, bool binary = false) {
+        Book& book = books[symbol];
         bool executed = false;
         double trade_pnl = 0.0;
-        int demo_temp = 0;
 
-        if (action == "BUY" && position == 0) {
-            position = 1;
-            entry_price = price;
+        if (action == "BUY" && book.position == 0) {
+            book.position = 1;
+            book.entry_price = price;
             trades.emplace_back(timestamp, "BUY", price);
             executed = true;
 
-            print_trade(buy_marker, "BUY", timestamp, price);
+            print_trade(buy_marker, symbol, "BUY", timestamp, price);
 
-        } else if (action == "SELL" && position == 1) {
-            trade_pnl = price - entry_price;
+        } else if (action == "SELL" && book.position == 1) {
+            trade_pnl = price - book.entry_price;
             total_pnl += trade_pnl;
             cash += trade_pnl;
             trades.emplace_back(timestamp, "SELL", price, trade_pnl);
             executed = true;
 
-            print_trade(sell_marker, "SELL", timestamp, price, trade_pnl);
+            book.position = 0;
+            book.entry_price = 0.0;
 
-            position = 0;
-            entry_price = 0.0;
+            print_trade(sell_marker, symbol, "SELL", timestamp, price, trade_pnl);
 
         }
          else {
-            std::cout << "⚠️  [" << timestamp << "] Ignored " << action
-                      << " signal (current position: " << (position ? "LONG" : "FLAT") << ")\n";
+            std::cout << "⚠️  [" << timestamp << "] Ignored " << action << " " << symbol
+                      << " signal (current position: " << (book.position ? "LONG" : "FLAT") << ")\n";
         }
 
-        if (executed) send_confirmation(action, price, timestamp, trade_pnl);
+        if (executed) {
+            if (binary) send_binary_confirmation(action, price, seq, ts_ns, symbol_id, book.position, trade_pnl);
+            else send_confirmation(symbol, action, price, timestamp, book.position, trade_pnl);
+        }
     }
 
 private:
-    void print_trade(char marker, const std::string& action, const std::string& timestamp,
-                     double price, double pnl = 0.0) const 
+    void print_trade(char marker, const std::string& symbol, const std::string& action,
+                     const std::string& timestamp, double price, double pnl = 0.0) const 
     {
         std::cout << std::string(70, marker) << "\n"
-                  << marker << " [" << timestamp << "] " << action << " EXECUTED\n"
+                  << marker << " [" << timestamp << "] " << action << " " << symbol << " EXECUTED\n"
                   << "   Entry/Exit Price: $" << price << "\n";
 
         if (action == "SELL") {
             std::cout << "   Trade PnL: $" << pnl << (pnl > 0 ? " ✅ PROFIT" : " ❌ LOSS") << "\n"
                       << "   Total PnL: $" << total_pnl << "\n"
-                      << "   Portfolio Value: $" << (cash + (position * price)) << "\n";
+                      << "   Portfolio Value: $" << portfolio_value() << "\n";
         } else {
             std::cout << "   Position: LONG\n";
         }
@@ -94,11 +166,12 @@ private:
         std::cout << std::string(70, marker) << "\n\n";
     }
 
-    void send_confirmation(const std::string& action, double price,
-                           const std::string& timestamp, double pnl) 
+    void send_confirmation(const std::string& symbol, const std::string& action, double price,
+                           const std::string& timestamp, int position, double pnl) 
     {
         try {
             nlohmann::json confirmation;
+            if (!symbol.empty()) confirmation["symbol"] = symbol;
             confirmation["action"] = action;
             confirmation["price"] = price;
             confirmation["time"] = timestamp;
@@ -114,6 +187,38 @@ private:
         }
     }
 
+    void send_binary_confirmation(const std::string& action, double price, uint64_t seq,
+                                  int64_t ts_ns, uint16_t symbol_id, int position, double pnl)
+    {
+        try {
+            wire::ConfirmationMsg confirmation{};
+            confirmation.header.magic = wire::MAGIC;
+            confirmation.header.version = wire::VERSION;
+            confirmation.header.type = wire::MSG_CONFIRMATION;
+            confirmation.header.action = (action == "BUY") ? wire::ACTION_BUY : wire::ACTION_SELL;
+            confirmation.header.position = static_cast<int8_t>(position);
+            confirmation.header.symbol_id = symbol_id;
+            confirmation.seq = seq;
+            confirmation.ts_ns = ts_ns;
+            confirmation.price = price;
+            confirmation.pnl = (action == "SELL") ? pnl : 0.0;
+            confirmation.total_pnl = total_pnl;
+
+            confirmation_socket.send(zmq::buffer(&confirmation, sizeof(confirmation)), zmq::send_flags::none);
+            std::cout << "📤 Confirmation sent to Python: " << action << " (seq " << seq << ")\n";
+
+        } catch (const std::exception& e) {
+            std::cerr << "❌ Failed to send confirmation: " << e.what() << "\n";
+        }
+    }
+
+    // Cash plus every open position at its entry price
+    double portfolio_value() const {
+        double value = cash;
+        for (const auto& entry : books) value += entry.second.position * entry.second.entry_price;
+        return value;
+    }
+
 public:
     void print_summary() const {
         std::cout << "\n" << std::string(70, '=') << "\n"
@@ -137,10 +242,12 @@ public:
                       << (total_pnl > 0 ? " ✅" : (total_pnl < 0 ? " ❌" : "")) << "\n";
         }
 
-        double final_value = cash + (position * entry_price);
-        std::cout << "Final Portfolio Value: $" << final_value << "\n"
-                  << "Current Position: " << (position ? "LONG" : "FLAT") << "\n"
-                  << std::string(70, '=') << "\n";
+        std::cout << "Final Portfolio Value: $" << portfolio_value() << "\n";
+        for (const auto& entry : books) {
+            std::cout << "Current Position " << entry.first << ": "
+                      << (entry.second.position ? "LONG" : "FLAT") << "\n";
+        }
+        std::cout << std::string(70, '=') << "\n";
     }
 };
 
@@ -176,10 +283,36 @@ int main() {
                 continue;
             }
 
+            const auto* bytes = static_cast<const uint8_t*>(message.data());
+            if (message.size() > 0 && bytes[0] == wire::MAGIC) {
+                if (message.size() < sizeof(wire::SignalMsg)) {
+                    std::cerr << "❌ Truncated binary signal (" << message.size() << " bytes)\n";
+                    continue;
+                }
+                wire::SignalMsg signal;
+                std::memcpy(&signal, bytes, sizeof(signal));
+                if (signal.header.version != wire::VERSION || signal.header.type != wire::MSG_SIGNAL) {
+                    std::cerr << "❌ Unsupported binary message (version " << int(signal.header.version)
+                              << ", type " << int(signal.header.type) << ")\n";
+                    continue;
+                }
+                const char* action = signal.header.action == wire::ACTION_BUY ? "BUY"
+                                   : signal.header.action == wire::ACTION_SELL ? "SELL" : nullptr;
+                if (action == nullptr) {
+                    std::cerr << "❌ Unknown action code " << int(signal.header.action) << "\n";
+                    continue;
+                }
+                engine.on_signal("#" + std::to_string(signal.header.symbol_id), action, signal.price,
+                                 wire::format_ns(signal.ts_ns), signal.seq, signal.ts_ns,
+                                 signal.header.symbol_id, true);
+                continue;
+            }
+
+            // Legacy JSON signals (compatibility mode during rollout)
             std::string msg_str(static_cast<char*>(message.data()), message.size());
             try {
                 auto j = nlohmann::json::parse(msg_str);
-                engine.on_signal(j["action"], j["price"], j["time"]);
+                engine.on_signal(j.value("symbol", std::string()), j["action"], j["price"], j["time"]);
             } catch (const std::exception& e) {
                 std::cerr << "❌ Error processing message: " << e.what() << "\n";
             }
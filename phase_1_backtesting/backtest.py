@@ -0,0 +1,190 @@
+import os
+import sys
+import numpy as np
+from dataclasses import dataclass
+
+# Performance analytics are shared with the live engine in trading_app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "trading_app"))
+from analytics import PerformanceTracker  # noqa: E402
+
+# Signal codes used by the array engine
+BUY = 1
+HOLD = 0
+SELL = -1
+
+SIGNAL_NAMES = {BUY: "BUY", HOLD: "HOLD", SELL: "SELL"}
+
+# One row per fill. side is BUY or SELL, index is the row the fill happened on
+# and cash is the cash balance right after the fill.
+TRADE_DTYPE = np.dtype([
+    ("index", np.int64),
+    ("side", np.int8),
+    ("quantity", np.int64),
+    ("price", np.float64),
+    ("cash", np.float64),
+])
+
+
+@dataclass
+class BacktestResult:
+    position: np.ndarray    # units held at the end of each row
+    cash: np.ndarray        # cash at the end of each row
+    equity: np.ndarray      # cash + position * price at the end of each row
+    trades: np.ndarray      # TRADE_DTYPE records, including the final liquidation
+    final_cash: float       # cash after the final liquidation (or at the end, with liquidate=False)
+    liquidated: bool        # True if an open position was closed at the last price
+    final_position: int = 0  # units still held at the end (only non-zero with liquidate=False)
+
+
+def rolling_mean(values, window):
+    """
+    Trailing mean over `window` rows, NaN until the window is full.
+
+    Each mean is summed left to right from the window's own values, so a row's
+    result depends only on the `window` prices ending at it. That keeps chunked
+    runs (which only carry the last window - 1 prices across chunks) identical
+    to a single pass over the whole series.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    means = np.full(n, np.nan)
+    if n >= window:
+        total = values[:n - window + 1].copy()
+        for k in range(1, window):
+            total += values[k:n - window + 1 + k]
+        means[window - 1:] = total / window
+    return means
+
+
+def generate_signals(short_ma, long_ma):
+    """
+    Vectorized crossover signal: BUY while the short MA is above the long MA,
+    SELL while it is below, HOLD when they are equal.
+    """
+    short_ma = np.asarray(short_ma, dtype=np.float64)
+    long_ma = np.asarray(long_ma, dtype=np.float64)
+    signals = np.zeros(len(short_ma), dtype=np.int8)
+    signals[short_ma > long_ma] = BUY
+    signals[short_ma < long_ma] = SELL
+    return signals
+
+
+def signal_names(signals):
+    """Map signal codes back to the "BUY"/"SELL"/"HOLD" strings used in the output."""
+    return np.array(["SELL", "HOLD", "BUY"], dtype=object)[np.asarray(signals) + 1]
+
+
+def run_backtest(prices, signals, starting_cash=10000, invest_fraction=0.95, position=0, liquidate=True):
+    """
+    Run the long-only backtest over whole arrays.
+
+    To continue a run over the next chunk of rows, pass the previous result's
+    final_cash and final_position as starting_cash and position, with
+    liquidate=False on every chunk but the last.
+
+    Fills are identical to the original per-row loop: a BUY row while flat
+    invests invest_fraction of cash in whole units, a SELL row while long sells
+    everything, and any open position is liquidated at the last price.
+
+    Instead of visiting every row, we jump straight from one fill to the next
+    with searchsorted over the BUY/SELL row indices, so the Python work scales
+    with the number of trades. The per-row position/cash/equity arrays are then
+    built in one pass from the fill rows.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    signals = np.asarray(signals)
+    n = len(prices)
+    if len(signals) != n:
+        raise ValueError("prices and signals must have the same length")
+
+    buy_rows = np.flatnonzero(signals == BUY)
+    sell_rows = np.flatnonzero(signals == SELL)
+
+    cash = starting_cash
+    starting_position = position
+    fills = []
+    row = 0
+
+    while row < n:
+        if position == 0:
+            k = np.searchsorted(buy_rows, row)
+            if k == len(buy_rows):
+                break
+            i = buy_rows[k]
+            amount_to_invest = cash * invest_fraction
+            quantity = int(amount_to_invest / prices[i])
+            if quantity <= 0:
+                # Not enough cash at this price; cash is unchanged while flat,
+                # so find the first later BUY row where a whole unit is affordable
+                candidates = buy_rows[k:]
+                affordable = np.flatnonzero(amount_to_invest / prices[candidates] >= 1.0)
+                if len(affordable) == 0:
+                    break
+                i = candidates[affordable[0]]
+                quantity = int(amount_to_invest / prices[i])
+            cash -= quantity * prices[i]
+            position = quantity
+            fills.append((i, BUY, quantity, prices[i], cash))
+        else:
+            k = np.searchsorted(sell_rows, row)
+            if k == len(sell_rows):
+                break
+            i = sell_rows[k]
+            cash += position * prices[i]
+            fills.append((i, SELL, position, prices[i], cash))
+            position = 0
+        row = i + 1
+
+    trades = np.array(fills, dtype=TRADE_DTYPE)
+
+    # Per-row state: position changes and cash levels only move on fill rows
+    deltas = np.zeros(n, dtype=np.int64)
+    np.add.at(deltas, trades["index"], np.where(trades["side"] == BUY, trades["quantity"], -trades["quantity"]))
+    position_history = starting_position + np.cumsum(deltas)
+
+    last_fill = np.searchsorted(trades["index"], np.arange(n), side="right") - 1
+    cash_levels = np.concatenate(([starting_cash], trades["cash"])).astype(np.float64)
+    cash_history = cash_levels[last_fill + 1]
+
+    equity_history = cash_history + position_history * prices
+
+    # Final liquidation to close any open positions
+    liquidated = liquidate and position > 0
+    if liquidated:
+        cash += position * prices[n - 1]
+        liquidation = np.array([(n - 1, SELL, position, prices[n - 1], cash)], dtype=TRADE_DTYPE)
+        trades = np.concatenate((trades, liquidation))
+
+    return BacktestResult(
+        position=position_history,
+        cash=cash_history,
+        equity=equity_history,
+        trades=trades,
+        final_cash=float(cash),
+        liquidated=bool(liquidated),
+        final_position=0 if liquidated else int(position),
+    )
+
+
+def track_performance(tracker, prices, trades, timestamps=None):
+    """
+    Feed a backtest (or one chunk of it) to a PerformanceTracker in row order:
+    each row's fills, or a mark at the row's price when it has none.
+    trades["index"] must refer to rows of `prices`; timestamps are optional
+    int64 nanoseconds per row.
+    """
+    fills = trades.tolist()
+    stamps = timestamps.tolist() if timestamps is not None else None
+    k = 0
+    next_row = fills[0][0] if fills else -1
+    for i, price in enumerate(np.asarray(prices, dtype=np.float64).tolist()):
+        ts_ns = stamps[i] if stamps is not None else None
+        if i != next_row:
+            tracker.mark(price, ts_ns)
+            continue
+        while k < len(fills) and fills[k][0] == i:
+            _, side, quantity, fill_price, _ = fills[k]
+            tracker.on_fill(SIGNAL_NAMES[side], fill_price, quantity, ts_ns)
+            k += 1
+        next_row = fills[k][0] if k < len(fills) else -1
+    return tracker
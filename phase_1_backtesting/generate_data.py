@@ -1,46 +1,255 @@
-import pandas as pd
+import argparse
+import json
+import os
+from datetime import datetime
+
 import numpy as np
-from datetime import datetime, timedelta
-
-def generate_sample_prices(num_days=200, starting_price=42000):
-    dates = []
-    prices = []
-    
-    current_date = datetime(2024, 1, 1)
-    current_price = starting_price
-    
-    for i in range(num_days):
-        dates.append(current_date)
-        
-        # Add some trending behavior
-        trend = np.sin(i / 20) * 500  # Cyclical trend
-        
-        # Add random daily volatility
-        volatility = np.random.randn() * 300
-        
-        # Small upward drift
-        drift = 10
-        
-        # Update price
-        current_price = current_price + drift + trend/10 + volatility
-        
-        # Don't let price go too low
-        current_price = max(current_price, starting_price * 0.5)
-        
-        prices.append(round(current_price, 2))
-        
-        # Move to next day
-        current_date += timedelta(days=1)
-    
+import pandas as pd
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def generate_sample_prices(num_days=200, starting_price=42000, seed=None):
+    """
+    Daily sample prices: a random walk with a small upward drift, a cyclical
+    trend and a floor at half the starting price.
+
+    Built with array operations; with the same NumPy random state it produces
+    exactly the series the original day-by-day loop did. Pass seed for a
+    reproducible series without touching the global random state.
+    """
+    rng = np.random if seed is None else np.random.RandomState(seed)
+    i = np.arange(num_days)
+
+    # Add some trending behavior
+    trend = np.sin(i / 20) * 500  # Cyclical trend
+
+    # Add random daily volatility
+    volatility = rng.randn(num_days) * 300
+
+    # Small upward drift
+    drift = 10
+
+    path = starting_price + np.cumsum(drift + trend / 10 + volatility)
+
+    # Don't let price go too low. Clamping every day (price = max(price + step, floor))
+    # is the walk reflected at the floor: lift it by the deepest dip below the floor so far
+    floor = starting_price * 0.5
+    path += np.maximum(0.0, np.maximum.accumulate(floor - path))
+
     # Create DataFrame
     df = pd.DataFrame({
-        'date': dates,
-        'price': prices
+        'date': pd.date_range(datetime(2024, 1, 1), periods=num_days, freq="D"),
+        'price': np.round(path, 2)
     })
-    
+
     return df
 
+
+def _per_asset(value, assets, name):
+    value = np.broadcast_to(np.asarray(value, dtype=np.float64), (assets,)).copy()
+    if value.shape != (assets,):
+        raise ValueError(f"{name} must be a scalar or have one value per asset")
+    return value
+
+
+class MarketGenerator:
+    """
+    Vectorized synthetic market for one or more correlated assets.
+
+    Log prices follow a geometric Brownian motion (annualized mu and sigma)
+    with optional Merton jumps (jump_intensity per year, normally distributed
+    log jump sizes) plus the sinusoidal trend of generate_sample_prices
+    (trend_amplitude in log-price per step, period trend_period steps).
+    Shocks are correlated across assets through `correlation`, a scalar
+    (same pairwise correlation) or a full matrix.
+
+    mode="bars" spaces rows bar_seconds apart; mode="ticks" draws Poisson
+    arrivals at tick_rate per second, so each row's time step is random.
+
+    Rows are produced chunk by chunk with the price, clock and trend phase
+    carried over, so any number of rows can be generated in bounded memory.
+    Each random stream (shocks, jump counts, jump sizes, arrivals) has its own
+    generator spawned from `seed`, so the draws do not depend on the chunk size.
+    """
+
+    def __init__(self, assets=1, starting_price=42000.0, mu=0.05, sigma=0.6, correlation=0.0,
+                 jump_intensity=0.0, jump_mean=0.0, jump_std=0.0,
+                 trend_amplitude=0.001, trend_period=20.0,
+                 mode="bars", bar_seconds=86400.0, tick_rate=10.0,
+                 start=datetime(2024, 1, 1), seed=0, names=None):
+        if mode not in ("bars", "ticks"):
+            raise ValueError("mode must be 'bars' or 'ticks'")
+        self.assets = assets
+        self.names = list(names) if names else (["price"] if assets == 1 else [f"price_{i}" for i in range(assets)])
+        if len(self.names) != assets:
+            raise ValueError("names must have one entry per asset")
+
+        self.mu = _per_asset(mu, assets, "mu")
+        self.sigma = _per_asset(sigma, assets, "sigma")
+        self.jump_intensity = jump_intensity
+        self.jump_mean = jump_mean
+        self.jump_std = jump_std
+        self.trend_amplitude = trend_amplitude
+        self.trend_period = trend_period
+        self.mode = mode
+        self.bar_seconds = bar_seconds
+        self.tick_rate = tick_rate
+        self.seed = seed
+
+        corr = np.asarray(correlation, dtype=np.float64)
+        if corr.ndim == 0:
+            corr = np.full((assets, assets), float(corr))
+            np.fill_diagonal(corr, 1.0)
+        if corr.shape != (assets, assets):
+            raise ValueError("correlation must be a scalar or an assets x assets matrix")
+        self._cholesky = np.linalg.cholesky(corr) if assets > 1 else None
+
+        streams = np.random.SeedSequence(seed).spawn(4)
+        self._shocks, self._jump_counts, self._jump_sizes, self._arrivals = (
+            np.random.default_rng(s) for s in streams
+        )
+
+        self._log_price = np.log(_per_asset(starting_price, assets, "starting_price"))
+        self._time_ns = int(pd.Timestamp(start).value)
+        self._step = 0
+
+    def next_chunk(self, n):
+        """The next n rows: (timestamps as int64 ns since the epoch, prices of shape (n, assets))."""
+        if self.mode == "bars":
+            interval_ns = int(self.bar_seconds * 1e9)
+            timestamps = self._time_ns + np.arange(n, dtype=np.int64) * interval_ns
+            self._time_ns = int(timestamps[-1]) + interval_ns
+            dt = self.bar_seconds / SECONDS_PER_YEAR
+        else:
+            intervals = self._arrivals.exponential(1.0 / self.tick_rate, n)
+            intervals_ns = np.maximum((intervals * 1e9).astype(np.int64), 1)
+            offsets = np.cumsum(intervals_ns)
+            timestamps = self._time_ns + offsets - intervals_ns
+            self._time_ns += int(offsets[-1])
+            dt = (intervals / SECONDS_PER_YEAR)[:, None]
+
+        shocks = self._shocks.standard_normal((n, self.assets))
+        if self._cholesky is not None:
+            shocks = shocks @ self._cholesky.T
+
+        returns = (self.mu - 0.5 * self.sigma ** 2) * dt + self.sigma * np.sqrt(dt) * shocks
+        if self.trend_amplitude:
+            phase = np.arange(self._step, self._step + n) / self.trend_period
+            returns += (self.trend_amplitude * np.sin(phase))[:, None]
+        if self.jump_intensity:
+            counts = self._jump_counts.poisson(self.jump_intensity * dt, (n, self.assets))
+            sizes = self._jump_sizes.standard_normal((n, self.assets))
+            returns += counts * self.jump_mean + np.sqrt(counts) * self.jump_std * sizes
+
+        log_prices = self._log_price + np.cumsum(returns, axis=0)
+        self._log_price = log_prices[-1].copy()
+        self._step += n
+        return timestamps, np.exp(log_prices)
+
+    def chunks(self, rows, chunk_size=1_000_000):
+        """Yield (timestamps, prices) chunks until `rows` rows have been produced."""
+        done = 0
+        while done < rows:
+            n = min(chunk_size, rows - done)
+            yield self.next_chunk(n)
+            done += n
+
+    def params(self):
+        return {
+            "assets": self.assets, "names": self.names, "mu": self.mu.tolist(), "sigma": self.sigma.tolist(),
+            "jump_intensity": self.jump_intensity, "jump_mean": self.jump_mean, "jump_std": self.jump_std,
+            "trend_amplitude": self.trend_amplitude, "trend_period": self.trend_period, "mode": self.mode,
+            "bar_seconds": self.bar_seconds, "tick_rate": self.tick_rate, "seed": self.seed,
+        }
+
+
+def write_csv(path, generator, rows, chunk_size=1_000_000, decimals=2):
+    """
+    Stream rows to CSV: a `timestamp` column (epoch milliseconds, like the
+    replay recordings) and one price column per asset.
+    """
+    first = True
+    for timestamps, prices in generator.chunks(rows, chunk_size):
+        chunk = pd.DataFrame(prices, columns=generator.names)
+        chunk.insert(0, "timestamp", timestamps // 1_000_000)
+        chunk.to_csv(path, mode="w" if first else "a", header=first, index=False,
+                     float_format=f"%.{decimals}f")
+        first = False
+
+
+def write_columnar(path, generator, rows, chunk_size=1_000_000):
+    """
+    Stream rows into a directory of .npy columns: timestamp.npy (int64 ns)
+    and <name>.npy (float64) per asset, plus meta.json. Each file is
+    preallocated with open_memmap and filled chunk by chunk.
+    """
+    os.makedirs(path, exist_ok=True)
+    columns = {"timestamp": np.lib.format.open_memmap(os.path.join(path, "timestamp.npy"), mode="w+",
+                                                      dtype=np.int64, shape=(rows,))}
+    for name in generator.names:
+        columns[name] = np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode="w+",
+                                                  dtype=np.float64, shape=(rows,))
+
+    row = 0
+    for timestamps, prices in generator.chunks(rows, chunk_size):
+        n = len(timestamps)
+        columns["timestamp"][row:row + n] = timestamps
+        for i, name in enumerate(generator.names):
+            columns[name][row:row + n] = prices[:, i]
+        row += n
+
+    for column in columns.values():
+        column.flush()
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"rows": rows, "columns": list(columns), **generator.params()}, f, indent=2)
+
+
+def load_columnar(path):
+    """Memory-map every column written by write_columnar (read-only, no copy)."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in meta["columns"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic market data")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="rows for the market generator (default: the 200-day prices.csv sample)")
+    parser.add_argument("--assets", type=int, default=1)
+    parser.add_argument("--mode", choices=("bars", "ticks"), default="bars")
+    parser.add_argument("--bar-seconds", type=float, default=86400.0)
+    parser.add_argument("--tick-rate", type=float, default=10.0, help="mean ticks per second")
+    parser.add_argument("--correlation", type=float, default=0.0)
+    parser.add_argument("--sigma", type=float, default=0.6, help="annualized volatility")
+    parser.add_argument("--trend-amplitude", type=float, default=0.001, help="sinusoidal trend, log-price per row")
+    parser.add_argument("--jump-intensity", type=float, default=0.0, help="jumps per year")
+    parser.add_argument("--jump-std", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--csv", default=None, help="CSV output path")
+    parser.add_argument("--columnar", default=None, help="directory for .npy column output")
+    args = parser.parse_args()
+
+    if args.rows is None:
+        df = generate_sample_prices(num_days=200, starting_price=42000)
+        df.to_csv("prices.csv", index=False)
+        print("Sample price data generated!")
+        return
+
+    def generator():
+        return MarketGenerator(assets=args.assets, mode=args.mode, bar_seconds=args.bar_seconds,
+                               tick_rate=args.tick_rate, correlation=args.correlation, sigma=args.sigma,
+                               trend_amplitude=args.trend_amplitude,
+                               jump_intensity=args.jump_intensity, jump_std=args.jump_std, seed=args.seed)
+
+    if args.csv:
+        write_csv(args.csv, generator(), args.rows, args.chunk_size)
+        print(f"Wrote {args.rows} rows to {args.csv}")
+    if args.columnar:
+        write_columnar(args.columnar, generator(), args.rows, args.chunk_size)
+        print(f"Wrote {args.rows} rows to {args.columnar}/")
+
+
 if __name__ == "__main__":
-    df = generate_sample_prices(num_days=200, starting_price=42000)
-    df.to_csv("prices.csv", index=False)
-    print("Sample price data generated!")
\ No newline at end of file
+    main()
@@ -1,8 +1,65 @@
+import argparse
+
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from backtest import generate_signals, run_backtest, signal_names, rolling_mean, track_performance, PerformanceTracker, BUY
+from report import export_results, render_report
+from streaming import stream_backtest
+
+# Daily bars
+PERIODS_PER_YEAR = 365
+
+
+def print_performance(stats):
+    print(f"Total Trades: {stats['fills']} fills, {stats['round_trips']} round trips")
+    print(f"Win Rate: {stats['win_rate']:.2f}%")
+    print(f"Average Win: ${stats['avg_win']:.2f}   Average Loss: ${stats['avg_loss']:.2f}")
+    print(f"Max Drawdown: ${stats['max_drawdown']:.2f}   {stats['max_drawdown_pct']:.2f}%")
+    sharpe, sortino = stats["sharpe"], stats["sortino"]
+    print(f"Sharpe: {'n/a' if sharpe is None else f'{sharpe:.2f}'}   "
+          f"Sortino: {'n/a' if sortino is None else f'{sortino:.2f}'} (last {stats['window']} periods)")
+    print(f"Exposure: {stats['exposure_pct']:.2f}%   Turnover: ${stats['turnover']:,.2f}")
+
+
+def run_streaming(input_path, chunk_size, starting_cash=10000):
+    """Out-of-core run: same rows and fills as main(), written chunk by chunk, no chart."""
+    print("STREAMING BACKTEST")
+    print("=" * 60)
+    print(f"Reading {input_path} in chunks of {chunk_size:,} rows")
+    print(f"Starting with ${starting_cash:.2f}")
+
+    backtest = stream_backtest(input_path, "output.csv", "trades.csv", chunk_size=chunk_size,
+                               starting_cash=starting_cash, periods_per_year=PERIODS_PER_YEAR)
+    if backtest.liquidation:
+        quantity, price = backtest.liquidation
+        print(f"FINAL LIQUIDATION | SELL | {quantity} UNITS AT {price:.2f} | Proceeds: {quantity * price:.2f}")
+
+    total_return = backtest.cash - starting_cash
+    print("BACKTEST RESULTS")
+    print("=" * 60)
+    print(f"Rows: {backtest.rows:,}")
+    print(f"Starting capital: ${starting_cash:.2f}")
+    print(f"Ending capital: ${backtest.cash:.2f}")
+    print(f"Total Return: ${total_return:.2f}   {total_return / starting_cash * 100:.2f}%")
+    print_performance(backtest.analytics.snapshot())
+    print(f"📁 Results saved to 'output.csv', fills to 'trades.csv'\n")
+
 
 def main():
-    df = pd.read_csv("prices.csv")
+    parser = argparse.ArgumentParser(description="Moving average crossover backtest")
+    parser.add_argument("--input", default="prices.csv", help="price CSV (with --stream, also a generate_data.py --columnar directory)")
+    parser.add_argument("--stream", action="store_true", help="process the input in chunks with constant memory")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="rows per chunk with --stream")
+    parser.add_argument("--plot-method", choices=("minmax", "lttb"), default="minmax",
+                        help="how long series are decimated for the chart")
+    parser.add_argument("--csv", action="store_true", help="also write every row to output.csv")
+    args = parser.parse_args()
+
+    if args.stream:
+        run_streaming(args.input, args.chunk_size)
+        return
+
+    df = pd.read_csv(args.input)
 
     print("=" * 60)
     print("Data has been read successfully")
@@ -15,8 +72,8 @@ def main():
     df = df.sort_values("date").reset_index(drop=True)
 
     #calculate moving averages
-    df["moving_average_10"] = df["price"].rolling(window=10).mean()
-    df["moving_average_30"] = df["price"].rolling(window=30).mean()
+    df["moving_average_10"] = rolling_mean(df["price"].values, 10)
+    df["moving_average_30"] = rolling_mean(df["price"].values, 30)
 
     #The first 10 and 30 days respectily will not have moving averages because they have no prior prices recorded
     #Delete them as they won't be needed
@@ -33,15 +90,8 @@ def main():
     # plt.plot(df["date"], df["moving_average_30"], label = "MA_30")
     # plt.show()
 
-    def generate_signal(row):
-        if row["moving_average_10"] > row["moving_average_30"]:
-            return "BUY"
-        elif row["moving_average_10"] < row["moving_average_30"]:
-            return "SELL"
-        else:
-            return "HOLD"
-        
-    df["signal"] = df.apply(generate_signal, axis = 1)
+    signals = generate_signals(df["moving_average_10"].values, df["moving_average_30"].values)
+    df["signal"] = signal_names(signals)
 
     print("=" * 60)
     print("Signals have been generated successfully")
@@ -49,127 +99,66 @@ def main():
 
     #BACKTESTING
     starting_cash = 10000
-    cash = starting_cash
-    position = 0        #how many units owned
-    position_history = []   #Track position over time
-    cash_history = []       #Track cash over time
-    equity_history = []     #Track total equity (cash + holdings value)
 
     print("BACKTESTING")
     print("=" * 60)
-    print(f"Starting with ${cash:.2f}")
-
-    for i in range(len(df)):
-        current_price = df.loc[i, "price"]
-        current_signal = df.loc[i, "signal"]
-        current_date = df.loc[i, "date"]
-
-        #Execute trade based on signal
-        if current_signal == "BUY" and position == 0:
-            amoount_to_invest = cash * 0.95  #keep 5 perccent of cash as buffer
-            quantity = int(amoount_to_invest / current_price)
-
-            if quantity > 0:
-                cost = quantity * current_price
-                cash -= cost
-                position = quantity
-                print(f"{current_date.date()} | BUY | {quantity} UNITS AT {current_price:.2f} | Cost: {cost:.2f}")
-        elif current_signal == "SELL" and position > 0:
-            proceeds = position * current_price
-            cash += proceeds
-            print(f"{current_date.date()} | SELL | {position} UNITS AT {current_price:.2f} | Proceeds: {proceeds:.2f}")
-            position = 0
-
-        #Track portfolio state
-        holdings_value = position * current_price
-        total_equity = cash + holdings_value
-
-        #Track the history of position, cash and equity
-        position_history.append(position)
-        cash_history.append(cash)
-        equity_history.append(total_equity)
-
-    #Final liquidation to close any open positions
-    if position > 0:
-        final_price = df.loc[len(df) - 1, "price"]
-        proceeds = position * final_price
-        cash += proceeds
-        print(f"FINAL LIQUIDATION | SELL | {position} UNITS AT {final_price:.2f} | Proceeds: {proceeds:.2f}")
-        position = 0
+    print(f"Starting with ${starting_cash:.2f}")
+
+    result = run_backtest(df["price"].values, signals, starting_cash=starting_cash)
+
+    fills = result.trades[:-1] if result.liquidated else result.trades
+    fill_dates = df["date"].dt.date.values[fills["index"]]
+    for fill, current_date in zip(fills, fill_dates):
+        value = fill["quantity"] * fill["price"]
+        if fill["side"] == BUY:
+            print(f"{current_date} | BUY | {fill['quantity']} UNITS AT {fill['price']:.2f} | Cost: {value:.2f}")
+        else:
+            print(f"{current_date} | SELL | {fill['quantity']} UNITS AT {fill['price']:.2f} | Proceeds: {value:.2f}")
+
+    if result.liquidated:
+        final = result.trades[-1]
+        proceeds = final["quantity"] * final["price"]
+        print(f"FINAL LIQUIDATION | SELL | {final['quantity']} UNITS AT {final['price']:.2f} | Proceeds: {proceeds:.2f}")
 
     #Calculate performance metrics
-    final_equity = cash
+    final_equity = result.final_cash
     total_return = final_equity - starting_cash
     total_return_percent = (total_return / starting_cash) * 100
 
-    #Count trades
-    df["position"] = position_history
-    trades = df[df["signal"].isin(["BUY", "SELL"])]
-    num_trades = len(trades)
-
-    #Calculate win rate by comparing entry and exit prices
-    buy_trades = df[df["signal"] == "BUY"]["price"].values
-    sell_trades = df[df["signal"] == "SELL"]["price"].values
-    min_len = min(len(buy_trades), len(sell_trades))
-    if min_len > 0:
-        winning_trades = sum(sell_trades[:min_len] > buy_trades[:min_len])
-        win_rate = (winning_trades / min_len) * 100
-    else:
-        win_rate = 0
+    df["position"] = result.position
+
+    #Performance analytics: the same online tracker the live engine uses, fed fill by fill
+    tracker = PerformanceTracker(starting_cash, periods_per_year=PERIODS_PER_YEAR)
+    track_performance(tracker, df["price"].values, result.trades, df["date"].values.astype("int64"))
 
     print("BACKTEST RESULTS")
     print("=" * 60)
     print(f"Starting capital: ${starting_cash:.2f}")
     print(f"Ending capital: ${final_equity:.2f}")
     print(f"Total Return: ${total_return:.2f}   {total_return_percent:.2f}%")
-    print(f"Total Trades: ${num_trades}")
-    print(f"Win Rate: {win_rate:.2f}")
+    print_performance(tracker.snapshot())
 
     #**Visulaization**
-    df["equity"] = equity_history
-    df["cash"] = cash_history
-    
-    # Create subplots
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
-    
-    # Plot 1: Price and Moving Averages
-    ax1.plot(df["date"], df["price"], label="Price", color="black", linewidth=1)
-    ax1.plot(df["date"], df["moving_average_10"], label="MA 10", color="blue", linewidth=1)
-    ax1.plot(df["date"], df["moving_average_30"], label="MA 30", color="red", linewidth=1)
-    
-    # Mark buy/sell signals
-    buy_signals = df[df["signal"] == "BUY"]
-    sell_signals = df[df["signal"] == "SELL"]
-    ax1.scatter(buy_signals["date"], buy_signals["price"], color="green", marker="^", s=100, label="BUY", zorder=5)
-    ax1.scatter(sell_signals["date"], sell_signals["price"], color="red", marker="v", s=100, label="SELL", zorder=5)
-    
-    ax1.set_title("Price and Moving Average Crossover Strategy")
-    ax1.set_ylabel("Price ($)")
-    ax1.legend()
-    ax1.grid(True, alpha=0.3)
-    
-    # Plot 2: Portfolio Equity
-    ax2.plot(df["date"], df["equity"], label="Total Equity", color="green", linewidth=2)
-    ax2.axhline(y=starting_cash, color="gray", linestyle="--", label="Starting Capital")
-    ax2.fill_between(df["date"], starting_cash, df["equity"], 
-                      where=(df["equity"] >= starting_cash), alpha=0.3, color="green")
-    ax2.fill_between(df["date"], starting_cash, df["equity"], 
-                      where=(df["equity"] < starting_cash), alpha=0.3, color="red")
-    
-    ax2.set_title("Portfolio Equity Over Time")
-    ax2.set_xlabel("Date")
-    ax2.set_ylabel("Equity ($)")
-    ax2.legend()
-    ax2.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig("backtest_results.png", dpi=150)
+    df["equity"] = result.equity
+    df["cash"] = result.cash
+
+    # Headless and decimated: drawing cost depends on the chart size, not the row count
+    render_report("backtest_results.png", df["date"].values, df["price"].values,
+                  df["moving_average_10"].values, df["moving_average_30"].values,
+                  result.equity, result.trades, starting_cash, method=args.plot_method)
     print(f"\n📊 Chart saved to 'backtest_results.png'")
-    plt.show()
-    
-    df.to_csv("output.csv", index=False)
-    print(f"📁 Full results saved to 'backtest_output.csv'\n")
 
+    export_results("backtest_results.npz", result.trades, starting_cash,
+                   date=df["date"].values, price=df["price"].values,
+                   moving_average_10=df["moving_average_10"].values,
+                   moving_average_30=df["moving_average_30"].values,
+                   signal=signals, position=result.position, equity=result.equity, cash=result.cash)
+    print(f"📁 Full results saved to 'backtest_results.npz'")
+
+    if args.csv:
+        df.to_csv("output.csv", index=False)
+        print(f"📁 Full results saved to 'output.csv'")
+    print()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,179 @@
+"""
+Headless backtest report: decimated chart and compressed columnar export.
+
+The chart only ever draws a few points per horizontal pixel. Long series are
+reduced first, by min/max bucketing (keeps every spike) or LTTB (keeps the
+visual shape), and only real fills are marked, thinned to one marker per
+pixel column. Drawing goes straight to an Agg canvas, so nothing needs a
+display and nothing blocks.
+
+    python report.py backtest_results.npz [--output backtest_results.png]
+"""
+import argparse
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from backtest import BUY, SELL
+
+FIGSIZE = (12, 8)
+DPI = 150
+
+
+def minmax_indices(y, buckets):
+    """
+    Indices of the first, last, minimum and maximum point of each of
+    `buckets` equal-width buckets, in order. Vectorized, O(n).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= 4 * buckets:
+        return np.arange(n)
+    starts = (np.arange(buckets) * n) // buckets
+    counts = np.diff(np.append(starts, n))
+    index = np.arange(n)
+
+    low = np.minimum.reduceat(y, starts)
+    high = np.maximum.reduceat(y, starts)
+    first_low = np.minimum.reduceat(np.where(y == np.repeat(low, counts), index, n), starts)
+    first_high = np.minimum.reduceat(np.where(y == np.repeat(high, counts), index, n), starts)
+
+    keep = np.concatenate((starts, starts + counts - 1, first_low, first_high))
+    return np.unique(keep)
+
+
+def lttb_indices(y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: `threshold` indices whose line looks like
+    the full series. The first and last points are always kept. One pass over
+    the buckets, each bucket handled with array operations.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket (or the last point) is the third corner
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[n - 1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[n - 1]
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def decimate(y, points, method="minmax"):
+    """Indices of about `points` samples of y to plot, by "minmax" or "lttb"."""
+    if method == "lttb":
+        return lttb_indices(y, points)
+    if method == "minmax":
+        return minmax_indices(y, max(1, points // 4))
+    raise ValueError(f"unknown decimation method {method!r}")
+
+
+def thin_markers(rows, n, columns):
+    """At most one of `rows` (sorted row numbers out of n) per pixel column."""
+    rows = np.asarray(rows)
+    if len(rows) <= columns:
+        return rows
+    _, first = np.unique(rows * columns // max(n, 1), return_index=True)
+    return rows[first]
+
+
+def render_report(path, dates, price, short_ma, long_ma, equity, trades, starting_cash,
+                  method="minmax", figsize=FIGSIZE, dpi=DPI):
+    """Draw the price/MA and equity panels with fill markers and save them to path."""
+    n = len(price)
+    columns = int(figsize[0] * dpi)
+    points = 2 * columns
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax1, ax2 = fig.subplots(2, 1)
+
+    # Plot 1: Price and Moving Averages
+    for values, label, color in ((price, "Price", "black"), (short_ma, "MA 10", "blue"), (long_ma, "MA 30", "red")):
+        keep = decimate(values, points, method)
+        ax1.plot(dates[keep], values[keep], label=label, color=color, linewidth=1)
+
+    # Mark the actual fills (the final liquidation is a SELL on the last row)
+    for side, marker, color, label in ((BUY, "^", "green", "BUY"), (SELL, "v", "red", "SELL")):
+        rows = thin_markers(trades["index"][trades["side"] == side], n, columns)
+        ax1.scatter(dates[rows], price[rows], color=color, marker=marker, s=100 if len(rows) < 200 else 20,
+                    label=label, zorder=5)
+
+    ax1.set_title("Price and Moving Average Crossover Strategy")
+    ax1.set_ylabel("Price ($)")
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    # Plot 2: Portfolio Equity
+    keep = decimate(equity, points, method)
+    ax2.plot(dates[keep], equity[keep], label="Total Equity", color="green", linewidth=2)
+    ax2.axhline(y=starting_cash, color="gray", linestyle="--", label="Starting Capital")
+    ax2.fill_between(dates[keep], starting_cash, equity[keep],
+                     where=(equity[keep] >= starting_cash), alpha=0.3, color="green")
+    ax2.fill_between(dates[keep], starting_cash, equity[keep],
+                     where=(equity[keep] < starting_cash), alpha=0.3, color="red")
+
+    ax2.set_title("Portfolio Equity Over Time")
+    ax2.set_xlabel("Date")
+    ax2.set_ylabel("Equity ($)")
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+
+
+def export_results(path, trades, starting_cash, **columns):
+    """
+    Save the per-row result columns and the fills (TRADE_DTYPE) to one
+    compressed .npz file. datetime64 columns are stored as int64 nanoseconds.
+    """
+    arrays = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if values.dtype.kind == "M":
+            values = values.astype("datetime64[ns]").astype(np.int64)
+        arrays[name] = values
+    np.savez_compressed(path, trades=trades, starting_cash=np.float64(starting_cash), **arrays)
+
+
+def load_results(path):
+    """Load an export_results file back into a dict of arrays (dates as datetime64[ns])."""
+    with np.load(path) as data:
+        results = {name: data[name] for name in data.files}
+    results["date"] = results["date"].astype("datetime64[ns]")
+    results["starting_cash"] = float(results["starting_cash"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the chart from an exported backtest")
+    parser.add_argument("results", help=".npz written by main.py")
+    parser.add_argument("--output", default="backtest_results.png")
+    parser.add_argument("--method", choices=("minmax", "lttb"), default="minmax")
+    args = parser.parse_args()
+
+    r = load_results(args.results)
+    render_report(args.output, r["date"], r["price"], r["moving_average_10"], r["moving_average_30"],
+                  r["equity"], r["trades"], r["starting_cash"], method=args.method)
+    print(f"📊 Chart saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtest import generate_signals, run_backtest, signal_names, rolling_mean, track_performance, PerformanceTracker, SIGNAL_NAMES
+
+OUTPUT_COLUMNS = ["date", "price", "moving_average_10", "moving_average_30", "signal", "position", "equity", "cash"]
+TRADE_COLUMNS = ["index", "date", "side", "quantity", "price", "cash"]
+
+
+def read_price_chunks(path, chunk_size=1_000_000):
+    """
+    Yield DataFrames with "date" and "price" columns, chunk_size rows at a time.
+
+    path is either a CSV file with a date column (or an epoch-millisecond
+    timestamp column, as written by generate_data.write_csv) and a price
+    column, or a directory written by generate_data.write_columnar, which is
+    memory-mapped and sliced. Rows must already be in time order.
+    """
+    if os.path.isdir(path):
+        from generate_data import load_columnar
+        columns = load_columnar(path)
+        timestamps, prices = columns["timestamp"], columns["price"]
+        for start in range(0, len(prices), chunk_size):
+            yield pd.DataFrame({
+                "date": pd.to_datetime(timestamps[start:start + chunk_size]),
+                "price": np.asarray(prices[start:start + chunk_size]),
+            })
+        return
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        if "date" in chunk:
+            dates = pd.to_datetime(chunk["date"])
+        else:
+            dates = pd.to_datetime(chunk["timestamp"], unit="ms")
+        yield pd.DataFrame({"date": dates.values, "price": chunk["price"].values})
+
+
+class StreamingBacktest:
+    """
+    The phase_1 moving-average backtest, fed one chunk of prices at a time.
+
+    Across chunks it carries only the last long_window - 1 prices (for the
+    rolling means) and the cash/position book, so memory depends on the chunk
+    size, not the input length. Row for row it produces the same moving
+    averages, signals, positions, cash, equity and fills as running main.py
+    on the whole file; `index` in the fills counts rows after the warm-up
+    rows without a full long window are dropped, as in main.py.
+    """
+
+    def __init__(self, short_window=10, long_window=30, starting_cash=10000, invest_fraction=0.95,
+                 periods_per_year=None):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.starting_cash = starting_cash
+        self.invest_fraction = invest_fraction
+
+        self.cash = starting_cash
+        self.position = 0
+        self.rows = 0          # rows emitted so far (after the warm-up)
+        self.fills = 0
+        self.last_price = None
+        self.last_date = None
+        self.liquidation = None
+        # Equity, drawdown, Sharpe, win rate, ... updated row by row
+        self.analytics = PerformanceTracker(starting_cash, periods_per_year=periods_per_year)
+        self._tail = np.empty(0)
+
+    def process(self, chunk):
+        """
+        Run one chunk (a DataFrame with "date" and "price").
+
+        Returns (rows, trades): the output rows for this chunk in main.py's
+        column layout, and a DataFrame of the fills made in it.
+        """
+        prices = chunk["price"].to_numpy(dtype=np.float64)
+        history = np.concatenate((self._tail, prices))
+        self._tail = history[max(0, len(history) - (self.long_window - 1)):]
+
+        offset = len(history) - len(prices)
+        short_ma = rolling_mean(history, self.short_window)[offset:]
+        long_ma = rolling_mean(history, self.long_window)[offset:]
+        ready = ~(np.isnan(prices) | np.isnan(short_ma) | np.isnan(long_ma))
+
+        dates = chunk["date"].to_numpy()[ready]
+        prices, short_ma, long_ma = prices[ready], short_ma[ready], long_ma[ready]
+        if len(prices) == 0:
+            return pd.DataFrame(columns=OUTPUT_COLUMNS), pd.DataFrame(columns=TRADE_COLUMNS)
+
+        signals = generate_signals(short_ma, long_ma)
+        result = run_backtest(prices, signals, starting_cash=self.cash, invest_fraction=self.invest_fraction,
+                              position=self.position, liquidate=False)
+
+        rows = pd.DataFrame({
+            "date": dates,
+            "price": prices,
+            "moving_average_10": short_ma,
+            "moving_average_30": long_ma,
+            "signal": signal_names(signals),
+            "position": result.position,
+            "equity": result.equity,
+            "cash": result.cash,
+        })
+        trades = self._trade_rows(result.trades, dates)
+        track_performance(self.analytics, prices, result.trades, dates.astype("int64"))
+
+        self.cash = result.final_cash
+        self.position = result.final_position
+        self.rows += len(prices)
+        self.fills += len(result.trades)
+        self.last_price = prices[-1]
+        self.last_date = dates[-1]
+        return rows, trades
+
+    def finish(self):
+        """Close any open position at the last price. Returns the liquidation fill, if any."""
+        if self.position <= 0:
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+        quantity = self.position
+        self.cash += quantity * self.last_price
+        self.position = 0
+        self.liquidation = (quantity, self.last_price)
+        self.analytics.on_fill("SELL", self.last_price, quantity, int(self.last_date.astype("int64")))
+        return pd.DataFrame([(self.rows - 1, self.last_date, "SELL", quantity, self.last_price, self.cash)],
+                            columns=TRADE_COLUMNS)
+
+    def _trade_rows(self, trades, dates):
+        index = trades["index"]
+        return pd.DataFrame({
+            "index": index + self.rows,
+            "date": dates[index],
+            "side": [SIGNAL_NAMES[side] for side in trades["side"]],
+            "quantity": trades["quantity"],
+            "price": trades["price"],
+            "cash": trades["cash"],
+        }, columns=TRADE_COLUMNS)
+
+
+def stream_backtest(input_path, output_path="output.csv", trades_path="trades.csv", chunk_size=1_000_000,
+                    short_window=10, long_window=30, starting_cash=10000, periods_per_year=None):
+    """
+    Run the backtest over input_path chunk by chunk, appending each chunk's
+    rows to output_path and its fills to trades_path as it goes.
+
+    Returns the StreamingBacktest: cash is the final capital and analytics
+    the performance statistics.
+    """
+    backtest = StreamingBacktest(short_window, long_window, starting_cash, periods_per_year=periods_per_year)
+    first = True
+    for chunk in read_price_chunks(input_path, chunk_size):
+        rows, trades = backtest.process(chunk)
+        if len(rows) == 0:
+            continue
+        mode = "w" if first else "a"
+        rows.to_csv(output_path, mode=mode, header=first, index=False)
+        trades.to_csv(trades_path, mode=mode, header=first, index=False)
+        first = False
+
+    if first:
+        raise ValueError(f"{input_path} has fewer than {long_window} prices")
+    backtest.finish().to_csv(trades_path, mode="a", header=False, index=False)
+    return backtest
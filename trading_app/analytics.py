@@ -0,0 +1,224 @@
+"""
+Online performance analytics.
+
+PerformanceTracker follows a book from its fills and mark-to-market prices
+and keeps every statistic up to date with a constant amount of work per
+event: equity and its peak, max drawdown, rolling Sharpe and Sortino over
+the last `window` marks, closed round trips (win rate, average win/loss),
+time in the market and traded notional. snapshot() reads the current values
+without looking at any history.
+
+The live ExecutionEngine and the phase_1 backtest feed the same class.
+"""
+import math
+
+NS_PER_SEC = 1_000_000_000
+
+
+class PerformanceTracker:
+    """
+    Statistics for one book.
+
+    starting_cash is the cash before the first fill. With starting cash,
+    per-mark returns are the relative change in equity; without it (the live
+    engine trades one unit and only tracks PnL) they are the PnL change
+    itself, which leaves the ratios scale-free either way. Sharpe and Sortino
+    are per mark, scaled by sqrt(periods_per_year) when that is given.
+    """
+
+    def __init__(self, starting_cash=0.0, window=500, periods_per_year=None):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.starting_cash = starting_cash
+        self.window = window
+        self.periods_per_year = periods_per_year
+
+        # Book
+        self.cash = float(starting_cash)
+        self.position = 0
+        self.entry_price = 0.0      # average price of the open position
+        self.last_price = None
+        self.equity = float(starting_cash)
+        self.peak_equity = self.equity
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = 0.0
+
+        # Round trips (a trade that brings the position back to flat, or reduces it)
+        self.fills = 0
+        self.turnover = 0.0         # traded notional
+        self.wins = 0
+        self.losses = 0
+        self.win_total = 0.0
+        self.loss_total = 0.0
+        self.realized_pnl = 0.0
+
+        # Time in the market: marks, or nanoseconds when marks carry timestamps
+        self.marks = 0
+        self.exposed_marks = 0
+        self.first_ts_ns = None
+        self.last_ts_ns = None
+        self.exposed_ns = 0
+        self._was_exposed = False   # position held since the previous mark
+
+        # Rolling window of per-mark returns with running sums
+        self._returns = [0.0] * window
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sq = 0.0
+        self._down_sq = 0.0
+
+    def on_fill(self, side, price, quantity=1, ts_ns=None):
+        """Apply a fill (side "BUY" or "SELL", quantity > 0) and mark the book at its price."""
+        signed = quantity if side == "BUY" else -quantity
+        position = self.position
+        self.fills += 1
+        self.turnover += quantity * price
+        self.cash -= signed * price
+
+        if position == 0 or (position > 0) == (signed > 0):
+            # Opening or adding: new average entry price
+            total = position + signed
+            self.entry_price = (self.entry_price * abs(position) + price * quantity) / abs(total)
+        else:
+            # Reducing, closing or flipping: realize PnL on the closed part
+            closed = min(quantity, abs(position))
+            pnl = (price - self.entry_price) * closed * (1 if position > 0 else -1)
+            self.realized_pnl += pnl
+            if pnl > 0:
+                self.wins += 1
+                self.win_total += pnl
+            elif pnl < 0:
+                self.losses += 1
+                self.loss_total += pnl
+            if quantity > abs(position):
+                self.entry_price = price
+            elif quantity == abs(position):
+                self.entry_price = 0.0
+        self.position = position + signed
+        self.mark(price, ts_ns)
+
+    def mark(self, price, ts_ns=None):
+        """Mark the book to `price`; updates equity, drawdown, returns and exposure."""
+        previous_equity = self.equity
+        self.last_price = price
+        equity = self.cash + self.position * price
+        self.equity = equity
+
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        drawdown = self.peak_equity - equity
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+        if self.starting_cash and self.peak_equity > 0 and drawdown / self.peak_equity > self.max_drawdown_pct:
+            self.max_drawdown_pct = drawdown / self.peak_equity
+
+        if ts_ns:
+            if self.last_ts_ns is None:
+                self.first_ts_ns = ts_ns
+            elif self._was_exposed:
+                self.exposed_ns += ts_ns - self.last_ts_ns
+            self.last_ts_ns = ts_ns
+        self._was_exposed = self.position != 0
+        self.marks += 1
+        if self._was_exposed:
+            self.exposed_marks += 1
+
+        if self.marks > 1:
+            if not self.starting_cash:
+                self._add_return(equity - previous_equity)
+            elif previous_equity > 0:
+                self._add_return(equity / previous_equity - 1.0)
+
+    def _add_return(self, r):
+        returns = self._returns
+        pos = self._pos
+        if self._count == self.window:
+            old = returns[pos]
+            self._sum += r - old
+            self._sq += r * r - old * old
+            if old < 0:
+                self._down_sq -= old * old
+        else:
+            self._count += 1
+            self._sum += r
+            self._sq += r * r
+        if r < 0:
+            self._down_sq += r * r
+        returns[pos] = r
+        pos += 1
+        if pos == self.window:
+            pos = 0
+            # Once per lap of the ring, re-add the sums exactly so rounding
+            # from the running add/remove never builds up (O(1) amortized)
+            self._sum = math.fsum(returns)
+            self._sq = math.fsum(x * x for x in returns)
+            self._down_sq = math.fsum(x * x for x in returns if x < 0)
+        self._pos = pos
+
+    def _scale(self):
+        return math.sqrt(self.periods_per_year) if self.periods_per_year else 1.0
+
+    @property
+    def sharpe(self):
+        """Rolling Sharpe ratio (mean / sample std of returns), None until there are 2 returns."""
+        n = self._count
+        if n < 2:
+            return None
+        mean = self._sum / n
+        variance = (self._sq - n * mean * mean) / (n - 1)
+        if variance <= 0:
+            return None
+        return mean / math.sqrt(variance) * self._scale()
+
+    @property
+    def sortino(self):
+        """Rolling Sortino ratio (mean / downside deviation), None without a losing mark."""
+        n = self._count
+        if n < 2:
+            return None
+        downside = self._down_sq / n
+        if downside <= 0:
+            return None
+        mean = self._sum / n
+        return mean / math.sqrt(downside) * self._scale()
+
+    @property
+    def win_rate(self):
+        closed = self.wins + self.losses
+        return (self.wins / closed * 100) if closed else 0.0
+
+    @property
+    def exposure(self):
+        """Fraction of time (or of marks, without timestamps) spent holding a position."""
+        if self.first_ts_ns is not None and self.last_ts_ns > self.first_ts_ns:
+            return self.exposed_ns / (self.last_ts_ns - self.first_ts_ns)
+        return self.exposed_marks / self.marks if self.marks else 0.0
+
+    def snapshot(self):
+        return {
+            "equity": self.equity,
+            "cash": self.cash,
+            "position": self.position,
+            "last_price": self.last_price,
+            "unrealized_pnl": (self.last_price - self.entry_price) * self.position if self.position else 0.0,
+            "realized_pnl": self.realized_pnl,
+            "total_return_pct": (self.equity / self.starting_cash - 1) * 100 if self.starting_cash else None,
+            "peak_equity": self.peak_equity,
+            "max_drawdown": self.max_drawdown,
+            "max_drawdown_pct": self.max_drawdown_pct * 100 if self.starting_cash else None,
+            "sharpe": self.sharpe,
+            "sortino": self.sortino,
+            "window": self._count,
+            "fills": self.fills,
+            "round_trips": self.wins + self.losses,
+            "wins": self.wins,
+            "losses": self.losses,
+            "win_rate": self.win_rate,
+            "avg_win": self.win_total / self.wins if self.wins else 0.0,
+            "avg_loss": self.loss_total / self.losses if self.losses else 0.0,
+            "exposure_pct": self.exposure * 100,
+            "exposed_seconds": self.exposed_ns / NS_PER_SEC,
+            "turnover": self.turnover,
+            "turnover_ratio": self.turnover / self.starting_cash if self.starting_cash else None,
+        }
@@ -1,11 +1,12 @@
 import asyncio
-import json
+import os
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 
 from fastapi.responses import StreamingResponse
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -13,9 +14,21 @@ import zmq
 import zmq.asyncio
 
 from strategy import MovingAverageStrategy
-from execution import ExecutionEngine
+from execution import ExecutionEngine, order_id_sequence
 from engine import TradingEngine
-from scraper import stream_binance
+from analytics import PerformanceTracker
+from bars import BarStage
+from dispatch import StrategyLoop
+from shards import ShardConfig, close_snapshots
+from snapshot import bar_aggregators, warm_start
+from gateway import CPP_SIGNAL_ENDPOINT, OrderGateway
+from history import TradeHistory
+from pricehistory import PriceHistory, parse_resolution
+from metrics import PipelineMetrics
+from hub import BroadcastHub, Event
+from protocol import decode_confirmation, symbol_ids
+from scraper import BINANCE_WS_URL, IngestStats, TradeDecoder, stream_binance_multi
+from tickstore import TickRecorder
 
 app = FastAPI()
 
@@ -27,30 +40,115 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-trades_history = []           
+# Comma-separated symbols to trade (one combined Binance stream)
+SYMBOLS = [s.strip().lower() for s in os.environ.get("SYMBOLS", "btcusdt").split(",") if s.strip()]
+# Wire ids, so C++ keeps a position per symbol and confirmations say whose fill they are
+SYMBOL_IDS = symbol_ids(SYMBOLS)
+SYMBOL_NAMES = {i: symbol for symbol, i in SYMBOL_IDS.items()}
+
+# Where the strategies run: "inline" on the websocket reader, or behind a bounded
+# tick queue in a "task", "thread" or "process" (see dispatch.py)
+STRATEGY_MODE = os.environ.get("STRATEGY_MODE", "inline")
+TICK_QUEUE_POLICY = os.environ.get("TICK_QUEUE_POLICY", "all")
+TICK_QUEUE_SIZE = int(os.environ.get("TICK_QUEUE_SIZE", "10000"))
+
+# Strategy/execution snapshots for warm restarts (unset = start cold), see snapshot.py
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR") or None
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", "5"))
+
+# Run the strategies on completed bars ("time:60", "tick:100", "volume:5", see bars.py)
+# instead of on every trade; unset = every trade
+BARS = os.environ.get("BARS") or None
+
+# Where the trade stream and the C++ engine are; overridden to run against a
+# local exchange and C++ stand-in (see localexchange.py, cpp_standin.py, loadtest.py)
+EXCHANGE_WS_URL = os.environ.get("EXCHANGE_WS_URL", BINANCE_WS_URL)
+CPP_SIGNAL_ENDPOINT = os.environ.get("CPP_SIGNAL_ENDPOINT", CPP_SIGNAL_ENDPOINT)
+CPP_CONFIRMATION_BIND = os.environ.get("CPP_CONFIRMATION_BIND", "tcp://*:5556")
+
+# Ingest counters (messages/sec, batch sizes, exchange lag), served at /ingest
+ingest_stats = IngestStats()
+
+# The running StrategyLoop, when STRATEGY_MODE is not "inline"
+strategy_loops = {}
+
+# Stage latencies, tick/signal counts and queue depths, served at /metrics. With
+# STRATEGY_MODE=process the strategy, execution and confirmation stages stay
+# empty: the strategies and their gateway run in the child, which keeps none
+pipeline_metrics = PipelineMetrics()
+
+# Tick recorders of the running strategy, by symbol
+tick_recorders = {}
+
+# Live performance of each symbol's book (equity, drawdown, Sharpe, ...), served at /status
+performance = {}
+
+# Newest trades in memory; older ones optionally spill to disk (TRADE_SPILL_PATH)
+trades_history = TradeHistory(
+    capacity=int(os.environ.get("TRADE_HISTORY_SIZE", "10000")),
+    spill_path=os.environ.get("TRADE_SPILL_PATH"),
+)
+# 1s/1m/1h OHLC of every symbol in fixed memory, fed by the strategy runner, served at /prices
+price_history = PriceHistory(SYMBOLS)
+
 system_status = {
     "status": "STARTING",
-    "position": 0,
+    "position": 0,                                  # units held over all symbols
+    "positions": {symbol: 0 for symbol in SYMBOLS},
+    "symbol_pnl": {symbol: 0.0 for symbol in SYMBOLS},
     "pnl": 0.0,
     "current_price": 0.0,
     "total_trades": 0
 }
+
+# Fans trades and status changes out to every open dashboard (SSE). Each
+# client has its own bounded queue; the policy decides what a slow one loses.
+sse_hub = BroadcastHub(
+    maxsize=int(os.environ.get("SSE_QUEUE_SIZE", "256")),
+    policy=os.environ.get("SSE_SLOW_CONSUMER_POLICY", "coalesce"),
+)
+
+
+def update_status(**changes):
+    """Apply changes to system_status and broadcast only the fields that changed."""
+    delta = {key: value for key, value in changes.items() if system_status.get(key) != value}
+    if delta:
+        system_status.update(delta)
+        sse_hub.publish("status", delta)
 # ZMQ Set-up
 ctx = zmq.asyncio.Context()
 
-# Send signals to C++
-cpp_sender = ctx.socket(zmq.PUSH)
-cpp_sender.connect("tcp://localhost:5555")
+# Send signals to C++ (one long-lived socket, owned by the gateway)
+order_gateway = OrderGateway(endpoint=CPP_SIGNAL_ENDPOINT, context=ctx, metrics=pipeline_metrics)
+
+# Queue depths, read at scrape time
+pipeline_metrics.registry.gauge("gateway_queue_depth", "Orders waiting in the gateway queue",
+                                lambda: order_gateway.queue_depth)
+pipeline_metrics.registry.gauge("recorder_queue_depth", "Trades waiting to be written to the tick store",
+                                lambda: sum(r.queue_depth for r in tick_recorders.values()))
+pipeline_metrics.registry.gauge("sse_max_queue_depth", "Deepest SSE client queue",
+                                lambda: sse_hub.stats()["max_queue_depth"])
+pipeline_metrics.registry.gauge("sse_subscribers", "Connected SSE clients", lambda: len(sse_hub.subscribers))
+for _name, _help in (("depth", "Ticks (or symbols) waiting for the strategy"),
+                     ("high_water", "Deepest the tick queue has been"),
+                     ("dropped", "Ticks dropped because the tick queue was full"),
+                     ("conflated", "Ticks folded into a newer tick or interval summary")):
+    pipeline_metrics.registry.gauge(f"tick_queue_{_name}", _help,
+                                    lambda key=_name: sum(loop.queue.stats()[key] for loop in strategy_loops.values()))
 
 # Receive confirmations FROM C++
 cpp_receiver = ctx.socket(zmq.PULL)
-cpp_receiver.bind("tcp://*:5556")  # C++ will send confirmations here
+cpp_receiver.bind(CPP_CONFIRMATION_BIND)  # C++ will send confirmations here
 
 
 async def cpp_confirmation_listener():
     while True:
         try:
-            msg = await cpp_receiver.recv_json()
+            # Binary confirmations are unpacked straight from the frame; JSON still works
+            frame = await cpp_receiver.recv(copy=False)
+            msg = decode_confirmation(frame.buffer)
+            symbol = msg.get("symbol") or SYMBOL_NAMES.get(msg.get("symbol_id"))
+            pipeline_metrics.order_confirmed(msg.get("seq"), time.time_ns())
             print(f"Received from C++: {msg}")
 
             # Add to trade history
@@ -59,66 +157,98 @@ async def cpp_confirmation_listener():
                 "action": msg.get("action"),
                 "price": msg.get("price"),
                 "pnl": msg.get("pnl", 0.0),
+                "position": msg.get("position"),
+                "total_pnl": msg.get("total_pnl"),
+                "seq": msg.get("seq"),
+                "symbol": symbol,
                 "source": "C++"
             }
 
             trades_history.append(trade_record)
 
+            # Push to every connected dashboard; the history id doubles as the SSE event id
+            sse_hub.publish("message", trade_record, trade_record["id"])
+
             # Update system status
-            system_status["total_trades"] = len(trades_history)
-            if msg.get("position") is not None:
-                system_status["position"] = msg["position"]
+            changes = {"total_trades": trades_history.last_id}
+            if symbol in system_status["positions"]:
+                # New dicts, so update_status sees the change and broadcasts them
+                if msg.get("position") is not None:
+                    positions = {**system_status["positions"], symbol: msg["position"]}
+                    changes["positions"] = positions
+                    changes["position"] = sum(positions.values())
+                if msg.get("pnl"):
+                    symbol_pnl = system_status["symbol_pnl"]
+                    changes["symbol_pnl"] = {**symbol_pnl, symbol: symbol_pnl[symbol] + msg["pnl"]}
             if msg.get("total_pnl") is not None:
-                system_status["pnl"] = msg["total_pnl"]
+                changes["pnl"] = msg["total_pnl"]
+            update_status(**changes)
 
             print(f"Trade added to dashboard: {trade_record}")
 
-            # Push to SSE queue for live dashboard updates
-            await web_update_queue.put(msg)
-
         except Exception as e:
             print(f"Error in C++ listener: {e}")
             await asyncio.sleep(1)
 
-async def strategy_runner():    
-    strategy = MovingAverageStrategy(2, 50)  
-    execution = ExecutionEngine()
-    engine = TradingEngine(strategy, execution)
-
-    # Override execution to send to C++
-    original_on_signal = execution.on_signal
-
-    def patched_on_signal(signal, tick):
-        """Send signals to C++ engine"""
-        trade = original_on_signal(signal, tick)
-        
-        if trade:
-            # Prepare message for C++
-            cpp_message = {
-                "action": trade["action"],
-                "price": trade["price"],
-                "time": trade["time"]
-            }
-            
-            # Send to C++
-            asyncio.create_task(send_to_cpp(cpp_message))
-            
-            # Log signal sent (not the actual trade - C++ will confirm)
-            print(f"📤 Signal sent to C++: {trade['action']} @ ${trade['price']}")
-        
-        return trade
-
-    execution.on_signal = patched_on_signal
-
-    # Run Binance streaming
-    await stream_binance("btcusdt", engine)
-
-async def send_to_cpp(message):
-    """Send message to C++ engine"""
+async def strategy_runner():
+    # One strategy/execution pair per symbol, all on one combined stream.
+    # The engines share the gateway, so they share one order id sequence,
+    # started from the clock so a restart doesn't reuse earlier ids.
+    # The process mode builds its engines in the child, which sends their
+    # analytics back (StrategyLoop.analytics), so none are built here
+    order_ids = order_id_sequence()
+    engines = {}
+    engine_symbols = SYMBOLS if STRATEGY_MODE != "process" else []
+    for symbol in engine_symbols:
+        strategy = MovingAverageStrategy(2, 50)
+        # Fills are sent to C++ by the gateway (C++ will confirm them)
+        performance[symbol] = PerformanceTracker(window=int(os.environ.get("ANALYTICS_WINDOW", "500")))
+        execution = ExecutionEngine(gateway=order_gateway, symbol=symbol, order_ids=order_ids,
+                                    analytics=performance[symbol], symbol_id=SYMBOL_IDS[symbol])
+        engines[symbol] = TradingEngine(strategy, execution, metrics=pipeline_metrics)
+
+    # Pick up where the last run stopped: snapshot first, then the ticks recorded since
+    tick_store_dir = os.environ.get("TICK_STORE_DIR", "tick_data")
+    writers = {}
+    if SNAPSHOT_DIR and STRATEGY_MODE != "process":
+        writers = warm_start(engines, SNAPSHOT_DIR, tick_store_dir, SNAPSHOT_INTERVAL, bars=BARS)
+    targets = writers or engines
+
+    # Run Binance streaming, recording every trade
+    tick_recorders.update({symbol: TickRecorder(tick_store_dir, symbol) for symbol in SYMBOLS})
+    if STRATEGY_MODE != "inline":
+        # The process mode builds (and restores) its own engines and gateway from this config
+        config = ShardConfig(symbols=SYMBOLS, strategy_params={"short_window": 2, "long_window": 50},
+                             endpoint=CPP_SIGNAL_ENDPOINT, tick_store_dir=tick_store_dir,
+                             snapshot_dir=SNAPSHOT_DIR, snapshot_interval=SNAPSHOT_INTERVAL, bars=BARS,
+                             symbol_ids=SYMBOL_IDS)
+        loop = strategy_loops["main"] = StrategyLoop(targets, policy=TICK_QUEUE_POLICY, maxsize=TICK_QUEUE_SIZE,
+                                                     mode=STRATEGY_MODE, config=config)
+        await loop.start()
+        targets = loop.proxies
+    if BARS:
+        # Trades are still recorded one by one; the strategies only see completed bars.
+        # After a warm restart the bar in progress at shutdown is finished first
+        if STRATEGY_MODE == "process":
+            resumed = strategy_loops["main"].bar_aggregators
+        else:
+            resumed = bar_aggregators(writers)
+        targets = {symbol: BarStage(target, BARS, resumed.get(symbol)) for symbol, target in targets.items()}
+    # Outermost, so the price history sees every trade whatever the strategies run on
+    targets = price_history.tap(targets)
+    update_status(status="RUNNING")
     try:
-        await cpp_sender.send_json(message)
-    except Exception as e:
-        print(f"❌ Error sending to C++: {e}")
+        decoder = TradeDecoder(os.environ.get("TRADE_DECODER", "auto"))
+        await stream_binance_multi(targets, tick_recorders, base_url=EXCHANGE_WS_URL, decoder=decoder,
+                                   stats=ingest_stats, metrics=pipeline_metrics)
+    finally:
+        for loop in strategy_loops.values():
+            await loop.stop()
+        strategy_loops.clear()
+        close_snapshots(writers)
+        for recorder in tick_recorders.values():
+            recorder.close()
+        tick_recorders.clear()
 
 # -----------------------------
 # Lifespan for background tasks
@@ -128,7 +258,9 @@ async def lifespan(app: FastAPI):
     print("\n" + "="*70)
     print("STARTING WEB DASHBOARD")
     print("="*70)
-    
+
+    await order_gateway.start()
+
     tasks = [
         asyncio.create_task(strategy_runner()),
         asyncio.create_task(cpp_confirmation_listener()),  # KEY: Listen to C++
@@ -144,6 +276,8 @@ async def lifespan(app: FastAPI):
         print("\nshutting down...")
         for t in tasks:
             t.cancel()
+        await order_gateway.close()
+        trades_history.close()
 
 app.router.lifespan_context = lifespan
 
@@ -159,25 +293,129 @@ async def index():
     return HTMLResponse(content=html_content)
 
 @app.get("/trades")
-async def get_trades():
-    """Return all trades"""
-    return JSONResponse(content=trades_history)
+async def get_trades(since_id: int = 0, limit: int = 100, start: str | None = None,
+                     end: str | None = None, action: str | None = None):
+    """
+    Return a page of trades with id > since_id, oldest first.
+    Pass next_cursor back as since_id to fetch the next page.
+    """
+    limit = max(1, min(limit, 1000))
+    trades, next_cursor = trades_history.page(since_id, limit, start=start, end=end, action=action)
+    return JSONResponse(content={"trades": trades, "next_cursor": next_cursor})
+
+@app.get("/trades/stats")
+async def get_trade_stats():
+    """Return running trade aggregates (count, realized PnL, win/loss)"""
+    return JSONResponse(content=trades_history.stats())
 
 @app.get("/status")
 async def get_status():
-    """Return system status"""
-    return JSONResponse(content=system_status)
-
-# Queue to hold updates for the SSE stream
-web_update_queue = asyncio.Queue()
+    """Return system status, with the live performance snapshot of every symbol"""
+    if STRATEGY_MODE == "process":
+        # The books live in the strategy process, which reports their snapshots every second
+        loop = strategy_loops.get("main")
+        analytics = loop.analytics if loop is not None else {}
+    else:
+        analytics = {symbol: tracker.snapshot() for symbol, tracker in performance.items()}
+    return JSONResponse(content={**system_status, "analytics": analytics})
+
+@app.get("/prices")
+async def get_prices(request: Request, symbol: str | None = None, start: float | None = Query(None, alias="from"),
+                     to: float | None = None, resolution: str | None = None):
+    """
+    OHLC price history of a symbol between from and to (epoch seconds;
+    default: the last hour), as columns t/o/h/l/c. Unless a resolution
+    (30, 30s, 5m, 1h, ...) is given, one is chosen so the response stays
+    within a few thousand points. Send the ETag back as If-None-Match to
+    get 304 Not Modified while the range is unchanged.
+    """
+    symbol = (symbol or SYMBOLS[0]).lower()
+    pyramid = price_history.pyramids.get(symbol)
+    if pyramid is None:
+        return JSONResponse(status_code=404, content={"error": f"unknown symbol {symbol}"})
+    to = time.time() if to is None else to
+    start = to - 3600 if start is None else start
+    try:
+        requested = parse_resolution(resolution) if resolution else None
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if start > to:
+        return JSONResponse(status_code=400, content={"error": "from must not be after to"})
+
+    resolution, level = pyramid.choose(start, to, requested)
+    etag = pyramid.etag(symbol, start, to, resolution, level, price_history.instance)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    prices = pyramid.query(start, to, resolution, level)
+    return JSONResponse(content={"symbol": symbol, "from": start, "to": to, "resolution": resolution, **prices},
+                        headers=headers)
+
+@app.get("/gateway")
+async def get_gateway():
+    """Return order gateway counters, queue depth and send latency"""
+    return JSONResponse(content=order_gateway.stats())
+
+@app.get("/ingest")
+async def get_ingest_stats():
+    """Return market data ingest counters and the strategy tick queue's counters"""
+    stats = ingest_stats.stats()
+    if strategy_loops:
+        stats["queue"] = strategy_loops["main"].stats()
+    return JSONResponse(content=stats)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint: stage latency histograms, tick/signal counts, queue depths"""
+    return PlainTextResponse(pipeline_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/latency")
+async def get_latency():
+    """Return latency percentiles per pipeline stage, in microseconds"""
+    return JSONResponse(content=pipeline_metrics.summary())
+
+@app.get("/sse")
+async def get_sse_stats():
+    """Return SSE hub counters (subscribers, published, dropped, deepest queue)"""
+    return JSONResponse(content=sse_hub.stats())
 
 @app.get("/trades/stream")
-async def trade_stream():
+async def trade_stream(request: Request):
+    """
+    Live trades (default SSE events, id = trade id) and status deltas
+    ("status" events). A reconnecting client sends Last-Event-ID and first
+    gets the trades it missed from the history.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+
     async def event_generator():
-        while True:
-            # Wait for a new trade confirmation from the queue
-            trade_data = await web_update_queue.get()
-            yield f"data: {json.dumps(trade_data)}\n\n"
+        # Subscribe before replaying so nothing published meanwhile is lost
+        sub = sse_hub.subscribe()
+        try:
+            last_sent = 0
+            if last_event_id.isdigit():
+                cursor = int(last_event_id)
+                while True:
+                    trades, next_cursor = trades_history.page(cursor, limit=500)
+                    for trade in trades:
+                        yield Event("message", trade, trade["id"]).frame
+                        last_sent = trade["id"]
+                    if next_cursor is None:
+                        break
+                    cursor = next_cursor
+
+            # Full status first, deltas after that
+            yield Event("status", dict(system_status)).frame
+
+            while True:
+                event = await sub.get()
+                if event is None:
+                    break  # dropped as a slow consumer; the browser reconnects and resumes
+                if event.type == "message" and event.id is not None and event.id <= last_sent:
+                    continue
+                yield event.frame
+        finally:
+            sub.close()
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
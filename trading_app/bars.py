@@ -0,0 +1,330 @@
+"""
+Tick-to-bar aggregation, live (O(1) per tick) and in bulk (vectorized).
+
+Three bar types, named by a spec string:
+
+    "time:<seconds>"    one bar per clock interval, aligned to the epoch
+                        (bucket = ts // interval); a bar completes when the
+                        first trade of a later interval arrives
+    "tick:<n>"          one bar per n trades
+    "volume:<size>"     with cum the running traded quantity, a bar
+                        completes on the trade where floor(cum / size)
+                        increases; that trade belongs to the bar it closes
+                        (one trade spanning several multiples still closes
+                        only one bar)
+
+Time bars are aligned to the clock; tick and volume bars count from where
+aggregation starts (process start live, the first tick of the range in
+bulk), so the two agree from a common starting trade. resume_aggregator()
+picks a live aggregator up from recorded ticks, so after a warm restart the
+bar that was in progress at shutdown is finished with the trades recorded
+for it. Time and tick bars then carry on exactly as an uninterrupted run
+would; volume bars restart their running volume at the last completed bar,
+so the remainder past its multiple of `size` is not carried over.
+
+BarStage sits between the scraper and an engine: it takes batches of ticks
+and passes the completed bars (models.Bar, a Tick at the bar's close) on to
+engine.on_ticks, so strategies run per bar instead of per trade.
+ticks_to_bars() builds the same completed bars from recorded arrays, with
+the same arithmetic (the running volume is a left-to-right cumulative sum in
+both), so live trading and backtests share one definition of a bar:
+
+    python bars.py --store tick_data --symbol btcusdt --bars time:60 --output bars.csv
+"""
+import argparse
+import math
+
+import numpy as np
+
+from models import Bar, Tick
+
+BAR_KINDS = ("time", "tick", "volume")
+
+
+def parse_bar_spec(spec):
+    """Split "time:60" / "tick:100" / "volume:2.5" into (kind, size)."""
+    kind, _, size = spec.partition(":")
+    if kind not in BAR_KINDS or not size:
+        raise ValueError(f"bar spec must look like 'time:<seconds>', 'tick:<n>' or 'volume:<size>', got {spec!r}")
+    size = float(size)
+    if size <= 0:
+        raise ValueError("bar size must be positive")
+    if kind == "tick" and size != int(size):
+        raise ValueError("tick bars need a whole number of trades")
+    return kind, size
+
+
+class _BarBuilder:
+    """The bar in progress; subclasses decide when it is complete."""
+
+    def __init__(self):
+        self.count = 0
+        self.bars = 0
+
+    def _start(self, tick):
+        price = tick.price
+        self.open = self.high = self.low = self.close = price
+        self.volume = tick.qty
+        self.count = 1
+        self.start_ns = self.end_ns = tick.exchange_ts_ns
+        self.recv_ts_ns = tick.recv_ts_ns
+
+    def _add(self, tick):
+        if not self.count:
+            self._start(tick)
+            return
+        price = tick.price
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += tick.qty
+        self.count += 1
+        self.end_ns = tick.exchange_ts_ns
+        self.recv_ts_ns = tick.recv_ts_ns
+
+    def _emit(self):
+        self.bars += 1
+        bar = Bar(self.open, self.high, self.low, self.close, self.volume, self.count,
+                  self.start_ns, self.end_ns, self.recv_ts_ns)
+        self.count = 0
+        return bar
+
+
+class TimeBars(_BarBuilder):
+    def __init__(self, seconds):
+        super().__init__()
+        self.interval_ns = int(seconds * 1_000_000_000)
+        self.bucket = None
+
+    def update(self, tick):
+        """Add one tick; returns the bar it completed, or None."""
+        bucket = tick.exchange_ts_ns // self.interval_ns
+        bar = None
+        if bucket != self.bucket:
+            if self.count:
+                bar = self._emit()
+            self.bucket = bucket
+        self._add(tick)
+        return bar
+
+
+class TickBars(_BarBuilder):
+    def __init__(self, n):
+        super().__init__()
+        self.size = int(n)
+
+    def update(self, tick):
+        self._add(tick)
+        return self._emit() if self.count == self.size else None
+
+
+class VolumeBars(_BarBuilder):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+        self.cum = 0.0
+        self.level = 0
+
+    def update(self, tick):
+        self._add(tick)
+        self.cum += tick.qty
+        level = math.floor(self.cum / self.size)
+        if level > self.level:
+            self.level = level
+            return self._emit()
+        return None
+
+
+def make_aggregator(spec):
+    """A live aggregator (TimeBars / TickBars / VolumeBars) for a bar spec string."""
+    kind, size = parse_bar_spec(spec)
+    if kind == "time":
+        return TimeBars(size)
+    if kind == "tick":
+        return TickBars(size)
+    return VolumeBars(size)
+
+
+class BarStage:
+    """
+    Stands in for an engine on the ingest side: ticks go into the
+    aggregator, completed bars go on to target.on_ticks (target is an
+    engine, a SnapshotWriter or a queue proxy). Bars complete only when a
+    trade arrives, so a quiet market delays a time bar's close. Pass
+    `aggregator` (see resume_aggregator) to carry on a bar in progress.
+    """
+
+    def __init__(self, target, spec, aggregator=None):
+        self.target = target
+        self.spec = spec
+        self.aggregator = aggregator if aggregator is not None else make_aggregator(spec)
+        self.ticks = 0
+
+    def on_ticks(self, ticks):
+        update = self.aggregator.update
+        bars = []
+        for tick in ticks:
+            bar = update(tick)
+            if bar is not None:
+                bars.append(bar)
+        self.ticks += len(ticks)
+        if bars:
+            return self.target.on_ticks(bars)
+        return None
+
+    def stats(self):
+        return {"spec": self.spec, "ticks": self.ticks, "bars": self.aggregator.bars}
+
+
+def bar_ids(ts_ns, qty, spec):
+    """
+    Bar number of every tick (non-decreasing from 0) and whether the last
+    bar is complete, by the same rules as the live aggregators.
+    """
+    kind, size = parse_bar_spec(spec)
+    n = len(ts_ns)
+    if kind == "time":
+        bucket = np.asarray(ts_ns, dtype=np.int64) // int(size * 1_000_000_000)
+        ids = np.zeros(n, dtype=np.int64)
+        if n:
+            ids[1:] = np.cumsum(bucket[1:] != bucket[:-1])
+        return ids, False
+    if kind == "tick":
+        size = int(size)
+        return np.arange(n, dtype=np.int64) // size, n > 0 and n % size == 0
+
+    level = np.floor(np.cumsum(np.asarray(qty, dtype=np.float64)) / size)
+    # Volume levels never go down, so a tick closes a bar where its level rises
+    closes = np.empty(n, dtype=bool)
+    if n:
+        closes[0] = level[0] > 0
+        closes[1:] = level[1:] > level[:-1]
+    ids = np.zeros(n, dtype=np.int64)
+    if n:
+        ids[1:] = np.cumsum(closes[:-1])
+    return ids, bool(n and closes[-1])
+
+
+def _bar_volumes(qty, starts, lengths):
+    """
+    Sum of qty over each bar, added left to right like the live aggregator
+    so the volumes come out bit-identical (np.add.reduceat sums long
+    segments pairwise). Loops over whichever is fewer, the bars or the
+    positions within the longest bar; each step is one vectorized add.
+    """
+    if len(starts) <= lengths.max():
+        return np.array([np.cumsum(qty[start:start + length])[-1] for start, length in zip(starts, lengths)],
+                        dtype=np.float64)
+    # Longest bars first, so the bars still running at step j are a prefix
+    order = np.argsort(-lengths, kind="stable")
+    starts = starts[order]
+    remaining = -lengths[order]
+    totals = qty[starts].copy()
+    for j in range(1, -remaining[0]):
+        k = np.searchsorted(remaining, -j)
+        totals[:k] += qty[starts[:k] + j]
+    volume = np.empty_like(totals)
+    volume[order] = totals
+    return volume
+
+
+def ticks_to_bars(ts_ns, price, qty, spec, partial=False):
+    """
+    Completed bars of recorded ticks as a dict of arrays: open, high, low,
+    close, volume, count, start_ns, end_ns. With partial=True the last,
+    incomplete bar is included too.
+    """
+    ts_ns = np.asarray(ts_ns, dtype=np.int64)
+    price = np.asarray(price, dtype=np.float64)
+    qty = np.asarray(qty, dtype=np.float64)
+    ids, last_complete = bar_ids(ts_ns, qty, spec)
+    n = len(ids)
+    if n == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {"open": empty, "high": empty, "low": empty, "close": empty, "volume": empty,
+                "count": np.empty(0, dtype=np.int64), "start_ns": np.empty(0, dtype=np.int64),
+                "end_ns": np.empty(0, dtype=np.int64)}
+
+    starts = np.flatnonzero(np.diff(ids, prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    volume = _bar_volumes(qty, starts, ends - starts + 1)
+    bars = {
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends],
+        "volume": volume,
+        "count": ends - starts + 1,
+        "start_ns": ts_ns[starts],
+        "end_ns": ts_ns[ends],
+    }
+    if not partial and not last_complete:
+        bars = {name: column[:-1] for name, column in bars.items()}
+    return bars
+
+
+def resume_aggregator(spec, ts_ns, price, qty):
+    """
+    A live aggregator that has already taken in these recorded ticks: their
+    completed bars are dropped (see ticks_to_bars) and their unfinished last
+    bar is the bar in progress, so live ticks carry on exactly as the same
+    trades would in ticks_to_bars().
+    """
+    aggregator = make_aggregator(spec)
+    qty = np.asarray(qty, dtype=np.float64)
+    ids, last_complete = bar_ids(ts_ns, qty, spec)
+    n = len(ids)
+    start = n if n == 0 or last_complete else int(np.searchsorted(ids, ids[-1]))
+    if isinstance(aggregator, VolumeBars) and start:
+        # np.cumsum adds left to right, as VolumeBars.update does
+        aggregator.cum = float(np.cumsum(qty[:start])[-1])
+        aggregator.level = math.floor(aggregator.cum / aggregator.size)
+    for ts, p, q in zip(np.asarray(ts_ns, dtype=np.int64)[start:].tolist(),
+                        np.asarray(price, dtype=np.float64)[start:].tolist(), qty[start:].tolist()):
+        aggregator.update(Tick(p, ts, qty=q))
+    return aggregator
+
+
+def bar_objects(bars):
+    """The rows of a ticks_to_bars() result as Bar objects (recv_ts_ns unknown, 0)."""
+    columns = [bars[name].tolist() for name in ("open", "high", "low", "close", "volume", "count",
+                                                "start_ns", "end_ns")]
+    return [Bar(*row) for row in zip(*columns)]
+
+
+def store_bars(store, spec, start_ns=0, end_ns=2**63 - 1):
+    """Completed bars of the ticks recorded in [start_ns, end_ns), as ticks_to_bars() columns."""
+    ticks = store.query(start_ns, end_ns)
+    return ticks_to_bars(ticks["ts_ns"], ticks["price"], ticks["qty"], spec)
+
+
+def main():
+    from tickstore import TickStore
+
+    parser = argparse.ArgumentParser(description="Aggregate recorded ticks into bars (CSV for the backtester)")
+    parser.add_argument("--store", default="tick_data", help="tick store directory")
+    parser.add_argument("--symbol", default="btcusdt")
+    parser.add_argument("--bars", required=True, help="bar spec: time:<seconds>, tick:<n> or volume:<size>")
+    parser.add_argument("--start", type=int, default=None, help="range start, epoch ms")
+    parser.add_argument("--end", type=int, default=None, help="range end, epoch ms")
+    parser.add_argument("--output", default="bars.csv")
+    args = parser.parse_args()
+
+    start_ns = (args.start or 0) * 1_000_000
+    end_ns = args.end * 1_000_000 if args.end is not None else 2**63 - 1
+    bars = store_bars(TickStore(args.store, args.symbol), args.bars, start_ns, end_ns)
+
+    # "date" and "price" (the close) are the columns phase_1's backtester reads
+    dates = (bars["end_ns"] // 1_000_000).astype("datetime64[ms]").astype(str)
+    with open(args.output, "w") as f:
+        f.write("date,price,open,high,low,close,volume,count\n")
+        columns = [bars[name].tolist() for name in ("close", "open", "high", "low", "close", "volume", "count")]
+        for row in zip(dates.tolist(), *columns):
+            f.write("{},{!r},{!r},{!r},{!r},{!r},{!r},{}\n".format(*row))
+    print(f"📊 {len(bars['close']):,} {args.bars} bars written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+In-process stand-in for the C++ execution engine (main.cpp).
+
+Binds the signal PULL socket, keeps the same one-unit book per symbol as
+main.cpp (BUY when flat, SELL when long, anything else ignored; the symbol
+is the wire id, or the "symbol" field of a JSON signal) and answers every
+executed signal on the confirmation PUSH socket, in binary or JSON to match
+the signal. Runs on its own thread with its own ZeroMQ context, so
+benchmarks and load tests can exercise the real sockets without a C++ build.
+
+Each confirmation goes out `latency` seconds (plus up to `jitter` more,
+uniformly) after its signal arrived. Signals keep being consumed while
+confirmations wait, and confirmations keep their order, like the C++ fill
+loop. With record=True it keeps, per signal, the lag from the signal's
+timestamp to its arrival (signal_lag) and each confirmation's send time by
+sequence id (confirmed_at), for load tests.
+
+    with CppStandIn() as cpp:        # tcp://*:5555 in, tcp://localhost:5556 out
+        ...
+
+    python cpp_standin.py --latency 0.002
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import zmq
+
+from metrics import Histogram
+from protocol import decode_signal, encode_confirmation, is_binary
+
+SIGNAL_BIND = "tcp://*:5555"
+CONFIRMATION_CONNECT = "tcp://localhost:5556"
+
+
+class CppStandIn:
+    def __init__(self, signal_endpoint=SIGNAL_BIND, confirmation_endpoint=CONFIRMATION_CONNECT,
+                 latency=0.0, context=None, jitter=0.0, record=False, seed=None):
+        self.signal_endpoint = signal_endpoint
+        self.confirmation_endpoint = confirmation_endpoint
+        self.latency = latency          # seconds to wait before each confirmation (simulated fill time)
+        self.jitter = jitter            # up to this many extra seconds, uniformly
+        self.context = context or zmq.Context()
+        self._own_context = context is None
+        self._random = random.Random(seed)
+        self._delayed = deque()         # (due, seq, confirmation), due times non-decreasing
+
+        self.record = record
+        self.signal_lag = Histogram("standin_signal_lag", "Signal timestamp to arrival at the stand-in")
+        self.confirmed_at = {}          # seq -> time.time_ns() the confirmation was sent (record=True)
+
+        self.positions = {}             # symbol -> (position, entry price)
+        self.total_pnl = 0.0
+        self.received = 0
+        self.confirmed = 0
+        self.ignored = 0
+
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="cpp-standin", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._own_context:
+            self.context.term()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _fill(self, symbol, action, price):
+        """Apply a signal to the symbol's book. Returns the trade PnL, or None if the signal is ignored."""
+        position, entry_price = self.positions.get(symbol, (0, 0.0))
+        if action == "BUY" and position == 0:
+            self.positions[symbol] = (1, price)
+            return 0.0
+        if action == "SELL" and position == 1:
+            pnl = price - entry_price
+            self.total_pnl += pnl
+            self.positions[symbol] = (0, 0.0)
+            return pnl
+        return None
+
+    def position(self, symbol):
+        return self.positions.get(symbol, (0, 0.0))[0]
+
+    def handle(self, message):
+        """The confirmation for one signal message, or None if it was ignored."""
+        return self._handle(message)[1]
+
+    def _handle(self, message):
+        """(seq, confirmation) for one signal message; confirmation is None if it was ignored."""
+        self.received += 1
+        if is_binary(message):
+            action, price, ts_ns, seq, symbol_id = decode_signal(message)
+            if self.record:
+                self.signal_lag.record(time.time_ns() - ts_ns)
+            pnl = self._fill(symbol_id, action, price)
+            if pnl is None:
+                self.ignored += 1
+                return seq, None
+            return seq, encode_confirmation(action, price, ts_ns, seq, self.position(symbol_id), pnl,
+                                            self.total_pnl, symbol_id)
+
+        signal = json.loads(message)
+        action, price, symbol = signal["action"], signal["price"], signal.get("symbol")
+        pnl = self._fill(symbol, action, price)
+        if pnl is None:
+            self.ignored += 1
+            return signal.get("id"), None
+        confirmation = {"action": action, "price": price, "time": signal.get("time"),
+                        "position": self.position(symbol), "total_pnl": self.total_pnl}
+        if symbol is not None:
+            confirmation["symbol"] = symbol
+        if action == "SELL":
+            confirmation["pnl"] = pnl
+        return signal.get("id"), json.dumps(confirmation).encode()
+
+    def _send(self, push, seq, confirmation):
+        # Stamped before the send, so a fast reader never sees the confirmation first
+        if self.record and seq is not None:
+            self.confirmed_at[seq] = time.time_ns()
+        push.send(confirmation)
+        self.confirmed += 1
+
+    def _run(self):
+        pull = self.context.socket(zmq.PULL)
+        pull.bind(self.signal_endpoint)
+        push = self.context.socket(zmq.PUSH)
+        push.setsockopt(zmq.LINGER, 0)
+        push.connect(self.confirmation_endpoint)
+        self._ready.set()
+
+        delayed = self._delayed
+        poller = zmq.Poller()
+        poller.register(pull, zmq.POLLIN)
+        try:
+            while not self._stop.is_set():
+                # Wake up for the next due confirmation, or every 50 ms to check for stop()
+                timeout = 50
+                if delayed:
+                    timeout = min(timeout, max(0, int((delayed[0][0] - time.monotonic()) * 1000)))
+                if poller.poll(timeout):
+                    while True:
+                        try:
+                            message = pull.recv(zmq.NOBLOCK)
+                        except zmq.Again:
+                            break
+                        seq, confirmation = self._handle(message)
+                        if confirmation is None:
+                            continue
+                        if not (self.latency or self.jitter or delayed):
+                            self._send(push, seq, confirmation)
+                            continue
+                        due = time.monotonic() + self.latency + self._random.uniform(0.0, self.jitter)
+                        if delayed and due < delayed[-1][0]:
+                            due = delayed[-1][0]     # never overtake an earlier confirmation
+                        delayed.append((due, seq, confirmation))
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    _, seq, confirmation = delayed.popleft()
+                    self._send(push, seq, confirmation)
+        finally:
+            pull.close(0)
+            push.close(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in for the C++ execution engine")
+    parser.add_argument("--signal-endpoint", default=SIGNAL_BIND, help="where to bind the signal PULL socket")
+    parser.add_argument("--confirmation-endpoint", default=CONFIRMATION_CONNECT,
+                        help="where to connect the confirmation PUSH socket")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each confirmation")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per confirmation")
+    args = parser.parse_args()
+
+    standin = CppStandIn(args.signal_endpoint, args.confirmation_endpoint, args.latency,
+                         jitter=args.jitter, record=True)
+    with standin:
+        print(f"🤖 C++ stand-in: signals on {args.signal_endpoint}, confirmations to {args.confirmation_endpoint}")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"received {standin.received}, confirmed {standin.confirmed}, ignored {standin.ignored}, "
+                      f"long {sum(p for p, _ in standin.positions.values())}, total PnL {standin.total_pnl:.2f}, "
+                      f"signal lag p99 {standin.signal_lag.summary()['p99_us']:.0f} us")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
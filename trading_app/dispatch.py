@@ -0,0 +1,407 @@
+"""
+Bounded hand-off between market data ingestion and the strategies.
+
+The websocket reader hands each symbol's ticks to a QueuedEngine instead of
+the TradingEngine itself; the ticks wait in a TickQueue until a StrategyLoop
+consumer feeds them to the real engines. A slow strategy then only makes the
+queue fill up, where the overflow policy decides what happens:
+
+    "all"        keep every tick, up to `maxsize` queued; beyond that the
+                 oldest ticks of the symbol are dropped (counted as dropped)
+    "conflate"   keep only the newest tick per symbol (the others are
+                 counted as conflated)
+    "aggregate"  fold everything since the last delivery into an
+                 IntervalSummary per symbol (open/high/low/close/count); the
+                 strategy sees the closing tick, the summary is kept in
+                 TickQueue.summaries
+
+The consumer runs as an asyncio task on the ingest loop ("task"), on its own
+thread ("thread") so CPU-heavy strategies don't stall the event loop that
+serves the dashboard, or in a separate process ("process") that builds its
+own engines and order gateway from a ShardConfig. The process sends its
+books' performance snapshots back every config.analytics_interval seconds
+(StrategyLoop.analytics), and at startup the bars in progress it recovered
+from the tick store (StrategyLoop.bar_aggregators, for the BarStage).
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+
+from models import Tick
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("all", "conflate", "aggregate")
+MODES = ("task", "thread", "process")
+
+
+class IntervalSummary:
+    """OHLC and tick count of the ticks folded together since the last delivery."""
+    __slots__ = ("open", "high", "low", "close", "count", "first", "last")
+
+    def __init__(self, tick):
+        self.open = self.high = self.low = self.close = tick.price
+        self.count = 1
+        self.first = self.last = tick
+
+    def add(self, tick):
+        price = tick.price
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.count += 1
+        self.last = tick
+
+    def to_dict(self):
+        return {
+            "open": self.open, "high": self.high, "low": self.low, "close": self.close, "count": self.count,
+            "first_ts_ns": self.first.exchange_ts_ns, "last_ts_ns": self.last.exchange_ts_ns,
+        }
+
+
+class TickQueue:
+    """
+    Per-symbol pending ticks with an overflow policy (see the module docstring).
+
+    put() never blocks, so it is safe to call from the event loop; take()
+    returns everything pending as {symbol: [ticks]} in arrival order per
+    symbol. Both are thread-safe. `listener`, if set, is called (outside
+    the lock) whenever put() makes an empty queue non-empty.
+    """
+
+    def __init__(self, policy="all", maxsize=10000):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.policy = policy
+        self.maxsize = maxsize
+        self.listener = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._size = 0              # queued ticks ("all") or symbols with something pending
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.high_water = 0
+        self.summaries = {}         # last delivered IntervalSummary per symbol ("aggregate")
+
+    def __len__(self):
+        return self._size
+
+    def put(self, symbol, ticks):
+        if not ticks:
+            return
+        with self._lock:
+            was_empty = self._size == 0
+            self.enqueued += len(ticks)
+            if self.policy == "all":
+                self._put_all(symbol, ticks)
+            elif self.policy == "conflate":
+                if symbol in self._pending:
+                    self.conflated += len(ticks)
+                else:
+                    self.conflated += len(ticks) - 1
+                    self._size += 1
+                self._pending[symbol] = ticks[-1]
+            else:
+                summary = self._pending.get(symbol)
+                start = 0
+                if summary is None:
+                    summary = self._pending[symbol] = IntervalSummary(ticks[0])
+                    self._size += 1
+                    start = 1
+                for i in range(start, len(ticks)):
+                    summary.add(ticks[i])
+                self.conflated += len(ticks) - start
+            if self._size > self.high_water:
+                self.high_water = self._size
+        if was_empty and self.listener is not None:
+            self.listener()
+
+    def _put_all(self, symbol, ticks):
+        pending = self._pending.get(symbol)
+        if pending is None:
+            pending = self._pending[symbol] = []
+        pending.extend(ticks)
+        self._size += len(ticks)
+        excess = self._size - self.maxsize
+        if excess > 0:
+            # Drop this symbol's oldest ticks; other symbols keep their place
+            excess = min(excess, len(pending) - 1)
+            del pending[:excess]
+            self._size -= excess
+            self.dropped += excess
+
+    def take(self):
+        """Remove and return everything pending as {symbol: [ticks]}."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._size = 0
+        if self.policy == "all":
+            batch = pending
+        elif self.policy == "conflate":
+            batch = {symbol: [tick] for symbol, tick in pending.items()}
+        else:
+            self.summaries.update(pending)
+            batch = {symbol: [summary.last] for symbol, summary in pending.items()}
+        self.delivered += sum(len(ticks) for ticks in batch.values())
+        return batch
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "depth": self._size,
+            "high_water": self.high_water,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+        }
+
+
+class QueuedEngine:
+    """Stands in for a symbol's TradingEngine on the ingest side: ticks go into the queue."""
+
+    def __init__(self, queue, symbol):
+        self.queue = queue
+        self.symbol = symbol
+
+    def on_ticks(self, ticks):
+        self.queue.put(self.symbol, ticks)
+
+
+def _run_batch(engines, batch):
+    for symbol, ticks in batch.items():
+        engine = engines.get(symbol)
+        if engine is None:
+            continue
+        try:
+            engine.on_ticks(ticks)
+        except Exception:
+            logger.exception("Strategy for %s failed on a batch of %d ticks", symbol, len(ticks))
+
+
+class StrategyLoop:
+    """
+    Consumes a TickQueue and runs the engines, decoupled from ingestion.
+
+    Pass `proxies` to the stream function (stream_binance_multi) in place of
+    the engines. With mode="process" the engines are built in the child
+    process from `config` (a shards.ShardConfig) and `engines` is not used;
+    `analytics` then holds the child's latest performance snapshots, by
+    book label (see shards.performance_snapshots), and `bar_aggregators`
+    the unfinished bars its warm start recovered (see snapshot.warm_start).
+    """
+
+    def __init__(self, engines=None, policy="all", maxsize=10000, mode="task", config=None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if mode == "process" and config is None:
+            raise ValueError("mode='process' needs a ShardConfig")
+        self.engines = engines or {}
+        self.mode = mode
+        self.config = config
+        self.queue = TickQueue(policy, maxsize)
+        symbols = config.symbols if mode == "process" else self.engines
+        self.proxies = {symbol: QueuedEngine(self.queue, symbol) for symbol in symbols}
+        self.batches = 0
+        self.analytics = {}
+        self.bar_aggregators = {}
+
+        self._closed = False
+        self._wake = None
+        self._task = None
+        self._thread = None
+        self._process = None
+        self._conn = None
+        self._analytics_thread = None
+
+    async def start(self):
+        if self.mode == "task":
+            self._wake = asyncio.Event()
+            self.queue.listener = self._wake.set
+            self._task = asyncio.create_task(self._run_task())
+            return
+
+        self._wake = threading.Event()
+        self.queue.listener = self._wake.set
+        if self.mode == "thread":
+            target = self._run_thread
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            reader, self._conn = ctx.Pipe(duplex=False)
+            analytics_reader, analytics_writer = ctx.Pipe(duplex=False)
+            ready = ctx.Event()
+            self._process = ctx.Process(target=_strategy_process,
+                                        args=(self.config, reader, ready, analytics_writer),
+                                        name="strategy", daemon=True)
+            self._process.start()
+            reader.close()
+            analytics_writer.close()
+            self._analytics_thread = threading.Thread(target=self._run_analytics, args=(analytics_reader,),
+                                                      name="strategy-analytics", daemon=True)
+            self._analytics_thread.start()
+            # Wait until the child has built (and restored) its engines, so
+            # ticks arriving from now on are the first ones it has not seen
+            if not await asyncio.to_thread(ready.wait, 60):
+                logger.warning("Strategy process is slow to start; queueing ticks meanwhile")
+            elif analytics_reader.poll():
+                # Sent just before ready, so the BarStage can start from it
+                self._receive(analytics_reader.recv())
+            target = self._run_feeder
+        self._thread = threading.Thread(target=target, name=f"strategy-{self.mode}", daemon=True)
+        self._thread.start()
+
+    async def stop(self, timeout=5.0):
+        """Deliver what is still queued, then stop the consumer."""
+        self._closed = True
+        if self._wake is not None:
+            self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, timeout)
+            self._thread = None
+        if self._process is not None:
+            await asyncio.to_thread(self._process.join, timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._analytics_thread is not None:
+            await asyncio.to_thread(self._analytics_thread.join, timeout)
+            self._analytics_thread = None
+
+    async def _run_task(self):
+        wake = self._wake
+        while True:
+            if not len(self.queue):
+                if self._closed:
+                    return
+                wake.clear()
+                await wake.wait()
+                continue
+            _run_batch(self.engines, self.queue.take())
+            self.batches += 1
+            # Let the websocket reader run between batches
+            await asyncio.sleep(0)
+
+    def _batches(self):
+        """Blocking iterator over queued batches for the thread consumers."""
+        wake = self._wake
+        while True:
+            if not len(self.queue):
+                if self._closed:
+                    return
+                wake.wait()
+                wake.clear()
+                continue
+            self.batches += 1
+            yield self.queue.take()
+
+    def _run_thread(self):
+        for batch in self._batches():
+            _run_batch(self.engines, batch)
+
+    def _run_feeder(self):
+        # Ticks cross the pipe as plain tuples; sending blocks while the
+        # child is busy, and meanwhile the queue's policy applies
+        try:
+            for batch in self._batches():
+                self._conn.send({
+                    symbol: [(t.price, t.exchange_ts_ns, t.recv_ts_ns, t.qty) for t in ticks]
+                    for symbol, ticks in batch.items()
+                })
+            self._conn.send(None)
+        except (BrokenPipeError, EOFError, OSError) as e:
+            logger.error("Strategy process went away: %s", e)
+        finally:
+            self._conn.close()
+
+    def _receive(self, message):
+        kind, payload = message
+        if kind == "analytics":
+            self.analytics = payload
+        else:
+            self.bar_aggregators = payload
+
+    def _run_analytics(self, conn):
+        # Ends when the child exits and its end of the pipe closes
+        try:
+            while True:
+                self._receive(conn.recv())
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def stats(self):
+        stats = self.queue.stats()
+        stats["mode"] = self.mode
+        stats["batches"] = self.batches
+        if self.queue.policy == "aggregate":
+            stats["summaries"] = {symbol: s.to_dict() for symbol, s in self.queue.summaries.items()}
+        return stats
+
+
+def _strategy_process(config, conn, ready, analytics_conn):
+    from shards import build_engines, close_snapshots, log_performance, performance_snapshots, restore_engines
+    from snapshot import bar_aggregators
+    from gateway import OrderGateway
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] [strategy] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    async def consume():
+        gateway = None
+        if config.send_orders:
+            gateway = OrderGateway(endpoint=config.endpoint)
+            await gateway.start()
+        engines = build_engines(config, gateway)
+        targets = restore_engines(config, engines)
+        analytics_conn.send(("bars", bar_aggregators(targets)))
+        ready.set()
+        loop = asyncio.get_running_loop()
+        reported = 0.0
+        try:
+            while True:
+                try:
+                    batch = await loop.run_in_executor(None, conn.recv)
+                except EOFError:
+                    break
+                if batch is None:
+                    break
+                _run_batch(targets, {symbol: [Tick(price, exchange_ts_ns, recv_ts_ns, qty=qty)
+                                              for price, exchange_ts_ns, recv_ts_ns, qty in ticks]
+                                     for symbol, ticks in batch.items()})
+                if time.monotonic() - reported >= config.analytics_interval:
+                    analytics_conn.send(("analytics", performance_snapshots(engines)))
+                    reported = time.monotonic()
+        finally:
+            close_snapshots(targets)
+            log_performance(engines)
+            try:
+                analytics_conn.send(("analytics", performance_snapshots(engines)))
+            except OSError:
+                pass
+            analytics_conn.close()
+            if gateway is not None:
+                await gateway.close()
+
+    try:
+        asyncio.run(consume())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ready.set()     # don't leave the parent waiting if startup failed
@@ -1,6 +1,7 @@
 from models import Tick, Signal
-from datetime import datetime
+from indicators import IndicatorBank
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -11,22 +12,199 @@ class TradingEngine:
     generates signals using a strategy, and passes them to the execution engine.
     """
     
-    def __init__(self, strategy, execution):
+    def __init__(self, strategy, execution, metrics=None):
         self.strategy = strategy
         self.execution = execution
+        # Optional PipelineMetrics; when set, on_ticks times the strategy and execution stages
+        self.metrics = metrics
 
-    def on_price(self, price: float) -> Signal:
+    def on_tick(self, tick: Tick) -> Signal:
         """
-        Process a new price tick.
+        Process a new tick.
         Generates a signal using the strategy and executes it.
         """
-        tick = Tick(price=price, timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         signal = self.strategy.on_tick(tick)
-        
-        if signal != Signal.HOLD:
-            logger.info(f"Signal generated: {signal.value} at price {price}")
+
+        if signal is not Signal.HOLD:
+            logger.info("Signal generated: %s at price %s", signal.value, tick.price)
         else:
-            logger.debug(f"HOLD signal at price {price}")
+            logger.debug("HOLD signal at price %s", tick.price)
 
         self.execution.on_signal(signal, tick)
         return signal
+
+    def on_price(self, price: float, exchange_ts_ns: int = 0) -> Signal:
+        """Process a bare price, stamped with the current time as its receive time."""
+        return self.on_tick(Tick(price, exchange_ts_ns, time.time_ns()))
+
+    def warm(self, ticks):
+        """Feed ticks to the strategy only, to rebuild its indicators; no orders, the book is untouched."""
+        on_tick = self.strategy.on_tick
+        for tick in ticks:
+            on_tick(tick)
+
+    def on_book_events(self, events):
+        """Pass order book updates (BookEvents, in order) to the strategy."""
+        on_book = self.strategy.on_book
+        for event in events:
+            on_book(event)
+
+    def on_ticks(self, ticks) -> list[Signal]:
+        """
+        Process a batch of ticks in order.
+
+        Produces exactly the signals that calling on_tick once per tick would,
+        but looks up the strategy/execution methods once.
+        """
+        if self.metrics is not None:
+            return self._on_ticks_timed(ticks)
+
+        on_tick = self.strategy.on_tick
+        on_signal = self.execution.on_signal
+        hold = Signal.HOLD
+        signals = []
+        append = signals.append
+
+        for tick in ticks:
+            signal = on_tick(tick)
+            if signal is not hold:
+                logger.info("Signal generated: %s at price %s", signal.value, tick.price)
+            on_signal(signal, tick)
+            append(signal)
+
+        return signals
+
+    def _on_ticks_timed(self, ticks) -> list[Signal]:
+        """on_ticks with per-tick strategy/execution timings and tick/signal counts."""
+        metrics = self.metrics
+        record_strategy = metrics.strategy.record
+        record_execution = metrics.execution.record
+        on_tick = self.strategy.on_tick
+        on_signal = self.execution.on_signal
+        clock = time.perf_counter_ns
+        hold = Signal.HOLD
+        signals = []
+        append = signals.append
+        emitted = 0
+
+        for tick in ticks:
+            t0 = clock()
+            signal = on_tick(tick)
+            t1 = clock()
+            if signal is not hold:
+                emitted += 1
+                logger.info("Signal generated: %s at price %s", signal.value, tick.price)
+            on_signal(signal, tick)
+            record_execution(clock() - t1)
+            record_strategy(t1 - t0)
+            append(signal)
+
+        metrics.ticks.inc(len(signals))
+        metrics.signals.inc(emitted)
+        return signals
+
+    def on_prices(self, prices, timestamps=None) -> list[Signal]:
+        """
+        Process a batch of bare prices in order. Without timestamps (formatted
+        strings), every tick in the batch gets the batch's arrival time.
+        """
+        if timestamps is None:
+            now = time.time_ns()
+            return self.on_ticks(Tick(price, 0, now) for price in prices)
+        if len(timestamps) != len(prices):
+            raise ValueError("prices and timestamps must have the same length")
+        return self.on_ticks(Tick(price, timestamp=stamp) for price, stamp in zip(prices, timestamps))
+
+
+class MultiStrategyEngine:
+    """
+    Fans each tick out to several strategies on one feed.
+
+    Strategies (MovingAverageStrategy variants) are attached to one
+    IndicatorBank, so an SMA window, RSI period or crossover pair that
+    several of them use is computed once per tick. Each strategy keeps its
+    own ExecutionEngine, i.e. its own position and PnL book.
+
+    Per tick the bank is updated once; a strategy is only consulted when its
+    crossover fired, and the other books are only marked if they have a
+    PerformanceTracker. So on the common tick the cost depends on the number
+    of distinct indicators, not on the number of strategies.
+    """
+
+    def __init__(self, metrics=None):
+        self.bank = IndicatorBank()
+        self.books = {}             # name -> ExecutionEngine
+        self.strategies = {}        # name -> strategy
+        self.metrics = metrics
+        self._groups = {}           # crossover -> [(name, strategy, execution)]
+
+    def add(self, name, strategy, execution):
+        """Register a strategy and its book; all of them before the first tick."""
+        if name in self.books:
+            raise ValueError(f"strategy {name!r} is already registered")
+        strategy.attach(self.bank)
+        self.strategies[name] = strategy
+        self.books[name] = execution
+        self._groups.setdefault(strategy.crossover, []).append((name, strategy, execution))
+
+    def on_tick(self, tick: Tick) -> list:
+        """Process a new tick; returns (name, signal) for every strategy that signalled."""
+        bank = self.bank
+        bank.update(tick.price)
+        tick_number = bank.ticks
+        hold = Signal.HOLD
+        fired = []
+
+        for crossover, members in self._groups.items():
+            cross = crossover.value
+            for name, strategy, execution in members:
+                signal = strategy.decide(cross, strategy.rsi.value, tick_number) if cross else hold
+                if signal is not hold:
+                    logger.info("Signal generated by %s: %s at price %s", name, signal.value, tick.price)
+                    fired.append((name, signal))
+                    execution.on_signal(signal, tick)
+                elif execution.analytics is not None:
+                    execution.on_signal(hold, tick)
+        return fired
+
+    def on_price(self, price: float, exchange_ts_ns: int = 0) -> list:
+        """Process a bare price, stamped with the current time as its receive time."""
+        return self.on_tick(Tick(price, exchange_ts_ns, time.time_ns()))
+
+    def warm(self, ticks):
+        """Feed ticks to the shared indicators only; no decisions, no orders, the books are untouched."""
+        update = self.bank.update
+        for tick in ticks:
+            update(tick.price)
+
+    def on_book_events(self, events):
+        """Pass order book updates (BookEvents, in order) to every strategy."""
+        for strategy in self.strategies.values():
+            on_book = strategy.on_book
+            for event in events:
+                on_book(event)
+
+    def on_ticks(self, ticks) -> list:
+        """Process a batch of ticks in order; returns (tick, name, signal) for every signal."""
+        on_tick = self.on_tick
+        fired = []
+        if self.metrics is None:
+            for tick in ticks:
+                for name, signal in on_tick(tick):
+                    fired.append((tick, name, signal))
+            return fired
+
+        # Strategy stage = bank update plus every strategy's decision and fill, per tick
+        record_strategy = self.metrics.strategy.record
+        clock = time.perf_counter_ns
+        count = 0
+        for tick in ticks:
+            t0 = clock()
+            signals = on_tick(tick)
+            record_strategy(clock() - t0)
+            count += 1
+            for name, signal in signals:
+                fired.append((tick, name, signal))
+        self.metrics.ticks.inc(count)
+        self.metrics.signals.inc(len(fired))
+        return fired
@@ -1,22 +1,62 @@
+import itertools
+import time
+
 from models import Signal, Tick
-import zmq
+
+# Order ids count microseconds from here (2024-01-01 UTC) rather than 1970, so
+# even many processes' ids stay below 2**53 and survive JSON in the dashboard
+ORDER_ID_EPOCH_NS = 1_704_067_200_000_000_000
+
+
+def order_id_sequence(index=0, count=1):
+    """
+    Order ids for one of `count` processes sharing the C++ engine: index+1,
+    index+1+count, ... offset by the start time in microseconds, so a
+    restarted process (warm or not) never reuses the ids of an earlier run.
+    """
+    base = (time.time_ns() - ORDER_ID_EPOCH_NS) // 1000
+    return itertools.count(base * count + index + 1, count)
+
 
 class ExecutionEngine:
-    def __init__(self):
+    def __init__(self, gateway=None, symbol=None, order_ids=None, analytics=None, symbol_id=None):
+        # Orders go out through the shared OrderGateway; without one the book
+        # is still kept but nothing is sent (replays, dry runs)
+        self.gateway = gateway
+        # Set when one process trades several symbols; orders are tagged with it
+        self.symbol = symbol
+        # The symbol's wire id (protocol.symbol_ids), so C++ books each symbol separately
+        self.symbol_id = symbol_id
+        # Engines that share a gateway must share an id sequence (an iterator
+        # such as itertools.count) or the gateway would drop their orders as duplicates
+        self.order_ids = order_ids
+        # Optional PerformanceTracker, fed every fill and marked on every tick
+        self.analytics = analytics
         self.position = 0
         self.entry_price: float | None = None
         self.total_pnl = 0.0
         self.pnl_pct = 0.0
+        self.next_order_id = 1
         # self.trades = []
 
 
+    def _next_id(self):
+        if self.order_ids is not None:
+            return next(self.order_ids)
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        return order_id
+
     def on_signal(self, signal:Signal, tick:Tick):
         trade = None
         if signal == Signal.BUY and self.position == 0:
             self.position = 1
             self.entry_price = tick.price
             trade = {
+                'id': self._next_id(),
                 'time': tick.timestamp,
+                'ts_ns': time.time_ns(),
+                'recv_ts_ns': tick.recv_ts_ns,
                 'action': 'BUY',
                 'price': tick.price
             }
@@ -26,17 +66,27 @@ class ExecutionEngine:
             self.total_pnl += pnl
             self.pnl_pct = (pnl / self.entry_price) * 100
             trade = {
+                'id': self._next_id(),
                 'time': tick.timestamp,
+                'ts_ns': time.time_ns(),
+                'recv_ts_ns': tick.recv_ts_ns,
                 'action': 'SELL',
                 'price': tick.price
             }
             self.position = 0
             self.entry_price = None
             
+        analytics = self.analytics
         if trade is not None:
-            context = zmq.Context()
-            socket = context.socket(zmq.PUSH)
-            socket.connect("tcp://localhost:5555")
-            socket.send_json(trade)
+            if self.symbol is not None:
+                trade['symbol'] = self.symbol
+            if self.symbol_id is not None:
+                trade['symbol_id'] = self.symbol_id
+            if self.gateway is not None:
+                self.gateway.submit(trade)
+            if analytics is not None:
+                analytics.on_fill(trade['action'], tick.price, 1, tick.exchange_ts_ns or tick.recv_ts_ns)
+        elif analytics is not None:
+            analytics.mark(tick.price, tick.exchange_ts_ns or tick.recv_ts_ns)
 
-        return trade
\ No newline at end of file
+        return trade
@@ -0,0 +1,182 @@
+"""
+Long-lived outbound order channel to the C++ execution engine.
+
+One OrderGateway owns the PUSH socket for the whole process. submit() never
+blocks: it drops the order into a bounded queue and a background task sends
+it, so the strategy loop and the FastAPI event loop never wait on ZeroMQ.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+import zmq
+import zmq.asyncio
+
+from protocol import encode_order
+
+logger = logging.getLogger(__name__)
+
+CPP_SIGNAL_ENDPOINT = "tcp://localhost:5555"
+
+
+def _encode_json(order):
+    return json.dumps(order).encode()
+
+
+class OrderGateway:
+    """
+    Sends orders to the C++ engine over a single persistent socket.
+
+    - submit(order) is synchronous and non-blocking; it returns False if the
+      order was a duplicate or the queue is full. Called from another thread
+      (a strategy thread), it hands the order to the gateway's event loop
+      and returns True.
+    - Orders are de-duplicated by their "id" over the last `dedupe_window` ids.
+    - Up to `batch_size` queued orders go out together as one multipart
+      message (the C++ side receives each part as its own message).
+    - The socket's send high-water mark is `hwm`; once the C++ side falls that
+      far behind, sends wait (in the background task) and the queue absorbs
+      the burst up to `max_queue` orders.
+    - wire_format is "binary" (see protocol.py) or "json" for C++ builds that
+      predate the binary protocol.
+    - With `metrics` (a PipelineMetrics), each order's queue-to-send time is
+      recorded and its send time kept so the confirmation can be matched.
+    """
+
+    def __init__(self, endpoint=CPP_SIGNAL_ENDPOINT, context=None, max_queue=10000,
+                 hwm=1000, batch_size=1, dedupe_window=10000, wire_format="binary", metrics=None):
+        if wire_format not in ("binary", "json"):
+            raise ValueError("wire_format must be 'binary' or 'json'")
+        self.endpoint = endpoint
+        self.context = context or zmq.asyncio.Context.instance()
+        self._encode = encode_order if wire_format == "binary" else _encode_json
+        self.hwm = hwm
+        self.batch_size = batch_size
+        self.metrics = metrics
+
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._socket = None
+        self._task = None
+        self._loop = None
+        self._loop_thread = None
+
+        self._seen = set()
+        self._seen_order = deque(maxlen=dedupe_window)
+
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.last_latency_ns = 0
+        self.max_latency_ns = 0
+        self._total_latency_ns = 0
+
+    async def start(self):
+        """Open the socket and start the background sender."""
+        if self._task is not None:
+            return
+        self._socket = self.context.socket(zmq.PUSH)
+        self._socket.setsockopt(zmq.SNDHWM, self.hwm)
+        self._socket.setsockopt(zmq.LINGER, 1000)
+        self._socket.connect(self.endpoint)
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Order gateway connected to %s", self.endpoint)
+
+    async def close(self, drain_timeout=1.0):
+        """Give queued orders a moment to go out, then stop and close the socket."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Order gateway closed with %d orders unsent", self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._socket.close()
+        self._socket = None
+
+    def submit(self, order):
+        """Queue an order for sending. Returns True if it was accepted."""
+        if self._loop_thread is not None and threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self.submit, order)
+            return True
+        order_id = order.get("id")
+        if order_id is not None:
+            if order_id in self._seen:
+                self.duplicates += 1
+                return False
+            if len(self._seen_order) == self._seen_order.maxlen:
+                self._seen.discard(self._seen_order[0])
+            self._seen_order.append(order_id)
+            self._seen.add(order_id)
+
+        try:
+            self._queue.put_nowait((time.perf_counter_ns(), order))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Order queue full, dropping order %s", order_id)
+            return False
+        return True
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            frames = [self._encode(order) for _, order in batch]
+            try:
+                if len(frames) == 1:
+                    await self._socket.send(frames[0])
+                else:
+                    await self._socket.send_multipart(frames)
+            except zmq.ZMQError as e:
+                self.errors += len(batch)
+                logger.error("Error sending to C++: %s", e)
+            else:
+                now = time.perf_counter_ns()
+                for queued_at, _ in batch:
+                    latency = now - queued_at
+                    self._total_latency_ns += latency
+                    if latency > self.max_latency_ns:
+                        self.max_latency_ns = latency
+                self.last_latency_ns = now - batch[-1][0]
+                if self.metrics is not None:
+                    sent_ns = time.time_ns()
+                    for queued_at, order in batch:
+                        self.metrics.zmq_send.record(now - queued_at)
+                        self.metrics.order_sent(order, sent_ns)
+                self.sent += len(batch)
+                self.batches += 1
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        """Counters and send latency (queue entry to socket hand-off) in microseconds."""
+        return {
+            "sent": self.sent,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "queue_depth": self.queue_depth,
+            "last_latency_us": self.last_latency_ns / 1000,
+            "avg_latency_us": (self._total_latency_ns / self.sent / 1000) if self.sent else 0.0,
+            "max_latency_us": self.max_latency_ns / 1000,
+        }
@@ -0,0 +1,161 @@
+"""
+Bounded trade history for the dashboard API.
+
+The newest `capacity` trades live in a fixed-size ring buffer. Every trade
+gets a monotonically increasing id, so a trade's slot in the ring is just
+arithmetic on its id and cursor pagination never scans. Trades pushed out of
+the ring can optionally be spilled to a JSON-lines file and are still
+reachable by cursor.
+
+Aggregates (count, realized PnL, wins/losses) are updated as trades arrive.
+"""
+import json
+
+
+class TradeHistory:
+    # Remember the file offset of every SPILL_INDEX_STRIDE-th spilled trade
+    SPILL_INDEX_STRIDE = 1024
+
+    def __init__(self, capacity=10000, spill_path=None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self.last_id = 0            # id of the newest trade, 0 when empty
+
+        self.spill_path = spill_path
+        self._spill = None
+        self._spill_offsets = []    # offsets of ids 1, 1 + STRIDE, 1 + 2*STRIDE, ...
+        if spill_path:
+            # Start from a fresh file; ids restart with the process
+            self._spill = open(spill_path, "w")
+
+        self.buys = 0
+        self.sells = 0
+        self.wins = 0
+        self.losses = 0
+        self.realized_pnl = 0.0
+
+    def __len__(self):
+        return min(self.last_id, self.capacity)
+
+    @property
+    def first_id(self):
+        """Id of the oldest trade still in memory."""
+        return max(1, self.last_id - self.capacity + 1)
+
+    def append(self, record):
+        """Store a trade, assign its id and update the running aggregates."""
+        trade_id = self.last_id + 1
+        record["id"] = trade_id
+        slot = (trade_id - 1) % self.capacity
+
+        evicted = self._ring[slot]
+        if evicted is not None and self._spill is not None:
+            self._spill_write(evicted)
+
+        self._ring[slot] = record
+        self.last_id = trade_id
+
+        action = record.get("action")
+        if action == "BUY":
+            self.buys += 1
+        elif action == "SELL":
+            self.sells += 1
+            pnl = record.get("pnl") or 0.0
+            self.realized_pnl += pnl
+            if pnl > 0:
+                self.wins += 1
+            elif pnl < 0:
+                self.losses += 1
+        return record
+
+    def _spill_write(self, record):
+        if (record["id"] - 1) % self.SPILL_INDEX_STRIDE == 0:
+            self._spill_offsets.append(self._spill.tell())
+        self._spill.write(json.dumps(record) + "\n")
+
+    def get(self, trade_id):
+        """Return an in-memory trade by id, or None."""
+        if self.first_id <= trade_id <= self.last_id:
+            return self._ring[(trade_id - 1) % self.capacity]
+        return None
+
+    def _iter_spilled(self, from_id):
+        """Yield spilled trades with id >= from_id, oldest first."""
+        if self._spill is None or not self._spill_offsets:
+            return
+        self._spill.flush()
+        k = min((from_id - 1) // self.SPILL_INDEX_STRIDE, len(self._spill_offsets) - 1)
+        with open(self.spill_path) as f:
+            f.seek(self._spill_offsets[max(k, 0)])
+            for line in f:
+                record = json.loads(line)
+                if record["id"] >= from_id:
+                    yield record
+
+    def _iter_from(self, from_id):
+        if from_id < self.first_id:
+            for record in self._iter_spilled(from_id):
+                if record["id"] >= self.first_id:
+                    break
+                yield record
+            from_id = self.first_id
+        for trade_id in range(from_id, self.last_id + 1):
+            yield self._ring[(trade_id - 1) % self.capacity]
+
+    def _first_id_at(self, start):
+        """First in-memory id whose time is >= start (trade times increase with id)."""
+        lo, hi = self.first_id, self.last_id + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ring[(mid - 1) % self.capacity]["time"] < start:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def page(self, since_id=0, limit=100, start=None, end=None, action=None):
+        """
+        Trades with id > since_id, oldest first, filtered by time range
+        (start <= time < end, same "%Y-%m-%d %H:%M:%S" format as trade times)
+        and action. Returns (trades, next_cursor); pass next_cursor back as
+        since_id to get the following page. next_cursor is None at the end.
+        """
+        from_id = since_id + 1
+        if start is not None and from_id >= self.first_id:
+            from_id = max(from_id, self._first_id_at(start))
+
+        trades = []
+        for record in self._iter_from(from_id):
+            time = record.get("time")
+            if start is not None and time < start:
+                continue
+            if end is not None and time >= end:
+                break
+            if action is not None and record.get("action") != action:
+                continue
+            trades.append(record)
+            if len(trades) == limit:
+                break
+
+        next_cursor = trades[-1]["id"] if len(trades) == limit and trades[-1]["id"] < self.last_id else None
+        return trades, next_cursor
+
+    def stats(self):
+        closed = self.wins + self.losses
+        return {
+            "count": self.last_id,
+            "in_memory": len(self),
+            "buys": self.buys,
+            "sells": self.sells,
+            "realized_pnl": self.realized_pnl,
+            "wins": self.wins,
+            "losses": self.losses,
+            "win_rate": (self.wins / closed * 100) if closed else 0.0,
+        }
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
@@ -0,0 +1,140 @@
+"""
+Publish/subscribe hub for the dashboard's server-sent events.
+
+Every SSE client gets its own bounded queue, so each confirmation reaches
+every open dashboard and nothing piles up when nobody is connected. publish()
+is synchronous and never waits on a client: when a client's queue is full
+its slow-consumer policy decides what happens.
+
+    drop_oldest  discard the oldest queued event
+    coalesce     keep at most one pending status event (later deltas are
+                 merged into it); if still full, discard the oldest event
+    disconnect   close the subscription; the client can reconnect and
+                 resume with Last-Event-ID
+"""
+import asyncio
+import json
+from collections import deque
+
+POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class Event:
+    """One SSE event. The wire frame is built once and shared by all subscribers."""
+    __slots__ = ("type", "id", "data", "_frame")
+
+    def __init__(self, event_type, data, event_id=None):
+        self.type = event_type
+        self.id = event_id
+        self.data = data
+        self._frame = None
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            lines = []
+            if self.type != "message":
+                lines.append(f"event: {self.type}\n")
+            if self.id is not None:
+                lines.append(f"id: {self.id}\n")
+            lines.append(f"data: {json.dumps(self.data)}\n\n")
+            self._frame = "".join(lines)
+        return self._frame
+
+
+class Subscription:
+    def __init__(self, hub, maxsize, policy):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.hub = hub
+        self.maxsize = maxsize
+        self.policy = policy
+        self.closed = False
+        self.dropped = 0
+        self._events = deque()
+        self._pending_status = None
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return len(self._events)
+
+    def offer(self, event):
+        """Queue an event for this client without blocking."""
+        if self.closed:
+            return
+
+        if self.policy == "coalesce" and event.type == "status" and self._pending_status is not None:
+            # Fold the new delta into the status update that is still waiting
+            merged = Event("status", {**self._pending_status.data, **event.data}, event.id)
+            self._events[self._events.index(self._pending_status)] = merged
+            self._pending_status = merged
+            return
+
+        if len(self._events) >= self.maxsize:
+            if self.policy == "disconnect":
+                self.close()
+                return
+            if self.policy == "coalesce" and self._pending_status is not None:
+                self._events.remove(self._pending_status)
+                self._pending_status = None
+            else:
+                oldest = self._events.popleft()
+                if oldest is self._pending_status:
+                    self._pending_status = None
+            self.dropped += 1
+            self.hub.dropped += 1
+
+        self._events.append(event)
+        if event.type == "status":
+            self._pending_status = event
+        self._ready.set()
+
+    async def get(self):
+        """Wait for the next event; returns None once the subscription is closed."""
+        while not self._events:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        event = self._events.popleft()
+        if event is self._pending_status:
+            self._pending_status = None
+        return event
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+        self.hub.unsubscribe(self)
+
+
+class BroadcastHub:
+    def __init__(self, maxsize=256, policy="drop_oldest"):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.subscribers = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, maxsize=None, policy=None):
+        sub = Subscription(self, maxsize or self.maxsize, policy or self.policy)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+
+    def publish(self, event_type, data, event_id=None):
+        """Fan an event out to every subscriber. Never blocks."""
+        event = Event(event_type, data, event_id)
+        for sub in list(self.subscribers):
+            sub.offer(event)
+        self.published += 1
+        return event
+
+    def stats(self):
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "max_queue_depth": max((len(s) for s in self.subscribers), default=0),
+        }
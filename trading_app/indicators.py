@@ -0,0 +1,380 @@
+"""
+Streaming indicators with constant-time updates.
+
+Each indicator keeps its own fixed-size state, allocated once in __init__,
+and exposes `update(price)` which returns the new value (or None while it is
+still warming up) and a `value` attribute holding the last result.
+
+Several strategies on one feed share an IndicatorBank instead: it keeps one
+PriceRing of recent prices and one indicator per distinct window/period, all
+updated once per tick. RingSMA and RingRSI read the prices they drop out of
+their window from the ring rather than keeping their own copy, and produce
+exactly the values of SMA and RSI.
+"""
+
+
+def _neumaier_add(total, comp, x):
+    """
+    One step of Neumaier-compensated summation; returns the new (total, comp).
+    Adding and removing prices for hours would otherwise let rounding error
+    build up in the running sums, which matters because the crossover check
+    compares two moving averages for ties.
+    """
+    t = total + x
+    if abs(total) >= abs(x):
+        comp += (total - t) + x
+    else:
+        comp += (x - t) + total
+    return t, comp
+
+
+class SMA:
+    """Simple moving average over the last `window` prices using a running sum."""
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self._buf = [0.0] * window
+        self._pos = 0
+        self._count = 0
+        self._total = 0.0
+        self._comp = 0.0
+        self.value = None
+
+    def update(self, price):
+        pos = self._pos
+        total, comp = _neumaier_add(self._total, self._comp, price)
+        if self._count == self.window:
+            total, comp = _neumaier_add(total, comp, -self._buf[pos])
+        else:
+            self._count += 1
+        self._buf[pos] = price
+        self._pos = pos + 1 if pos + 1 < self.window else 0
+        self._total = total
+        self._comp = comp
+
+        if self._count == self.window:
+            self.value = (total + comp) / self.window
+        return self.value
+
+
+class RingSMA(SMA):
+    """SMA that reads the price leaving its window from a shared PriceRing."""
+
+    def __init__(self, window, ring):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self._ring = ring
+        self._count = 0
+        self._total = 0.0
+        self._comp = 0.0
+        self.value = None
+
+    def update(self, price):
+        # The ring already holds `price`; the one leaving is `window` ticks back
+        total, comp = _neumaier_add(self._total, self._comp, price)
+        if self._count == self.window:
+            total, comp = _neumaier_add(total, comp, -self._ring.ago(self.window))
+        else:
+            self._count += 1
+        self._total = total
+        self._comp = comp
+
+        if self._count == self.window:
+            self.value = (total + comp) / self.window
+        return self.value
+
+
+class EMA:
+    """Exponential moving average, seeded with the SMA of the first `window` prices."""
+
+    def __init__(self, window):
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self._count = 0
+        self._seed = 0.0
+        self.value = None
+
+    def update(self, price):
+        if self.value is None:
+            self._count += 1
+            self._seed += price
+            if self._count == self.window:
+                self.value = self._seed / self.window
+            return self.value
+        self.value += self.alpha * (price - self.value)
+        return self.value
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0  # All gains, maximally overbought
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+class RSI:
+    """
+    RSI over the last `period` price changes using simple average gains/losses
+    (Cutler's RSI). This is the definition MovingAverageStrategy has always used.
+    """
+
+    def __init__(self, period):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        # Ring of the last `period` changes; gains are positive, losses negative
+        self._changes = [0.0] * period
+        self._pos = 0
+        self._count = 0
+        self._gain_sum = 0.0
+        self._gain_comp = 0.0
+        self._loss_sum = 0.0
+        self._loss_comp = 0.0
+        # Non-zero gains/losses in the window; when one drops to zero the
+        # matching sum is reset to exactly 0.0 so "no losses" means avg_loss == 0
+        self._gains = 0
+        self._losses = 0
+        self._last_price = None
+        self.value = None
+
+    def update(self, price):
+        last = self._last_price
+        self._last_price = price
+        if last is None:
+            return self.value
+
+        change = price - last
+        pos = self._pos
+        old = self._changes[pos]
+        self._changes[pos] = change
+        self._pos = pos + 1 if pos + 1 < self.period else 0
+        return self._apply(change, old)
+
+    def _apply(self, change, old):
+        """Add the newest change and, once the window is full, drop `old`."""
+        if change > 0:
+            self._gain_sum, self._gain_comp = _neumaier_add(self._gain_sum, self._gain_comp, change)
+            self._gains += 1
+        elif change < 0:
+            self._loss_sum, self._loss_comp = _neumaier_add(self._loss_sum, self._loss_comp, -change)
+            self._losses += 1
+
+        if self._count == self.period:
+            if old > 0:
+                self._gains -= 1
+                if self._gains:
+                    self._gain_sum, self._gain_comp = _neumaier_add(self._gain_sum, self._gain_comp, -old)
+                else:
+                    self._gain_sum = self._gain_comp = 0.0
+            elif old < 0:
+                self._losses -= 1
+                if self._losses:
+                    self._loss_sum, self._loss_comp = _neumaier_add(self._loss_sum, self._loss_comp, old)
+                else:
+                    self._loss_sum = self._loss_comp = 0.0
+        else:
+            self._count += 1
+
+        if self._count == self.period:
+            avg_gain = (self._gain_sum + self._gain_comp) / self.period
+            avg_loss = (self._loss_sum + self._loss_comp) / self.period
+            self.value = _rsi_from_averages(avg_gain, avg_loss)
+        return self.value
+
+
+class RingRSI(RSI):
+    """RSI that recomputes the price changes entering and leaving its window from a shared PriceRing."""
+
+    def __init__(self, period, ring):
+        super().__init__(period)
+        self._changes = None
+        self._ring = ring
+
+    def update(self, price):
+        ring = self._ring
+        if ring.count < 2:
+            return self.value
+        change = price - ring.ago(1)
+        old = 0.0
+        if self._count == self.period:
+            old = ring.ago(self.period) - ring.ago(self.period + 1)
+        return self._apply(change, old)
+
+
+class WilderRSI:
+    """
+    Wilder's RSI: the first averages are simple means over `period` changes,
+    after that they are smoothed with avg = (avg * (period - 1) + x) / period.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self._count = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self._last_price = None
+        self.value = None
+
+    def update(self, price):
+        last = self._last_price
+        self._last_price = price
+        if last is None:
+            return self.value
+
+        change = price - last
+        gain = change if change > 0 else 0.0
+        loss = 0.0 if change > 0 else -change
+
+        if self._count < self.period:
+            self._count += 1
+            self._avg_gain += gain / self.period
+            self._avg_loss += loss / self.period
+            if self._count < self.period:
+                return self.value
+        else:
+            n = self.period
+            self._avg_gain = (self._avg_gain * (n - 1) + gain) / n
+            self._avg_loss = (self._avg_loss * (n - 1) + loss) / n
+
+        self.value = _rsi_from_averages(self._avg_gain, self._avg_loss)
+        return self.value
+
+
+class Crossover:
+    """
+    Detects when a fast series crosses a slow one.
+
+    update() returns 1 when fast moves from at-or-below slow to above it,
+    -1 when it moves from at-or-above to below, and 0 otherwise.
+    """
+    NONE = 0
+    BULLISH = 1
+    BEARISH = -1
+
+    def __init__(self):
+        self.prev_fast = None
+        self.prev_slow = None
+        self.value = self.NONE
+
+    def update(self, fast, slow):
+        prev_fast = self.prev_fast
+        prev_slow = self.prev_slow
+        self.prev_fast = fast
+        self.prev_slow = slow
+
+        if prev_fast is None or prev_slow is None or fast is None or slow is None:
+            cross = self.NONE
+        elif prev_fast <= prev_slow and fast > slow:
+            cross = self.BULLISH
+        elif prev_fast >= prev_slow and fast < slow:
+            cross = self.BEARISH
+        else:
+            cross = self.NONE
+        self.value = cross
+        return cross
+
+
+class PriceRing:
+    """The last `capacity` prices in a fixed list; ago(0) is the newest."""
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._buf = [0.0] * capacity
+        self._pos = 0
+        self.count = 0          # prices held, up to capacity
+
+    def append(self, price):
+        pos = self._pos
+        self._buf[pos] = price
+        self._pos = pos + 1 if pos + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def reserve(self, capacity):
+        """Grow to at least `capacity` prices; only while still empty."""
+        if capacity <= self.capacity:
+            return
+        if self.count:
+            raise RuntimeError("cannot resize a PriceRing that already holds prices")
+        self.capacity = capacity
+        self._buf = [0.0] * capacity
+        self._pos = 0
+
+    def ago(self, n):
+        """The price appended n ticks before the newest one."""
+        return self._buf[self._pos - 1 - n]
+
+
+class IndicatorBank:
+    """
+    Indicators shared by several strategies on one feed.
+
+    sma(), rsi() and crossover() return the one instance for a given
+    window/period/pair, creating it on first use; update(price) advances the
+    shared PriceRing and every indicator once, so the per-tick cost depends
+    on the number of distinct indicators, not on how many strategies read
+    them. Everything must be registered before the first update.
+    """
+
+    def __init__(self):
+        self.ring = PriceRing(2)
+        self.ticks = 0
+        self._smas = {}
+        self._rsis = {}
+        self._crossovers = {}
+        self._crossings = []
+
+    def _reserve(self, depth):
+        if self.ticks:
+            raise RuntimeError("indicators must be registered before the first update")
+        self.ring.reserve(depth)
+
+    def sma(self, window):
+        indicator = self._smas.get(window)
+        if indicator is None:
+            # The price leaving the window is `window` ticks back
+            self._reserve(window + 1)
+            indicator = self._smas[window] = RingSMA(window, self.ring)
+        return indicator
+
+    def rsi(self, period):
+        indicator = self._rsis.get(period)
+        if indicator is None:
+            # The change leaving the window needs the prices period and period + 1 ticks back
+            self._reserve(period + 2)
+            indicator = self._rsis[period] = RingRSI(period, self.ring)
+        return indicator
+
+    def crossover(self, fast_window, slow_window):
+        """Crossover of SMA(fast_window) over SMA(slow_window); `value` holds this tick's result."""
+        key = (fast_window, slow_window)
+        indicator = self._crossovers.get(key)
+        if indicator is None:
+            self._reserve(0)
+            indicator = self._crossovers[key] = Crossover()
+            self._crossings.append((indicator, self.sma(fast_window), self.sma(slow_window)))
+        return indicator
+
+    @property
+    def size(self):
+        """Number of distinct indicators updated per tick."""
+        return len(self._smas) + len(self._rsis) + len(self._crossovers)
+
+    def update(self, price):
+        self.ring.append(price)
+        self.ticks += 1
+        for sma in self._smas.values():
+            sma.update(price)
+        for rsi in self._rsis.values():
+            rsi.update(price)
+        # A crossover only starts once both averages have a value, as in MovingAverageStrategy
+        for crossover, fast, slow in self._crossings:
+            fast_value = fast.value
+            slow_value = slow.value
+            if fast_value is not None and slow_value is not None:
+                crossover.update(fast_value, slow_value)
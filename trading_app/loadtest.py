@@ -0,0 +1,336 @@
+"""
+End-to-end load test of app.py against a local exchange and C++ stand-in.
+
+The driver starts three things and measures the pipeline between them:
+
+    LocalExchange   trades over a Binance-style websocket, paced steady,
+                    bursty or as a ramp (see localexchange.Pacer), each
+                    stamped with its send time
+    CppStandIn      answers app.py's signals after --latency (+ --jitter)
+                    seconds
+    app.py          under uvicorn in a child process, pointed at both through
+                    EXCHANGE_WS_URL, CPP_SIGNAL_ENDPOINT and
+                    CPP_CONFIRMATION_BIND, with its tick store in a temp dir
+
+Every --interval seconds it compares the scheduled rate with what the app
+ingested (/ingest) and the exchange-to-ingest lag. A window is sustained
+when the app took at least 95% of the scheduled trades and the lag stayed
+under --max-lag. If the exchange could not keep its own schedule while the
+app kept up with what it did send, the window is harness-bound: the driver,
+not app.py, was the limit. The report gives the highest sustained rate and
+latency percentiles: websocket receive -> C++ confirmation (the app's
+/latency), signal -> C++ (the stand-in), and C++ confirmation -> SSE event
+read from /trades/stream.
+
+Trade times are stamped in milliseconds like Binance's, so the
+exchange-to-ingest lag is only good to about a millisecond; the other
+latencies use nanosecond clocks.
+
+    python loadtest.py --mode ramp --rate 500 --ramp-to 20000 --duration 60
+    python loadtest.py --mode bursty --rate 2000 --burst 500 --latency 0.002
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+from cpp_standin import CppStandIn
+from localexchange import LocalExchange, Pacer, add_pacing_arguments, load_messages, synthetic_messages
+from metrics import Histogram
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SUSTAINED_FRACTION = 0.95
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def http_get(port, path, timeout=5.0):
+    """GET one of the app's JSON endpoints (HTTP/1.0, so the body ends with the connection)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: 127.0.0.1\r\n\r\n".encode())
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0].decode()
+    if status_line.split(" ")[1:2] != ["200"]:
+        raise ConnectionError(f"GET {path}: {status_line or 'no response'}")
+    return json.loads(body)
+
+
+class SSEWatcher:
+    """
+    Follows /trades/stream and times every trade event against the moment
+    the stand-in sent its confirmation (matched by the trade's seq).
+    """
+
+    def __init__(self, port, standin):
+        self.port = port
+        self.standin = standin
+        self.lag = Histogram("sse_lag", "C++ confirmation sent to SSE event received")
+        self.events = 0
+        self.unmatched = 0
+
+    async def run(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"GET /trades/stream HTTP/1.0\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n")
+        confirmed_at = self.standin.confirmed_at
+        event_type = "message"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if line.startswith(b"event:"):
+                    event_type = line[6:].strip().decode()
+                elif line.startswith(b"data:"):
+                    if event_type == "message":
+                        now = time.time_ns()
+                        self.events += 1
+                        sent_ns = confirmed_at.pop(json.loads(line[5:]).get("seq"), None)
+                        if sent_ns is None:
+                            self.unmatched += 1
+                        else:
+                            self.lag.record(now - sent_ns)
+                elif not line.strip():
+                    event_type = "message"
+        finally:
+            writer.close()
+
+
+@dataclass
+class Window:
+    end: float          # seconds since the exchange started sending
+    target: float       # scheduled trades per second
+    sent: float         # trades per second the exchange managed to send
+    ingested: float     # trades per second the app decoded and handed to the strategies
+    lag_ms: float       # exchange send -> handed to the strategies, newest trade
+    behind_ms: float    # how far the exchange was behind its own schedule
+    blocked: float      # share of the trades sent while the app's socket was backed up
+    status: str = ""    # "ok", "harness" or "saturated"
+
+
+STATUS_MARKS = {"ok": "✅", "harness": "⚠️  harness-bound", "saturated": "❌ saturated"}
+
+
+def classify(window, max_lag_ms):
+    """
+    "ok" when the app took the scheduled rate without lagging. A slow app
+    also shows up as the exchange falling behind, held up on its sends; an
+    exchange that falls behind without being held up is "harness"-bound.
+    """
+    fresh = window.lag_ms <= max_lag_ms
+    if fresh and window.behind_ms <= max_lag_ms and window.ingested >= SUSTAINED_FRACTION * window.target:
+        return "ok"
+    if fresh and window.blocked < 0.25 and window.ingested >= SUSTAINED_FRACTION * window.sent:
+        return "harness"
+    return "saturated"
+
+
+def start_app(port, exchange_url, signal_endpoint, confirmation_bind, symbols, tick_store_dir, log_path,
+              strategy_mode=None):
+    env = dict(os.environ, EXCHANGE_WS_URL=exchange_url, CPP_SIGNAL_ENDPOINT=signal_endpoint,
+               CPP_CONFIRMATION_BIND=confirmation_bind, SYMBOLS=",".join(symbols), TICK_STORE_DIR=tick_store_dir)
+    if strategy_mode:
+        env["STRATEGY_MODE"] = strategy_mode
+    # app.py prints every confirmation; only its log (stderr) is kept
+    with open(log_path, "wb") as log:
+        return subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+                                 "--port", str(port), "--log-level", "warning"],
+                                cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log)
+
+
+def stop_app(process, timeout=10.0):
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def wait_until_up(process, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py exited with code {process.returncode}")
+        try:
+            return await http_get(port, "/status", timeout=1.0)
+        except (OSError, ConnectionError, asyncio.TimeoutError):
+            await asyncio.sleep(0.2)
+    raise RuntimeError("app.py did not come up")
+
+
+async def sample(exchange, pacer, port, interval, duration, max_lag_ms, stop_after):
+    """Measure a window every `interval` seconds until `duration` or `stop_after` saturated windows in a row."""
+    while not exchange.connections:
+        await asyncio.sleep(0.05)
+    start = exchange.connected_at
+    windows = []
+    previous = (time.monotonic() - start, exchange.sent, (await http_get(port, "/ingest"))["messages"],
+                exchange.backed_up)
+    saturated = 0
+    while previous[0] < duration:
+        await asyncio.sleep(interval)
+        ingest = await http_get(port, "/ingest")
+        now = (time.monotonic() - start, exchange.sent, ingest["messages"], exchange.backed_up)
+        elapsed = now[0] - previous[0]
+        window = Window(
+            end=now[0],
+            # Unthrottled, the schedule is whatever the exchange manages to send
+            target=((pacer.count(now[0]) - pacer.count(previous[0])) if pacer else (now[1] - previous[1])) / elapsed,
+            sent=(now[1] - previous[1]) / elapsed,
+            ingested=(now[2] - previous[2]) / elapsed,
+            lag_ms=ingest["last_lag_ms"],
+            behind_ms=exchange.behind * 1000,
+            blocked=(now[3] - previous[3]) / max(now[1] - previous[1], 1),
+        )
+        window.status = classify(window, max_lag_ms)
+        windows.append(window)
+        print(f"{window.end:7.1f}s  target {window.target:9,.0f}/s  sent {window.sent:9,.0f}/s  "
+              f"ingested {window.ingested:9,.0f}/s  lag {window.lag_ms:8.1f} ms  "
+              f"behind {window.behind_ms:8.1f} ms  blocked {window.blocked:4.0%}  {STATUS_MARKS[window.status]}")
+        saturated = saturated + 1 if window.status == "saturated" else 0
+        if stop_after and saturated >= stop_after:
+            print(f"🛑 Saturated for {saturated} windows in a row, stopping")
+            break
+        previous = now
+    return windows
+
+
+
+def summarize(windows, latency, standin, sse):
+    sustained = [w.ingested for w in windows if w.status == "ok"]
+    harness = [w.ingested for w in windows if w.status == "harness"]
+    return {
+        "max_sustained_rate": max(sustained, default=0.0),
+        "max_harness_bound_rate": max(harness, default=0.0),
+        "saturated_windows": sum(w.status == "saturated" for w in windows),
+        "windows": [w.__dict__ for w in windows],
+        "latency_us": {
+            "exchange_to_receive": latency.get("trading_ws_receive_lag_seconds"),
+            "decode": latency.get("trading_decode_seconds"),
+            "strategy_on_tick": latency.get("trading_strategy_on_tick_seconds"),
+            "receive_to_confirmation": latency.get("trading_tick_to_confirmation_seconds"),
+            "signal_to_cpp": standin.signal_lag.summary(),
+            "confirmation_to_sse": sse.lag.summary(),
+        },
+        "signals": standin.received,
+        "confirmations": standin.confirmed,
+        "sse_events": sse.events,
+        "sse_unmatched": sse.unmatched,
+    }
+
+
+def print_report(report, max_lag_ms):
+    print("=" * 78)
+    print(f"🏁 Max sustained tick rate: {report['max_sustained_rate']:,.0f} ticks/s "
+          f"(>= {SUSTAINED_FRACTION:.0%} of schedule, lag <= {max_lag_ms:g} ms)")
+    if report["max_harness_bound_rate"] > report["max_sustained_rate"]:
+        print(f"⚠️  The app kept up with {report['max_harness_bound_rate']:,.0f} ticks/s while the exchange "
+              f"fell behind its schedule: the real ceiling is at least that")
+    print(f"Signals {report['signals']:,}, confirmations {report['confirmations']:,}, "
+          f"SSE trade events {report['sse_events']:,} ({report['sse_unmatched']} unmatched)")
+    print(f"{'latency (us)':28s}{'count':>10s}{'p50':>10s}{'p90':>10s}{'p99':>10s}{'p99.9':>10s}{'max':>10s}")
+    for name, s in report["latency_us"].items():
+        if not s:
+            continue
+        print(f"{name:28s}{s['count']:>10,}{s['p50_us']:>10.0f}{s['p90_us']:>10.0f}{s['p99_us']:>10.0f}"
+              f"{s['p999_us']:>10.0f}{s['max_us']:>10.0f}")
+
+
+async def run(args):
+    symbols = [s.strip().lower() for s in args.symbols.split(",") if s.strip()]
+    if args.store:
+        messages = load_messages(args.store, symbols)
+        print(f"📼 Loaded {len(messages):,} recorded trades")
+    else:
+        messages = synthetic_messages(symbols, args.synthetic)
+        print(f"🎲 Generated {len(messages):,} synthetic trades")
+
+    pacer = Pacer(args.mode, args.rate, args.burst, args.ramp_to, args.ramp_seconds) if args.rate else None
+    signal_port, confirmation_port, http_port = free_port(), free_port(), free_port()
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    log_path = os.path.join(workdir, "app.log")
+
+    standin = CppStandIn(f"tcp://127.0.0.1:{signal_port}", f"tcp://127.0.0.1:{confirmation_port}",
+                         args.latency, jitter=args.jitter, record=True)
+    exchange = LocalExchange(messages, pacer=pacer, stamp=True, repeat=True)
+    process = None
+    sse_task = None
+    try:
+        standin.start()
+        await exchange.start()
+        process = start_app(http_port, exchange.url, f"tcp://127.0.0.1:{signal_port}",
+                            f"tcp://127.0.0.1:{confirmation_port}", symbols, os.path.join(workdir, "ticks"),
+                            log_path, args.strategy_mode)
+        await wait_until_up(process, http_port)
+        sse = SSEWatcher(http_port, standin)
+        sse_task = asyncio.create_task(sse.run())
+        print(f"🚀 app.py on :{http_port}, exchange {exchange.url}, "
+              f"stand-in latency {args.latency * 1000:g} ms (+ up to {args.jitter * 1000:g} ms)")
+
+        windows = await sample(exchange, pacer, http_port, args.interval, args.duration, args.max_lag,
+                               args.stop_after)
+        await asyncio.sleep(max(args.latency + args.jitter, 0.2))   # let in-flight confirmations land
+        report = summarize(windows, await http_get(http_port, "/latency"), standin, sse)
+    except RuntimeError:
+        with open(log_path, errors="replace") as log:
+            sys.stderr.write(log.read()[-4000:])
+        raise
+    finally:
+        if sse_task is not None:
+            sse_task.cancel()
+        if process is not None:
+            stop_app(process)
+        await exchange.close()
+        standin.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report, args.max_lag)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📁 Report saved to {args.json}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test app.py end to end against a local exchange")
+    parser.add_argument("--symbols", default="btcusdt", help="comma-separated symbols")
+    parser.add_argument("--store", default=None, help="replay this tick store instead of synthetic trades")
+    parser.add_argument("--synthetic", type=int, default=200_000, help="synthetic trades to cycle through")
+    add_pacing_arguments(parser)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to measure")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds per measurement window")
+    parser.add_argument("--max-lag", type=float, default=250.0, help="highest sustainable ingest lag, ms")
+    parser.add_argument("--stop-after", type=int, default=3,
+                        help="stop after this many saturated windows in a row (0 = run the full duration)")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in seconds before each confirmation")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stand-in extra seconds, up to")
+    parser.add_argument("--strategy-mode", default=None, help="STRATEGY_MODE for app.py (see dispatch.py)")
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
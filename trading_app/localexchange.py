@@ -0,0 +1,331 @@
+"""
+Local stand-in for the Binance trade websocket, replaying recorded trades.
+
+Serves the same endpoints as Binance:
+
+    /ws/<symbol>@trade                      raw trade messages for one symbol
+    /stream?streams=<a>@trade/<b>@trade     {"stream": ..., "data": ...} wrappers
+
+so the scraper can be pointed at it with base_url=exchange.url. Messages come
+from the tick store (see load_messages), synthetic_messages() or any list of
+(symbol, message) pairs, in order. With disconnect_every set, the server
+drops each connection after that many messages and the next connection
+carries on where the last one stopped, which exercises the client's
+reconnect path.
+
+A Pacer sets the send schedule of each connection:
+
+    steady  `rate` messages per second
+    bursty  `burst` messages back to back, at an average of `rate` per second
+    ramp    from `rate` up to `ramp_to` per second over `ramp_seconds`, then
+            holding `ramp_to` (for finding where a consumer saturates)
+
+A client that reads too slowly holds the exchange up: once the socket
+buffers are full (`backed_up` counts the messages sent into a full socket)
+ws.send waits and the exchange falls behind its schedule (`behind`, in
+seconds).
+For load tests, stamp=True rewrites each trade's E/T to the send time and
+repeat=True cycles through the messages forever.
+
+    python localexchange.py --store tick_data --symbols btcusdt,ethusdt --port 9001
+    python localexchange.py --synthetic 1000000 --mode ramp --rate 1000 --ramp-to 50000 --stamp
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import math
+import random
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+from tickstore import TickStore
+
+logger = logging.getLogger(__name__)
+
+
+def trade_message(symbol, ts_ns, price, qty, trade_id, buyer_maker):
+    """A Binance trade message rebuilt from one tick store row."""
+    ts_ms = int(ts_ns) // 1_000_000
+    return {
+        "e": "trade",
+        "E": ts_ms,
+        "s": symbol.upper(),
+        "t": int(trade_id),
+        "p": repr(float(price)),
+        "q": repr(float(qty)),
+        "T": ts_ms,
+        "m": bool(buyer_maker),
+        "M": True,
+    }
+
+
+def _store_rows(root, symbol, start_ns, end_ns):
+    for _, columns in TickStore(root, symbol).iter_range(start_ns, end_ns):
+        for row in zip(columns["ts_ns"].tolist(), columns["price"].tolist(), columns["qty"].tolist(),
+                       columns["trade_id"].tolist(), columns["buyer_maker"].tolist()):
+            yield row[0], symbol, row
+
+
+def load_messages(root, symbols, start_ns=0, end_ns=2**63 - 1):
+    """Recorded trades for several symbols, merged in time order, as (symbol, message) pairs."""
+    symbols = [s.lower() for s in symbols]
+    merged = heapq.merge(*(_store_rows(root, s, start_ns, end_ns) for s in symbols), key=lambda r: r[0])
+    return [(symbol, trade_message(symbol, *row)) for _, symbol, row in merged]
+
+
+def synthetic_messages(symbols, count, start_price=100.0, volatility=0.0005, seed=0, start_ms=None):
+    """
+    `count` trades of a geometric random walk per symbol, symbols interleaved
+    at random, one millisecond apart (from now, or start_ms), as (symbol, message) pairs.
+    """
+    rng = random.Random(seed)
+    symbols = [s.lower() for s in symbols]
+    prices = dict.fromkeys(symbols, start_price)
+    start_ms = int(time.time() * 1000) if start_ms is None else start_ms
+    messages = []
+    for i in range(count):
+        symbol = rng.choice(symbols)
+        prices[symbol] *= math.exp(rng.gauss(0.0, volatility))
+        qty = round(rng.expovariate(20.0), 5) or 0.00001
+        messages.append((symbol, trade_message(symbol, (start_ms + i) * 1_000_000, round(prices[symbol], 2), qty,
+                                               i + 1, rng.random() < 0.5)))
+    return messages
+
+
+class Pacer:
+    """Send schedule: when message k is due and how many are due by time t (seconds from the start)."""
+    MODES = ("steady", "bursty", "ramp")
+
+    def __init__(self, mode="steady", rate=1000.0, burst=100, ramp_to=None, ramp_seconds=60.0):
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.mode = mode
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.ramp_to = float(ramp_to if ramp_to is not None else rate)
+        self.ramp_seconds = float(ramp_seconds)
+        # Rate climbs linearly: rate(t) = rate + slope * t until ramp_seconds
+        self._slope = (self.ramp_to - self.rate) / self.ramp_seconds if self.ramp_seconds > 0 else 0.0
+        self._ramp_count = self.count(self.ramp_seconds) if mode == "ramp" else 0.0
+
+    def rate_at(self, t):
+        """Target messages per second at time t (the average rate for bursty)."""
+        if self.mode == "ramp":
+            return self.rate + self._slope * min(t, self.ramp_seconds)
+        return self.rate
+
+    def count(self, t):
+        """Messages due by time t."""
+        if t <= 0:
+            return 0.0
+        if self.mode == "steady":
+            return self.rate * t
+        if self.mode == "bursty":
+            return (math.floor(t * self.rate / self.burst) + 1) * self.burst
+        if t <= self.ramp_seconds:
+            return self.rate * t + self._slope * t * t / 2
+        return self._ramp_count + self.ramp_to * (t - self.ramp_seconds)
+
+    def due(self, k):
+        """Time at which message k (from 0) is due."""
+        if self.mode == "steady":
+            return k / self.rate
+        if self.mode == "bursty":
+            return (k // self.burst) * self.burst / self.rate
+        if k <= self._ramp_count:
+            if not self._slope:
+                return k / self.rate
+            return (math.sqrt(self.rate * self.rate + 2 * self._slope * k) - self.rate) / self._slope
+        return self.ramp_seconds + (k - self._ramp_count) / self.ramp_to
+
+
+class LocalExchange:
+    def __init__(self, messages, host="127.0.0.1", port=0, rate=None, disconnect_every=None,
+                 pacer=None, stamp=False, repeat=False):
+        self.messages = messages
+        self.host = host
+        self.port = port
+        self.rate = rate                    # messages per second, None = as fast as possible
+        self.disconnect_every = disconnect_every
+        # An explicit pacer wins over rate; neither = as fast as possible
+        self.pacer = pacer if pacer is not None else (Pacer("steady", rate) if rate else None)
+        self.stamp = stamp
+        self.repeat = repeat
+        self.sent = 0
+        self.connections = 0
+        self.connected_at = None            # time.monotonic() when the latest connection started its schedule
+        self.behind = 0.0                   # how late the latest message went out against the schedule, seconds
+        self.max_behind = 0.0
+        self.backed_up = 0                  # messages sent while a client's socket was backed up
+        self._cursors = {}                  # subscription -> index of the next message
+        self._frames = {}                   # combined? -> encoded messages
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Local exchange listening on %s", self.url)
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _encode(self, combined):
+        """
+        Every message as (stream, frame), encoded once. With stamp the frame
+        is (head, middle, tail), to be joined around the send time (ms) for E and T.
+        """
+        frames = []
+        for symbol, data in self.messages:
+            stream = f"{symbol}@trade"
+            if self.stamp:
+                data = {**data, "E": 0, "T": 0}
+            payload = {"stream": stream, "data": data} if combined else data
+            # Compact separators, byte-for-byte like Binance
+            text = json.dumps(payload, separators=(",", ":"))
+            if self.stamp:
+                head, _, rest = text.partition('"E":0')
+                middle, _, tail = rest.partition('"T":0')
+                text = (head + '"E":', middle + '"T":', tail)
+            frames.append((stream, text))
+        return frames
+
+    @staticmethod
+    def _subscription(path):
+        parts = urlsplit(path)
+        if parts.path.startswith("/ws/"):
+            return frozenset([parts.path[4:].lower()]), False
+        if parts.path == "/stream":
+            streams = parse_qs(parts.query).get("streams", [""])[0]
+            return frozenset(s.lower() for s in streams.split("/") if s), True
+        return None, False
+
+    async def _handle(self, ws):
+        streams, combined = self._subscription(ws.request.path)
+        if not streams:
+            await ws.close(code=1008, reason="unknown endpoint")
+            return
+
+        self.connections += 1
+        key = (streams, combined)
+        i = self._cursors.get(key, 0)
+        sent_here = 0
+        pacer = self.pacer
+        stamp = self.stamp
+        frames = self._frames.get(combined)
+        if frames is None:
+            frames = self._frames[combined] = self._encode(combined)
+        count = len(frames)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.connected_at = time.monotonic()
+
+        try:
+            while i < count or (self.repeat and count):
+                if i >= count:
+                    i = 0
+                stream, frame = frames[i]
+                i += 1
+                if stream not in streams:
+                    continue
+                if pacer is not None:
+                    late = loop.time() - start - pacer.due(sent_here)
+                    # asyncio sleeps are ~1 ms coarse: only sleep when more than that early
+                    if late < -0.001:
+                        await asyncio.sleep(-late)
+                        late = 0.0
+                    self.behind = max(late, 0.0)
+                    if self.behind > self.max_behind:
+                        self.max_behind = self.behind
+                if stamp:
+                    now_ms = str(time.time_ns() // 1_000_000)
+                    head, middle, tail = frame
+                    frame = head + now_ms + middle + now_ms + tail
+                await ws.send(frame)
+                # Bytes the kernel would not take yet: the client is not keeping up
+                if ws.transport.get_write_buffer_size():
+                    self.backed_up += 1
+                self.sent += 1
+                sent_here += 1
+                self._cursors[key] = i
+                if self.disconnect_every and sent_here >= self.disconnect_every and (i < count or self.repeat):
+                    break
+                if sent_here % 1000 == 0:
+                    await asyncio.sleep(0)  # let other connections in
+        except websockets.ConnectionClosed:
+            return
+        self._cursors[key] = i
+        await ws.close()
+
+
+def pacer_from_args(args):
+    """The Pacer for --mode/--rate/--burst/--ramp-to/--ramp-seconds, or None if unthrottled."""
+    if args.rate is None:
+        return None
+    return Pacer(args.mode, args.rate, args.burst, args.ramp_to, args.ramp_seconds)
+
+
+def add_pacing_arguments(parser):
+    parser.add_argument("--mode", choices=Pacer.MODES, default="steady", help="send schedule")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="messages per second (the start rate for ramp; default: unthrottled)")
+    parser.add_argument("--burst", type=int, default=100, help="messages per burst in bursty mode")
+    parser.add_argument("--ramp-to", type=float, default=None, help="final rate in ramp mode")
+    parser.add_argument("--ramp-seconds", type=float, default=60.0, help="ramp duration")
+
+
+async def _serve(args):
+    symbols = [s.strip().lower() for s in args.symbols.split(",") if s.strip()]
+    if args.synthetic:
+        messages = synthetic_messages(symbols, args.synthetic)
+        print(f"🎲 Generated {len(messages)} synthetic trades for {', '.join(symbols)}")
+    else:
+        messages = load_messages(args.store, symbols)
+        print(f"📼 Loaded {len(messages)} recorded trades for {', '.join(symbols)}")
+    exchange = LocalExchange(messages, args.host, args.port, disconnect_every=args.disconnect_every,
+                             pacer=pacer_from_args(args), stamp=args.stamp, repeat=args.repeat)
+    async with exchange:
+        print(f"🚀 Serving on {exchange.url} (combined stream: {exchange.url}/stream?streams=...)")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded trades over a Binance-style websocket")
+    parser.add_argument("--store", default="tick_data", help="tick store directory")
+    parser.add_argument("--synthetic", type=int, default=0, help="serve this many synthetic trades instead")
+    parser.add_argument("--symbols", default="btcusdt", help="comma-separated symbols")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    add_pacing_arguments(parser)
+    parser.add_argument("--stamp", action="store_true", help="stamp each trade with its send time")
+    parser.add_argument("--repeat", action="store_true", help="cycle through the trades forever")
+    parser.add_argument("--disconnect-every", type=int, default=None,
+                        help="drop each connection after this many messages")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
 import asyncio
+import json
 import logging
+import os
 
-from strategy import MovingAverageStrategy
-from execution import ExecutionEngine
-from engine import TradingEngine
-from scraper import stream_binance
+from shards import ShardConfig, ShardPool, run_shard
 
 
 # Configure logging for the application
@@ -15,25 +14,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Every trade is recorded here for backtests and replays
+TICK_STORE_DIR = os.environ.get("TICK_STORE_DIR", "tick_data")
+
+# Strategy/execution state is restored from here at startup and saved back every
+# SNAPSHOT_INTERVAL seconds and after every fill (unset = start cold)
+SNAPSHOT_OPTIONS = {
+    "snapshot_dir": os.environ.get("SNAPSHOT_DIR") or None,
+    "snapshot_interval": float(os.environ.get("SNAPSHOT_INTERVAL", "5")),
+}
+
+# Overrides for the trade stream and the C++ signal socket, e.g. a local exchange
+# and C++ stand-in for load tests (see localexchange.py, cpp_standin.py)
+ENDPOINT_OPTIONS = {
+    key: value for key, value in (("base_url", os.environ.get("EXCHANGE_WS_URL")),
+                                  ("endpoint", os.environ.get("CPP_SIGNAL_ENDPOINT")))
+    if value
+}
+
+# Comma-separated symbols to trade, and how many worker processes to shard them over
+SYMBOLS = [s.strip().lower() for s in os.environ.get("SYMBOLS", "btcusdt").split(",") if s.strip()]
+WORKERS = int(os.environ.get("WORKERS", "1"))
+
+STRATEGY_PARAMS = {"short_window": 2, "long_window": 5}
+
+# > 0: keep a local L2 book per symbol from the depth stream; strategies see its
+# top of book, with the imbalance over this many levels (see orderbook.py)
+DEPTH_LEVELS = int(os.environ.get("DEPTH_LEVELS", "0"))
+
+# Optional JSON object of named strategy variants, e.g.
+# {"fast": {"short_window": 2, "long_window": 5}, "slow": {"short_window": 5, "long_window": 20}};
+# every symbol then runs all of them on shared indicators, each with its own book
+STRATEGY_VARIANTS = json.loads(os.environ.get("STRATEGY_VARIANTS", "null"))
+
+# Run the strategies on completed bars instead of every trade: "time:<seconds>",
+# "tick:<trades>" or "volume:<quantity>" (see bars.py); unset = every trade
+BARS = os.environ.get("BARS") or None
+
+# Strategies run "inline" on the websocket reader, or behind a bounded tick queue
+# in a "task", "thread" or "process" (see dispatch.py)
+QUEUE_OPTIONS = {
+    "strategy_mode": os.environ.get("STRATEGY_MODE", "inline"),
+    "tick_queue_policy": os.environ.get("TICK_QUEUE_POLICY", "all"),
+    "tick_queue_size": int(os.environ.get("TICK_QUEUE_SIZE", "10000")),
+}
+
 
 async def main():
     """
-    Initialize trading strategy, execution engine, and trading engine.
+    Initialize a trading strategy and execution engine per symbol.
     Stream live market data from Binance and process signals in real-time.
     """
-    # --- Initialize components ---
-    strategy = MovingAverageStrategy(short_window=2, long_window=5)
-    execution = ExecutionEngine()
-    engine = TradingEngine(strategy=strategy, execution=execution)
+    config = ShardConfig(symbols=SYMBOLS, strategy_params=STRATEGY_PARAMS, strategy_variants=STRATEGY_VARIANTS,
+                         depth_levels=DEPTH_LEVELS, bars=BARS, tick_store_dir=TICK_STORE_DIR, **QUEUE_OPTIONS,
+                         **SNAPSHOT_OPTIONS, **ENDPOINT_OPTIONS)
 
-    logger.info("Trading system initialized and connecting to Binance stream...")
+    logger.info("Trading system initialized and connecting to Binance stream for %s...", ", ".join(SYMBOLS))
 
     # --- Start streaming market data ---
-    await stream_binance(symbol="btcusdt", engine=engine)
+    await run_shard(config)
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if WORKERS > 1:
+            # One process per shard of symbols; the pool restarts crashed workers
+            ShardPool(SYMBOLS, WORKERS, strategy_params=STRATEGY_PARAMS,
+                      strategy_variants=STRATEGY_VARIANTS, depth_levels=DEPTH_LEVELS, bars=BARS,
+                      tick_store_dir=TICK_STORE_DIR, **QUEUE_OPTIONS, **SNAPSHOT_OPTIONS, **ENDPOINT_OPTIONS).run()
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Execution interrupted by user. Exiting gracefully...")
@@ -0,0 +1,221 @@
+"""
+Low-overhead latency metrics with a Prometheus text exposition.
+
+Histogram is HDR-style: values (integer nanoseconds) fall into log-linear
+buckets, 16 per power of two, so any recorded value is known to within
+~6% and memory is a fixed list of counters no matter how many values are
+recorded or how large they get. record() is a few integer operations.
+
+PipelineMetrics bundles the histograms, counters and gauges for the trading
+pipeline, from websocket receive to the C++ confirmation:
+
+    ws_receive       exchange trade time -> websocket receive (wall clocks)
+    decode           decoding one trade message (averaged over its batch)
+    strategy         strategy.on_tick
+    execution        execution.on_signal
+    zmq_send         order queued in the gateway -> handed to the ZMQ socket
+    confirmation     order handed to ZMQ -> C++ confirmation received
+    tick_to_confirm  triggering tick received -> C++ confirmation received
+
+Orders and confirmations are matched by sequence id (the order id).
+"""
+from collections import deque
+
+SUB_BITS = 4
+SUB_COUNT = 1 << SUB_BITS           # buckets per power of two
+MAX_EXPONENT = 44                   # values up to ~2**44 ns (~4.9 hours), larger ones are clamped
+BUCKET_COUNT = (MAX_EXPONENT - SUB_BITS + 1) * SUB_COUNT + 2 * SUB_COUNT
+
+# Bucket boundaries published to Prometheus, in seconds
+EXPORT_BOUNDS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def bucket_index(value):
+    """Fine bucket of a non-negative integer value."""
+    if value < 2 * SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+def bucket_bounds(index):
+    """[low, high) range of values that land in a fine bucket."""
+    if index < 2 * SUB_COUNT:
+        return index, index + 1
+    shift = (index >> SUB_BITS) - 1
+    mantissa = index - (shift << SUB_BITS)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Histogram:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        """Record one value in nanoseconds (negative values, e.g. clock skew, count as 0)."""
+        if value < 2 * SUB_COUNT:
+            index = value if value > 0 else 0
+        else:
+            shift = value.bit_length() - SUB_BITS - 1
+            index = (shift << SUB_BITS) + (value >> shift)
+            if index >= BUCKET_COUNT:
+                index = BUCKET_COUNT - 1
+        self.counts[index] += 1
+        self.count += 1
+        if value > 0:
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Approximate q-quantile in nanoseconds (the midpoint of its bucket)."""
+        if self.count == 0:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                low, high = bucket_bounds(index)
+                return min((low + high - 1) // 2, self.max)
+        return self.max
+
+    def summary(self):
+        """Count, mean, percentiles and max, in microseconds."""
+        return {
+            "count": self.count,
+            "mean_us": (self.total / self.count / 1000) if self.count else 0.0,
+            "p50_us": self.quantile(0.5) / 1000,
+            "p90_us": self.quantile(0.9) / 1000,
+            "p99_us": self.quantile(0.99) / 1000,
+            "p999_us": self.quantile(0.999) / 1000,
+            "max_us": self.max / 1000,
+        }
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        index = 0
+        for bound in EXPORT_BOUNDS:
+            bound_ns = int(bound * 1e9)
+            # Count every fine bucket that lies entirely at or below the bound
+            while index < BUCKET_COUNT and bucket_bounds(index)[1] <= bound_ns + 1:
+                cumulative += self.counts[index]
+                index += 1
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.total / 1e9}")
+        lines.append(f"{self.name}_count {self.count}")
+        return "\n".join(lines)
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def render(self):
+        return f"# HELP {self.name} {self.help}\n# TYPE {self.name} counter\n{self.name} {self.value}"
+
+
+class Gauge:
+    """A value read from a callable at scrape time."""
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self):
+        return f"# HELP {self.name} {self.help}\n# TYPE {self.name} gauge\n{self.name} {self.read()}"
+
+
+class Registry:
+    def __init__(self, prefix="trading_"):
+        self.prefix = prefix
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help):
+        return self._add(Histogram(self.prefix + name, help))
+
+    def counter(self, name, help):
+        return self._add(Counter(self.prefix + name, help))
+
+    def gauge(self, name, help, read):
+        return self._add(Gauge(self.prefix + name, help, read))
+
+    def render(self):
+        """The Prometheus text exposition (format 0.0.4)."""
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+class PipelineMetrics:
+    # Orders awaiting confirmation that are remembered for matching
+    MAX_PENDING = 10000
+
+    def __init__(self, registry=None):
+        self.registry = registry or Registry()
+        r = self.registry
+        self.ws_receive = r.histogram("ws_receive_lag_seconds", "Exchange trade time to websocket receive")
+        self.decode = r.histogram("decode_seconds", "Decoding one trade message (batch average)")
+        self.strategy = r.histogram("strategy_on_tick_seconds", "strategy.on_tick")
+        self.execution = r.histogram("execution_on_signal_seconds", "execution.on_signal")
+        self.zmq_send = r.histogram("zmq_send_seconds", "Order queued in the gateway to handed to ZMQ")
+        self.confirmation = r.histogram("confirmation_seconds", "Order handed to ZMQ to C++ confirmation")
+        self.tick_to_confirm = r.histogram("tick_to_confirmation_seconds",
+                                           "Triggering tick received to C++ confirmation")
+        self.ticks = r.counter("ticks_total", "Ticks processed by the strategy")
+        self.signals = r.counter("signals_total", "BUY/SELL signals generated")
+        self.confirmations = r.counter("confirmations_total", "C++ confirmations received")
+        self.unmatched = r.counter("unmatched_confirmations_total",
+                                   "Confirmations whose order was not found (unknown or evicted seq)")
+
+        self._pending = {}
+        self._pending_order = deque()
+
+    def order_sent(self, order, sent_ns):
+        """Remember when an order left (time.time_ns()) so its confirmation can be timed."""
+        seq = order.get("id")
+        if seq is None:
+            return
+        if len(self._pending_order) >= self.MAX_PENDING:
+            self._pending.pop(self._pending_order.popleft(), None)
+        self._pending[seq] = (order.get("recv_ts_ns", 0), sent_ns)
+        self._pending_order.append(seq)
+
+    def order_confirmed(self, seq, now_ns):
+        self.confirmations.inc()
+        sent = self._pending.pop(seq, None) if seq is not None else None
+        if sent is None:
+            self.unmatched.inc()
+            return
+        recv_ts_ns, sent_ns = sent
+        self.confirmation.record(now_ns - sent_ns)
+        if recv_ts_ns:
+            self.tick_to_confirm.record(now_ns - recv_ts_ns)
+
+    def histograms(self):
+        return [m for m in self.registry.metrics if isinstance(m, Histogram)]
+
+    def summary(self):
+        """Latency percentiles per stage, in microseconds."""
+        return {h.name: h.summary() for h in self.histograms()}
+
+    def render(self):
+        return self.registry.render()
@@ -1,13 +1,134 @@
 from enum import Enum
-from dataclasses import dataclass
 from datetime import datetime
 
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 class Signal(Enum):
     BUY = "BUY"
     SELL = "SELL"
     HOLD = "HOLD"
 
-@dataclass
+
 class Tick:
-    price: float
-    timestamp: datetime
+    """
+    One trade as the strategy sees it.
+
+    exchange_ts_ns is the exchange's trade time and recv_ts_ns the moment we
+    received it, both integer nanoseconds since the epoch (0 = unknown).
+    qty is the traded quantity (0.0 when the source does not carry it).
+    `timestamp`, the formatted time used in trade records, is only built
+    when something reads it (i.e. when a trade is emitted) unless it was
+    given explicitly.
+    """
+    __slots__ = ("price", "exchange_ts_ns", "recv_ts_ns", "_timestamp", "qty")
+
+    def __init__(self, price: float, exchange_ts_ns: int = 0, recv_ts_ns: int = 0, timestamp: str | None = None,
+                 qty: float = 0.0):
+        self.price = price
+        self.exchange_ts_ns = exchange_ts_ns
+        self.recv_ts_ns = recv_ts_ns
+        self._timestamp = timestamp
+        self.qty = qty
+
+    @property
+    def timestamp(self) -> str:
+        if self._timestamp is None:
+            self._timestamp = format_ns(self.exchange_ts_ns or self.recv_ts_ns)
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self._timestamp = value
+
+    def __repr__(self):
+        return (f"Tick(price={self.price!r}, exchange_ts_ns={self.exchange_ts_ns!r}, "
+                f"recv_ts_ns={self.recv_ts_ns!r})")
+
+
+class Bar(Tick):
+    """
+    A completed OHLCV bar. It is a Tick at the bar's close, so strategies and
+    execution take bars wherever they take ticks: price is the close,
+    exchange_ts_ns/recv_ts_ns are those of the last trade in the bar and qty
+    is the bar's volume. start_ns is the exchange time of its first trade.
+    """
+    __slots__ = ("open", "high", "low", "count", "start_ns")
+
+    def __init__(self, open, high, low, close, volume, count, start_ns, exchange_ts_ns, recv_ts_ns=0):
+        super().__init__(close, exchange_ts_ns, recv_ts_ns, qty=volume)
+        self.open = open
+        self.high = high
+        self.low = low
+        self.count = count
+        self.start_ns = start_ns
+
+    @property
+    def close(self):
+        return self.price
+
+    @property
+    def volume(self):
+        return self.qty
+
+    def __repr__(self):
+        return (f"Bar(open={self.open!r}, high={self.high!r}, low={self.low!r}, close={self.price!r}, "
+                f"volume={self.qty!r}, count={self.count!r}, start_ns={self.start_ns!r}, "
+                f"end_ns={self.exchange_ts_ns!r})")
+
+
+class BookEvent:
+    """
+    Top of the L2 order book after one depth update, the order book's
+    counterpart of Tick. bid/ask are None while that side is empty;
+    imbalance is (bid volume - ask volume) / (bid volume + ask volume) over
+    the top `levels` levels of each side, in [-1, 1].
+    """
+    __slots__ = ("bid", "bid_qty", "ask", "ask_qty", "imbalance", "levels", "update_id",
+                 "exchange_ts_ns", "recv_ts_ns")
+
+    def __init__(self, bid, bid_qty, ask, ask_qty, imbalance=0.0, levels=0, update_id=0,
+                 exchange_ts_ns=0, recv_ts_ns=0):
+        self.bid = bid
+        self.bid_qty = bid_qty
+        self.ask = ask
+        self.ask_qty = ask_qty
+        self.imbalance = imbalance
+        self.levels = levels
+        self.update_id = update_id
+        self.exchange_ts_ns = exchange_ts_ns
+        self.recv_ts_ns = recv_ts_ns
+
+    @property
+    def mid(self):
+        if self.bid is None or self.ask is None:
+            return None
+        return (self.bid + self.ask) / 2
+
+    @property
+    def spread(self):
+        if self.bid is None or self.ask is None:
+            return None
+        return self.ask - self.bid
+
+    def __repr__(self):
+        return (f"BookEvent(bid={self.bid!r}, ask={self.ask!r}, imbalance={self.imbalance!r}, "
+                f"update_id={self.update_id!r})")
+
+
+# (second, formatted) of the last call, replaced as one tuple so threads
+# never see a second paired with another second's string
+_last_stamp = (None, None)
+
+
+def format_ns(ts_ns: int) -> str:
+    """
+    Render a nanosecond timestamp the way trade records show it.
+    Bursts of ticks share a second, so the last formatted second is reused.
+    """
+    global _last_stamp
+    second = ts_ns // 1_000_000_000
+    cached_second, stamp = _last_stamp
+    if second != cached_second:
+        stamp = datetime.fromtimestamp(second).strftime(TIMESTAMP_FORMAT)
+        _last_stamp = (second, stamp)
+    return stamp
@@ -0,0 +1,328 @@
+"""
+Local L2 order book kept in sync from Binance depth snapshots and diffs.
+
+Each side is two parallel float arrays (price key, quantity) sorted so the
+best level is the last element: inserting, updating or removing a level is
+a bisect plus, at worst, a short memmove near the top of the book, and best
+bid/ask, mid, spread and top-N volumes are read straight off the end.
+
+Binance's sequencing rules (spot diff depth stream):
+
+    - diffs with u <= the snapshot's lastUpdateId are stale and dropped
+    - the first diff applied must have U <= lastUpdateId + 1 <= u
+    - every later diff must have U == previous u + 1
+
+Anything else is a gap: the book is dropped, diffs are buffered again and a
+new snapshot is needed (DepthSync tracks this). Quantities are absolute; a
+quantity of 0 removes the level.
+
+Recorded depth (DepthRecorder, one JSON object per line: {"snapshot": ...}
+or {"recv_ts_ns": ..., "diff": ...}) replays offline through the same path:
+
+    python orderbook.py depth_btcusdt.jsonl [--levels 10]
+"""
+import argparse
+import json
+import time
+from array import array
+from bisect import bisect_left
+
+from models import BookEvent
+
+try:
+    import orjson
+except ImportError:  # optional, faster parser
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class BookGap(Exception):
+    """A depth diff does not follow the previous one; the book needs a new snapshot."""
+
+
+class BookSide:
+    """
+    Price levels of one side. Keys are prices for bids and negated prices
+    for asks, kept ascending, so the best level of either side is the last.
+    """
+
+    def __init__(self, bids):
+        self.sign = 1.0 if bids else -1.0
+        self.keys = array("d")
+        self.qtys = array("d")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = array("d")
+        self.qtys = array("d")
+
+    def load(self, levels):
+        """Replace the side with [price, qty] pairs (strings or numbers), in any order."""
+        sign = self.sign
+        pairs = sorted((float(price) * sign, float(qty)) for price, qty in levels if float(qty))
+        self.keys = array("d", [key for key, _ in pairs])
+        self.qtys = array("d", [qty for _, qty in pairs])
+
+    def set(self, price, qty):
+        key = price * self.sign
+        keys = self.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if qty:
+                self.qtys[i] = qty
+            else:
+                del keys[i]
+                del self.qtys[i]
+        elif qty:
+            keys.insert(i, key)
+            self.qtys.insert(i, qty)
+
+    @property
+    def best_price(self):
+        return self.keys[-1] * self.sign if self.keys else None
+
+    @property
+    def best_qty(self):
+        return self.qtys[-1] if self.qtys else 0.0
+
+    def volume(self, n):
+        """Total quantity of the best n levels."""
+        return sum(self.qtys[-n:]) if n > 0 else 0.0
+
+    def top(self, n):
+        """The best n levels as (price, qty), best first."""
+        sign = self.sign
+        count = min(n, len(self.keys))
+        return [(self.keys[-1 - i] * sign, self.qtys[-1 - i]) for i in range(count)]
+
+
+class OrderBook:
+    """
+    An L2 book for one symbol. load_snapshot() starts it, apply() applies
+    one diff event (the parsed "depthUpdate" dict) and raises BookGap when
+    the sequence breaks. `levels` is the depth used by imbalance() and the
+    BookEvents.
+    """
+
+    def __init__(self, symbol=None, levels=10):
+        self.symbol = symbol
+        self.levels = levels
+        self.bids = BookSide(bids=True)
+        self.asks = BookSide(bids=False)
+        self.last_update_id = None      # None = no snapshot loaded
+        self._first = True              # the next diff is the first after the snapshot
+        self.updates = 0
+        self.stale = 0
+        self.gaps = 0
+
+    @property
+    def synced(self):
+        return self.last_update_id is not None
+
+    def load_snapshot(self, snapshot):
+        """Start from a REST snapshot: {"lastUpdateId": ..., "bids": [[p, q], ...], "asks": [...]}."""
+        self.bids.load(snapshot["bids"])
+        self.asks.load(snapshot["asks"])
+        self.last_update_id = int(snapshot["lastUpdateId"])
+        self._first = True
+
+    def reset(self):
+        self.bids.clear()
+        self.asks.clear()
+        self.last_update_id = None
+
+    def apply(self, event):
+        """
+        Apply one diff. Returns False if it was stale (already contained in
+        the snapshot) and ignored; raises BookGap, after dropping the book,
+        if it does not follow on from the last applied update.
+        """
+        if self.last_update_id is None:
+            raise BookGap("no snapshot loaded")
+        first_id = event["U"]
+        last_id = event["u"]
+        expected = self.last_update_id + 1
+        if last_id < expected:
+            self.stale += 1
+            return False
+        if first_id > expected or (not self._first and first_id != expected):
+            self.gaps += 1
+            self.reset()
+            raise BookGap(f"expected update {expected}, got {first_id}..{last_id}")
+
+        set_bid = self.bids.set
+        for price, qty in event["b"]:
+            set_bid(float(price), float(qty))
+        set_ask = self.asks.set
+        for price, qty in event["a"]:
+            set_ask(float(price), float(qty))
+        self.last_update_id = last_id
+        self._first = False
+        self.updates += 1
+        return True
+
+    @property
+    def best_bid(self):
+        return self.bids.best_price
+
+    @property
+    def best_ask(self):
+        return self.asks.best_price
+
+    @property
+    def mid(self):
+        bid, ask = self.bids.best_price, self.asks.best_price
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    @property
+    def spread(self):
+        bid, ask = self.bids.best_price, self.asks.best_price
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def imbalance(self, n=None):
+        """(bid volume - ask volume) / total over the top n levels (default: self.levels); 0.0 if empty."""
+        n = self.levels if n is None else n
+        bid_volume = self.bids.volume(n)
+        ask_volume = self.asks.volume(n)
+        total = bid_volume + ask_volume
+        return (bid_volume - ask_volume) / total if total else 0.0
+
+    def event(self, exchange_ts_ns=0, recv_ts_ns=0):
+        """The current top of book as a BookEvent."""
+        return BookEvent(self.bids.best_price, self.bids.best_qty, self.asks.best_price, self.asks.best_qty,
+                         self.imbalance(), self.levels, self.last_update_id or 0, exchange_ts_ns, recv_ts_ns)
+
+    def stats(self):
+        return {
+            "synced": self.synced,
+            "last_update_id": self.last_update_id,
+            "bid_levels": len(self.bids),
+            "ask_levels": len(self.asks),
+            "updates": self.updates,
+            "stale": self.stale,
+            "gaps": self.gaps,
+        }
+
+
+class DepthSync:
+    """
+    Runs the snapshot/diff protocol around an OrderBook, independent of the
+    transport. Diffs that arrive while there is no usable snapshot are
+    buffered (the newest `max_pending`); on_snapshot() loads a snapshot and
+    applies them. `needs_snapshot` is set whenever a (new) snapshot is
+    required, i.e. at the start and after every gap.
+    """
+
+    def __init__(self, book, max_pending=10000):
+        self.book = book
+        self.max_pending = max_pending
+        self.pending = []
+        self.needs_snapshot = True
+
+    def on_diff(self, event, recv_ts_ns=0):
+        """Feed one diff event; returns the resulting BookEvent, or None if nothing was applied."""
+        book = self.book
+        if not book.synced:
+            self._buffer(event, recv_ts_ns)
+            return None
+        try:
+            applied = book.apply(event)
+        except BookGap:
+            self.needs_snapshot = True
+            self._buffer(event, recv_ts_ns)
+            return None
+        if not applied:
+            return None
+        return book.event(event.get("E", 0) * 1_000_000, recv_ts_ns)
+
+    def _buffer(self, event, recv_ts_ns):
+        self.pending.append((event, recv_ts_ns))
+        if len(self.pending) > self.max_pending:
+            del self.pending[0]
+
+    def on_snapshot(self, snapshot):
+        """Load a snapshot and apply the buffered diffs; returns their BookEvents."""
+        self.book.load_snapshot(snapshot)
+        self.needs_snapshot = False
+        pending, self.pending = self.pending, []
+        events = []
+        for event, recv_ts_ns in pending:
+            book_event = self.on_diff(event, recv_ts_ns)
+            if book_event is not None:
+                events.append(book_event)
+        return events
+
+
+class DepthRecorder:
+    """Appends snapshots and raw diff messages to a JSON-lines file for offline replay."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", buffering=1 << 16)
+
+    def snapshot(self, snapshot):
+        self._file.write(json.dumps({"snapshot": snapshot}, separators=(",", ":")) + "\n")
+
+    def diff(self, message, recv_ts_ns):
+        # The raw message is already JSON; it is embedded as is, not re-encoded
+        self._file.write(f'{{"recv_ts_ns":{recv_ts_ns},"diff":{message}}}\n')
+
+    def close(self):
+        self._file.close()
+
+
+def parse_diff(message):
+    """Parse a depth diff message (plain or combined-stream wrapper) into its event dict."""
+    data = _loads(message)
+    return data.get("data", data) if "stream" in data else data
+
+
+def replay_depth(path, book=None, levels=10):
+    """
+    Replay a DepthRecorder file through a DepthSync; yields a BookEvent per
+    applied diff. Pass a book to inspect its state afterwards.
+    """
+    sync = DepthSync(book if book is not None else OrderBook(levels=levels))
+    with open(path, "rb") as f:
+        for line in f:
+            record = _loads(line)
+            if "snapshot" in record:
+                yield from sync.on_snapshot(record["snapshot"])
+            else:
+                diff = record["diff"]
+                book_event = sync.on_diff(diff.get("data", diff) if "stream" in diff else diff,
+                                          record.get("recv_ts_ns", 0))
+                if book_event is not None:
+                    yield book_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded depth file through the order book")
+    parser.add_argument("path", help="JSON-lines file written by DepthRecorder")
+    parser.add_argument("--levels", type=int, default=10, help="levels per side used for the imbalance")
+    args = parser.parse_args()
+
+    book = OrderBook(levels=args.levels)
+    start = time.perf_counter()
+    count = 0
+    last = None
+    for last in replay_depth(args.path, book, args.levels):
+        count += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"📖 {count:,} updates applied in {elapsed:.3f}s ({count / elapsed if elapsed else 0:,.0f} updates/sec)")
+    print(f"Book: {book.stats()}")
+    if last is not None:
+        print(f"Top: bid {last.bid} x {last.bid_qty}   ask {last.ask} x {last.ask_qty}   "
+              f"mid {last.mid}   spread {last.spread}   imbalance({args.levels}) {last.imbalance:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
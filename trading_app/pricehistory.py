@@ -0,0 +1,290 @@
+"""
+Multi-resolution price history for the dashboard API, in fixed memory.
+
+Each symbol has a PricePyramid: OHLC buckets at 1 second, 1 minute and 1
+hour, each level a fixed-size ring (by default 6 hours of seconds, 7 days of
+minutes and a year of hours, ~1.5 MB per symbol). A bucket's slot is its
+bucket number modulo the ring size, so a tick updates every level in O(1)
+and a range query is arithmetic plus one vectorized gather. A tick only
+touches the current second's OHLC; each second is merged into the levels
+when the next one starts (or when a query needs it). Buckets with no trades
+are simply absent, and trades older than the current second are ignored (a
+symbol's trades arrive in order).
+
+query() picks the resolution from a list of round intervals so a range
+comes back as at most `max_points` buckets; coarser intervals are merged on
+the fly from the coarsest level that divides them, aligned to the epoch, so
+the same bucket always has the same value. etag() identifies a response
+without building it: a range that ends before the newest bucket and starts
+inside the retained history can no longer change, so polling it again is
+answered with 304 Not Modified.
+"""
+import hashlib
+import math
+import re
+import time
+from array import array
+
+import numpy as np
+
+# (seconds per bucket, buckets kept)
+DEFAULT_LEVELS = ((1, 6 * 3600), (60, 7 * 24 * 60), (3600, 366 * 24))
+MAX_POINTS = 3000
+
+# Resolutions query() chooses from when none is asked for
+NICE_RESOLUTIONS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 21600, 43200,
+                    86400, 7 * 86400)
+
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+_RESOLUTION = re.compile(r"^(\d+)([smhd]?)$")
+
+
+def parse_resolution(text):
+    """Seconds for "30", "30s", "5m", "1h" or "1d"."""
+    match = _RESOLUTION.match(text.strip().lower())
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"resolution must look like 30, 30s, 5m, 1h or 1d, got {text!r}")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+class PriceLevel:
+    """One ring of OHLC buckets of `seconds` each."""
+
+    def __init__(self, seconds, capacity):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.buckets = array("q", [-1]) * capacity      # bucket number held by each slot, -1 = empty
+        self.open = array("d", [0.0]) * capacity
+        self.high = array("d", [0.0]) * capacity
+        self.low = array("d", [0.0]) * capacity
+        self.close = array("d", [0.0]) * capacity
+        self.first = -1         # first bucket ever filled
+        self.latest = -1        # newest bucket, -1 = empty
+        self.version = 0        # bumped by every accepted merge
+        self.late = 0           # merges ignored because their bucket was already closed
+        self._open = self._high = self._low = self._close = 0.0
+
+    @property
+    def oldest(self):
+        """Oldest bucket number still held (there is no data before it)."""
+        return max(self.first, self.latest - self.capacity + 1)
+
+    def holds(self, start_s):
+        """True if no data from start_s on has been evicted."""
+        return self.oldest == self.first or self.oldest * self.seconds <= start_s
+
+    def add(self, o, h, l, c, second):
+        """
+        Merge the OHLC of a stretch of trades inside one bucket, starting at
+        `second`. Merging the same stretch again, grown, gives the same result
+        as merging it once at the end.
+        """
+        # The open bucket lives in attributes and is written to the ring when
+        # the next bucket opens or a query needs it
+        bucket = second // self.seconds
+        if bucket == self.latest:
+            if h > self._high:
+                self._high = h
+            if l < self._low:
+                self._low = l
+            self._close = c
+        elif bucket > self.latest:
+            if self.latest >= 0:
+                self.flush()
+            else:
+                self.first = bucket
+            self.latest = bucket
+            self._open, self._high, self._low, self._close = o, h, l, c
+        else:
+            self.late += 1
+            return
+        self.version += 1
+
+    def flush(self):
+        """Write the open bucket to the ring."""
+        if self.latest < 0:
+            return
+        slot = self.latest % self.capacity
+        self.buckets[slot] = self.latest
+        self.open[slot] = self._open
+        self.high[slot] = self._high
+        self.low[slot] = self._low
+        self.close[slot] = self._close
+
+    def bucket_range(self, start_s, end_s):
+        """Bucket numbers [lo, hi] covering start_s <= t <= end_s (epoch seconds)."""
+        return int(start_s // self.seconds), int(end_s // self.seconds)
+
+    def state(self, lo, hi):
+        """What buckets lo..hi depend on: their bounds, plus whatever can still change them."""
+        state = (self.seconds, lo, hi)
+        if lo < self.oldest:
+            state += ("oldest", self.oldest)    # eviction moves the start of the data
+        if hi >= self.latest:
+            state += ("version", self.version)  # the open bucket, or new ones, fall in the range
+        return state
+
+    def gather(self, lo, hi):
+        """Bucket numbers and OHLC arrays of the filled buckets in lo..hi."""
+        self.flush()
+        lo = max(lo, self.oldest)
+        hi = min(hi, self.latest)
+        if self.latest < 0 or hi < lo:
+            empty = np.empty(0, dtype=np.float64)
+            return np.empty(0, dtype=np.int64), empty, empty, empty, empty
+        numbers = np.arange(lo, hi + 1, dtype=np.int64)
+        slots = numbers % self.capacity
+        held = np.frombuffer(self.buckets, dtype=np.int64)[slots] == numbers
+        numbers = numbers[held]
+        slots = slots[held]
+        return (numbers,) + tuple(np.frombuffer(column, dtype=np.float64)[slots]
+                                  for column in (self.open, self.high, self.low, self.close))
+
+
+class PricePyramid:
+    """The OHLC levels of one symbol, finest first."""
+
+    def __init__(self, levels=DEFAULT_LEVELS, max_points=MAX_POINTS):
+        self.levels = [PriceLevel(seconds, capacity) for seconds, capacity in sorted(levels)]
+        self.max_points = max_points
+        self.ticks = 0
+        self.late = 0
+        # The current second's OHLC; the levels only see it when the second
+        # ends or a query syncs it, which keeps a tick to a few comparisons
+        self._second = -1
+        self._open = self._high = self._low = self._close = 0.0
+        self._dirty = False     # trades since the last sync, so an idle poll leaves the versions alone
+
+    def update(self, price, ts_ns):
+        """Add one trade at ts_ns (epoch nanoseconds)."""
+        second = ts_ns // 1_000_000_000
+        if second == self._second:
+            if price > self._high:
+                self._high = price
+            elif price < self._low:
+                self._low = price
+            self._close = price
+        elif second > self._second:
+            self.sync()
+            self._second = second
+            self._open = self._high = self._low = self._close = price
+        else:
+            self.late += 1
+            return
+        self._dirty = True
+        self.ticks += 1
+
+    def on_ticks(self, ticks):
+        update = self.update
+        for tick in ticks:
+            update(tick.price, tick.exchange_ts_ns or tick.recv_ts_ns)
+
+    def sync(self):
+        """Merge the current second's trades since the last sync into every level."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        for level in self.levels:
+            level.add(self._open, self._high, self._low, self._close, self._second)
+
+    def _level_for(self, resolution):
+        """The coarsest level whose buckets divide the resolution evenly."""
+        for level in reversed(self.levels):
+            if resolution % level.seconds == 0:
+                return level
+        return None
+
+    def choose(self, start_s, end_s, resolution=None):
+        """
+        (resolution, level) for a range: the requested resolution, else (or
+        if it would give more than max_points buckets) the finest round
+        resolution that stays within max_points and whose level still holds
+        the start of the range, falling back to the coarsest level.
+        """
+        floor = (end_s - start_s) / self.max_points
+        if resolution is not None and resolution >= floor and self._level_for(resolution) is not None:
+            return resolution, self._level_for(resolution)
+        candidates = [r for r in NICE_RESOLUTIONS if r >= floor and (resolution is None or r >= resolution)]
+        for r in candidates:
+            level = self._level_for(r)
+            if level is not None and level.holds(start_s):
+                return r, level
+        # Nothing holds the whole range: the coarsest level (and enough merging) gets the most of it
+        level = self.levels[-1]
+        return level.seconds * max(1, math.ceil(floor / level.seconds)), level
+
+    @staticmethod
+    def _bounds(start_s, end_s, resolution, level):
+        """Level buckets lo..hi covering the range, widened to whole buckets of `resolution`."""
+        lo, hi = level.bucket_range(start_s, end_s)
+        factor = resolution // level.seconds
+        return lo // factor * factor, (hi // factor + 1) * factor - 1
+
+    def etag(self, symbol, start_s, end_s, resolution, level, instance=""):
+        """Strong ETag of a query's response, computed from the levels' state without building it."""
+        self.sync()
+        lo, hi = self._bounds(start_s, end_s, resolution, level)
+        key = (instance, symbol, start_s, end_s, resolution) + level.state(lo, hi)
+        return '"' + hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest() + '"'
+
+    def query(self, start_s, end_s, resolution, level):
+        """
+        Buckets of `resolution` seconds overlapping [start_s, end_s], whole,
+        as columns: t (bucket start, epoch seconds), o, h, l, c.
+        """
+        self.sync()
+        numbers, o, h, l, c = level.gather(*self._bounds(start_s, end_s, resolution, level))
+        factor = resolution // level.seconds
+        if factor > 1 and len(numbers):
+            groups = numbers // factor
+            starts = np.flatnonzero(np.diff(groups, prepend=-1))
+            ends = np.append(starts[1:], len(groups)) - 1
+            numbers = groups[starts] * factor
+            o, h, l, c = o[starts], np.maximum.reduceat(h, starts), np.minimum.reduceat(l, starts), c[ends]
+        return {
+            "t": (numbers * level.seconds).tolist(),
+            "o": o.tolist(),
+            "h": h.tolist(),
+            "l": l.tolist(),
+            "c": c.tolist(),
+        }
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "late": self.late,
+            "levels": {
+                level.seconds: {"buckets": min(level.latest - level.oldest + 1, level.capacity)
+                                if level.latest >= 0 else 0,
+                                "capacity": level.capacity}
+                for level in self.levels
+            },
+        }
+
+
+class PriceTap:
+    """
+    Feeds every batch of ticks into a PricePyramid, then hands it on to
+    target.on_ticks (an engine, a SnapshotWriter, a BarStage or a queue proxy).
+    """
+
+    def __init__(self, target, pyramid):
+        self.target = target
+        self.pyramid = pyramid
+
+    def on_ticks(self, ticks):
+        self.pyramid.on_ticks(ticks)
+        return self.target.on_ticks(ticks)
+
+
+class PriceHistory:
+    """The pyramids of all symbols, plus the per-process id that keeps ETags from surviving a restart."""
+
+    def __init__(self, symbols, levels=DEFAULT_LEVELS, max_points=MAX_POINTS):
+        self.pyramids = {symbol: PricePyramid(levels, max_points) for symbol in symbols}
+        self.instance = str(time.time_ns())
+
+    def tap(self, targets):
+        """Wrap each symbol's tick target so its pyramid sees every trade first."""
+        return {symbol: PriceTap(target, self.pyramids[symbol]) if symbol in self.pyramids else target
+                for symbol, target in targets.items()}
@@ -0,0 +1,150 @@
+"""
+Binary wire protocol between Python and the C++ execution engine.
+
+Every message is a fixed-layout little-endian record that starts with an
+8-byte header:
+
+    offset  size  field
+    0       1     magic (0xB7, never a valid first byte of JSON)
+    1       1     version
+    2       1     message type (MSG_SIGNAL / MSG_CONFIRMATION)
+    3       1     action code (ACTION_BUY / ACTION_SELL)
+    4       1     position after the fill (confirmations only, else 0)
+    5       1     padding
+    6       2     symbol id (u16, see symbol_ids; echoed in the confirmation)
+
+SIGNAL (Python -> C++), 32 bytes:
+    8   u64  sequence number (the order id)
+    16  i64  timestamp, integer nanoseconds since the epoch
+    24  f64  price
+
+CONFIRMATION (C++ -> Python), 48 bytes: the SIGNAL layout followed by
+    32  f64  trade PnL (0 for BUY)
+    40  f64  total PnL
+
+C++ keeps one position per symbol id. Every process trading against the
+same C++ engine must number the symbols the same way, so ids come from the
+full configured symbol list, not a shard's share of it.
+
+The layout is mirrored by the packed structs in main.cpp. During rollout
+both sides still accept JSON: a message whose first byte is not MAGIC is
+parsed as JSON, and C++ answers in whichever format the signal used.
+"""
+import json
+import struct
+
+from models import format_ns
+
+MAGIC = 0xB7
+VERSION = 2
+
+MSG_SIGNAL = 1
+MSG_CONFIRMATION = 2
+
+ACTION_BUY = 1
+ACTION_SELL = 2
+
+ACTION_CODES = {"BUY": ACTION_BUY, "SELL": ACTION_SELL}
+ACTION_NAMES = {ACTION_BUY: "BUY", ACTION_SELL: "SELL"}
+
+SIGNAL_STRUCT = struct.Struct("<BBBBbxHQqd")
+CONFIRMATION_STRUCT = struct.Struct("<BBBBbxHQqddd")
+
+MAX_SYMBOLS = 1 << 16
+
+SIGNAL_SIZE = SIGNAL_STRUCT.size              # 32
+CONFIRMATION_SIZE = CONFIRMATION_STRUCT.size  # 48
+
+class ProtocolError(ValueError):
+    pass
+
+
+def symbol_ids(symbols):
+    """Wire id of each symbol: its position in the full configured list."""
+    if len(symbols) > MAX_SYMBOLS:
+        raise ValueError(f"at most {MAX_SYMBOLS} symbols fit the wire format")
+    return {symbol.lower(): i for i, symbol in enumerate(symbols)}
+
+
+def encode_signal(action, price, ts_ns, seq, symbol_id=0):
+    """Pack a BUY/SELL signal into its 32-byte wire form."""
+    return SIGNAL_STRUCT.pack(MAGIC, VERSION, MSG_SIGNAL, ACTION_CODES[action], 0, symbol_id, seq, ts_ns, price)
+
+
+def encode_confirmation(action, price, ts_ns, seq, position, pnl, total_pnl, symbol_id=0):
+    """Pack a fill confirmation into its 48-byte wire form (what main.cpp sends)."""
+    return CONFIRMATION_STRUCT.pack(
+        MAGIC, VERSION, MSG_CONFIRMATION, ACTION_CODES[action], position, symbol_id, seq, ts_ns, price, pnl,
+        total_pnl
+    )
+
+
+def encode_order(order):
+    """Encode an ExecutionEngine trade dict as a binary signal."""
+    return encode_signal(order["action"], order["price"], order["ts_ns"], order["id"], order.get("symbol_id", 0))
+
+
+def is_binary(buf):
+    return len(buf) > 0 and buf[0] == MAGIC
+
+
+def _check_header(magic, version, msg_type, expected_type, size, expected_size):
+    if magic != MAGIC:
+        raise ProtocolError(f"bad magic byte 0x{magic:02x}")
+    if version != VERSION:
+        raise ProtocolError(f"unsupported protocol version {version}")
+    if msg_type != expected_type:
+        raise ProtocolError(f"unexpected message type {msg_type}")
+    if size < expected_size:
+        raise ProtocolError(f"message too short: {size} < {expected_size} bytes")
+
+
+def _action_name(action):
+    name = ACTION_NAMES.get(action)
+    if name is None:
+        raise ProtocolError(f"unknown action code {action}")
+    return name
+
+
+def decode_signal(buf):
+    """
+    Decode a binary signal from any buffer (bytes, memoryview, zmq Frame.buffer)
+    without copying it. Returns (action, price, ts_ns, seq, symbol_id).
+    """
+    if len(buf) < SIGNAL_SIZE:
+        raise ProtocolError(f"message too short: {len(buf)} < {SIGNAL_SIZE} bytes")
+    magic, version, msg_type, action, _, symbol_id, seq, ts_ns, price = SIGNAL_STRUCT.unpack_from(buf)
+    _check_header(magic, version, msg_type, MSG_SIGNAL, len(buf), SIGNAL_SIZE)
+    return _action_name(action), price, ts_ns, seq, symbol_id
+
+
+def decode_confirmation(buf):
+    """
+    Decode a confirmation from C++ into the dict shape the dashboard uses.
+
+    Binary messages are unpacked in place; anything else is treated as the
+    legacy JSON confirmation and parsed as before.
+    """
+    if not is_binary(buf):
+        return json.loads(bytes(buf))
+
+    if len(buf) < CONFIRMATION_SIZE:
+        raise ProtocolError(f"message too short: {len(buf)} < {CONFIRMATION_SIZE} bytes")
+    magic, version, msg_type, action, position, symbol_id, seq, ts_ns, price, pnl, total_pnl = \
+        CONFIRMATION_STRUCT.unpack_from(buf)
+    _check_header(magic, version, msg_type, MSG_CONFIRMATION, len(buf), CONFIRMATION_SIZE)
+
+    name = _action_name(action)
+    msg = {
+        "seq": seq,
+        "symbol_id": symbol_id,
+        "ts_ns": ts_ns,
+        "time": format_ns(ts_ns),
+        "action": name,
+        "price": price,
+        "position": position,
+        "total_pnl": total_pnl,
+    }
+    if name == "SELL":
+        msg["pnl"] = pnl
+    return msg
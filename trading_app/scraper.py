@@ -1,16 +1,387 @@
+import asyncio
+import logging
+import re
+import time
+import urllib.request
 import websockets
 import json
 import ssl
 import certifi
 
+from models import Tick
+from orderbook import DepthSync, OrderBook, parse_diff
+
+try:
+    import orjson
+except ImportError:  # optional, faster parser
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 ssl_context = ssl.create_default_context(cafile=certifi.where())
 
-async def stream_binance(symbol: str, engine):
-    url = f"wss://stream.binance.com:9443/ws/{symbol}@trade"
+# Point this at a LocalExchange (ws://127.0.0.1:<port>) to run against recorded data
+BINANCE_WS_URL = "wss://stream.binance.com:9443"
+BINANCE_REST_URL = "https://api.binance.com"
+
+
+# Binance trade messages always list "p" (price) and "q" (quantity) before
+# "T" (trade time), so one search pulls out the only fields the pipeline needs
+_TRADE_FIELDS = re.compile(r'"p":"([^"]*)","q":"([^"]*)".*?"T":(\d+)')
+_STREAM_NAME = re.compile(r'"stream":"([^@"]*)@')
+
+
+def decode_trade(message, recv_ts_ns):
+    """
+    Build a Tick from a raw trade message (plain or combined-stream wrapper)
+    without parsing the rest of it. Falls back to json.loads if the message
+    does not have the expected shape.
+    """
+    match = _TRADE_FIELDS.search(message)
+    if match is not None:
+        return Tick(float(match.group(1)), int(match.group(3)) * 1_000_000, recv_ts_ns, qty=float(match.group(2)))
+    data = json.loads(message)
+    data = data.get("data", data)
+    return Tick(float(data["p"]), int(data["T"]) * 1_000_000, recv_ts_ns, qty=float(data["q"]))
+
+
+def stream_symbol(message):
+    """Symbol of a combined-stream message ("btcusdt" for "btcusdt@trade")."""
+    match = _STREAM_NAME.match(message, 1)
+    if match is None:
+        match = _STREAM_NAME.search(message)
+    return match.group(1) if match is not None else json.loads(message)["stream"].partition("@")[0]
+
+
+DECODERS = ("auto", "orjson", "json", "fields")
+
+
+class TradeDecoder:
+    """
+    Turns a raw trade message into (symbol, Tick). symbol comes from the
+    combined-stream name and is None for plain /ws messages.
+
+        fields  pull the stream name, price and trade time out with regexes
+        json    full parse with the stdlib json module
+        orjson  full parse with orjson (must be installed)
+        auto    orjson when it is installed, otherwise fields
+    """
+
+    def __init__(self, parser="auto"):
+        if parser not in DECODERS:
+            raise ValueError(f"parser must be one of {DECODERS}")
+        if parser == "auto":
+            parser = "orjson" if orjson is not None else "fields"
+        if parser == "orjson" and orjson is None:
+            raise ValueError("orjson is not installed")
+        self.parser = parser
+        if parser == "fields":
+            self.decode = self._decode_fields
+        else:
+            self._loads = orjson.loads if parser == "orjson" else json.loads
+            self.decode = self._decode_parsed
+
+    def __call__(self, message, recv_ts_ns):
+        return self.decode(message, recv_ts_ns)
+
+    @staticmethod
+    def _decode_fields(message, recv_ts_ns):
+        symbol = stream_symbol(message) if message.startswith('{"stream"') else None
+        return symbol, decode_trade(message, recv_ts_ns)
+
+    def _decode_parsed(self, message, recv_ts_ns):
+        data = self._loads(message)
+        stream = data.get("stream")
+        if stream is not None:
+            data = data["data"]
+            stream = stream.partition("@")[0]
+        return stream, Tick(float(data["p"]), int(data["T"]) * 1_000_000, recv_ts_ns, qty=float(data["q"]))
+
+
+class IngestStats:
+    """
+    Ingest counters: message and batch totals, messages/sec over the last
+    full second, batch sizes in power-of-two buckets (1, 2-3, 4-7, ...) and
+    lag, the time from the exchange's trade time to the moment the batch was
+    handed to the engine.
+    """
+    BUCKETS = 12    # the last bucket collects batches of 2048 and more
+
+    def __init__(self):
+        self.messages = 0
+        self.batches = 0
+        self.batch_sizes = [0] * self.BUCKETS
+        self.max_batch = 0
+        self.last_lag_ns = 0
+        self.max_lag_ns = 0
+        self.messages_per_sec = 0.0
+        self._window_start = time.perf_counter()
+        self._window_messages = 0
+
+    def record(self, ticks, now_ns):
+        """Count one batch of decoded ticks (in arrival order) handed over at now_ns."""
+        n = len(ticks)
+        if n == 0:
+            return
+        self.messages += n
+        self.batches += 1
+        self.batch_sizes[min(n.bit_length(), self.BUCKETS) - 1] += 1
+        if n > self.max_batch:
+            self.max_batch = n
+
+        newest = ticks[-1].exchange_ts_ns
+        if newest:
+            lag = now_ns - newest
+            self.last_lag_ns = lag
+            if lag > self.max_lag_ns:
+                self.max_lag_ns = lag
+
+        self._window_messages += n
+        elapsed = time.perf_counter() - self._window_start
+        if elapsed >= 1.0:
+            self.messages_per_sec = self._window_messages / elapsed
+            self._window_start += elapsed
+            self._window_messages = 0
+
+    def stats(self):
+        buckets = {}
+        for i, count in enumerate(self.batch_sizes):
+            low = 1 << i
+            if i == self.BUCKETS - 1:
+                label = f"{low}+"
+            else:
+                label = str(low) if low == 1 else f"{low}-{2 * low - 1}"
+            buckets[label] = count
+        return {
+            "messages": self.messages,
+            "batches": self.batches,
+            "messages_per_sec": self.messages_per_sec,
+            "avg_batch": self.messages / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "batch_sizes": buckets,
+            "last_lag_ms": self.last_lag_ns / 1e6,
+            "max_lag_ms": self.max_lag_ns / 1e6,
+        }
+
+
+def _connect(url):
+    return websockets.connect(url, ssl=ssl_context if url.startswith("wss://") else None)
+
+
+class _Drain:
+    """
+    Reads a websocket on its own task and hands out everything received
+    since the last batch. recv() does not give up the event loop while
+    messages are already buffered, so the reader empties the socket buffer
+    before the consumer runs again and a burst arrives as one batch.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.buffer = []
+        self.ready = asyncio.Event()
+        self.done = False
+        self.error = None
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for message in self.ws:
+                self.buffer.append((message, time.time_ns()))
+                self.ready.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self.ready.set()
+
+    async def batches(self):
+        """Yield lists of (message, recv_ts_ns) until the connection ends."""
+        try:
+            while True:
+                if not self.buffer:
+                    if self.done:
+                        if self.error is not None:
+                            raise self.error
+                        return
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+                batch, self.buffer = self.buffer, []
+                yield batch
+        finally:
+            self.task.cancel()
+
+
+def _record_ingest(metrics, ticks, decode_start_ns):
+    """Decode time (averaged over the batch) and exchange -> receive lag of every tick."""
+    metrics.decode.record((time.perf_counter_ns() - decode_start_ns) // len(ticks))
+    record = metrics.ws_receive.record
+    for tick in ticks:
+        if tick.exchange_ts_ns:
+            record(tick.recv_ts_ns - tick.exchange_ts_ns)
+
+
+async def stream_binance(symbol: str, engine, recorder=None, base_url=BINANCE_WS_URL, decoder=None, stats=None,
+                         metrics=None):
+    url = f"{base_url}/ws/{symbol}@trade"
+    decode = decoder or TradeDecoder()
+
+    async with _connect(url) as ws:
+        async for batch in _Drain(ws).batches():
+            start = time.perf_counter_ns()
+            ticks = [decode(message, recv_ts_ns)[1] for message, recv_ts_ns in batch]
+            if metrics is not None:
+                _record_ingest(metrics, ticks, start)
+            engine.on_ticks(ticks)
+            if stats is not None:
+                stats.record(ticks, time.time_ns())
+            # Recording happens after the engine has seen the ticks and only queues the raw messages
+            if recorder is not None:
+                for message, _ in batch:
+                    recorder.record(message)
+
+
+def combined_stream_url(symbols, base_url=BINANCE_WS_URL):
+    """Binance combined-stream URL subscribing to the trade stream of every symbol."""
+    return f"{base_url}/stream?streams=" + "/".join(f"{symbol.lower()}@trade" for symbol in symbols)
+
+
+async def stream_binance_multi(engines, recorders=None, base_url=BINANCE_WS_URL,
+                               reconnect_delay=1.0, max_reconnect_delay=30.0, max_reconnects=None,
+                               decoder=None, stats=None, metrics=None):
+    """
+    Drive one TradingEngine per symbol from a single combined-stream connection.
+
+    engines (and optionally recorders) map lowercase symbol -> object. Messages
+    arrive as {"stream": "<symbol>@trade", "data": <trade>}; everything
+    already buffered on the socket is decoded as one batch, split by stream
+    name and handed to each symbol's engine in order. When the connection
+    drops it is reopened with exponential backoff; the engines are untouched,
+    so every symbol keeps its strategy and position state across reconnects.
+    Returns after `max_reconnects` reconnects (None = never).
+    """
+    recorders = recorders or {}
+    decode = decoder or TradeDecoder()
+    url = combined_stream_url(engines, base_url)
+    delay = reconnect_delay
+    reconnects = 0
+
+    while True:
+        try:
+            async with _connect(url) as ws:
+                logger.info("Streaming %d symbols from %s", len(engines), base_url)
+                delay = reconnect_delay
+                async for batch in _Drain(ws).batches():
+                    start = time.perf_counter_ns()
+                    decoded = []
+                    symbols = []
+                    by_symbol = {}
+                    for message, recv_ts_ns in batch:
+                        symbol, tick = decode(message, recv_ts_ns)
+                        decoded.append(tick)
+                        symbols.append(symbol)
+                        ticks = by_symbol.get(symbol)
+                        if ticks is None:
+                            ticks = by_symbol[symbol] = []
+                        ticks.append(tick)
+                    if metrics is not None:
+                        _record_ingest(metrics, decoded, start)
+
+                    for symbol, ticks in by_symbol.items():
+                        engine = engines.get(symbol)
+                        if engine is not None:
+                            engine.on_ticks(ticks)
+                    if stats is not None:
+                        stats.record(decoded, time.time_ns())
+
+                    # Recording happens after the engines have seen the ticks and only queues the raw messages
+                    if recorders:
+                        for (message, _), symbol in zip(batch, symbols):
+                            recorder = recorders.get(symbol)
+                            if recorder is not None:
+                                recorder.record(message)
+            logger.warning("Stream closed by server")
+        except (websockets.WebSocketException, OSError) as e:
+            logger.warning("Stream disconnected: %s", e)
+
+        if max_reconnects is not None and reconnects >= max_reconnects:
+            return
+        reconnects += 1
+        logger.info("Reconnecting in %.1fs", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_reconnect_delay)
+
+
+def fetch_depth_snapshot(symbol, rest_url=BINANCE_REST_URL, limit=1000, timeout=10.0):
+    """GET /api/v3/depth for one symbol (blocking; run it in a thread)."""
+    url = f"{rest_url}/api/v3/depth?symbol={symbol.upper()}&limit={limit}"
+    context = ssl_context if url.startswith("https://") else None
+    with urllib.request.urlopen(url, timeout=timeout, context=context) as response:
+        return json.loads(response.read())
+
+
+async def stream_binance_depth(symbol, engine, base_url=BINANCE_WS_URL, rest_url=BINANCE_REST_URL, levels=10,
+                               update_speed_ms=100, fetch_snapshot=None, book=None, recorder=None,
+                               reconnect_delay=1.0, max_reconnect_delay=30.0, max_reconnects=None):
+    """
+    Keep a local L2 book for one symbol from its diff depth stream and hand
+    the top of book to engine.on_book_events(events) after every batch.
+
+    The stream is opened first and its diffs are buffered while the REST
+    snapshot is fetched (fetch_snapshot(symbol), by default from rest_url,
+    in a thread); see orderbook.DepthSync for the sequencing rules. After a
+    gap or a reconnect a new snapshot is fetched the same way. With a
+    recorder (orderbook.DepthRecorder) every snapshot and raw diff is kept
+    for offline replay. Returns the book after `max_reconnects` reconnects.
+    """
+    url = f"{base_url}/ws/{symbol.lower()}@depth@{update_speed_ms}ms"
+    book = book if book is not None else OrderBook(symbol, levels)
+    fetch = fetch_snapshot or (lambda s: fetch_depth_snapshot(s, rest_url))
+    delay = reconnect_delay
+    reconnects = 0
+
+    while True:
+        sync = DepthSync(book)
+        book.reset()
+        fetching = None
+        try:
+            async with _connect(url) as ws:
+                logger.info("Streaming %s depth from %s", symbol, base_url)
+                delay = reconnect_delay
+                async for batch in _Drain(ws).batches():
+                    events = []
+                    for message, recv_ts_ns in batch:
+                        if recorder is not None:
+                            recorder.diff(message, recv_ts_ns)
+                        book_event = sync.on_diff(parse_diff(message), recv_ts_ns)
+                        if book_event is not None:
+                            events.append(book_event)
+
+                    if sync.needs_snapshot:
+                        if fetching is None:
+                            fetching = asyncio.create_task(asyncio.to_thread(fetch, symbol))
+                        elif fetching.done():
+                            snapshot, fetching = fetching.result(), None
+                            if recorder is not None:
+                                recorder.snapshot(snapshot)
+                            events.extend(sync.on_snapshot(snapshot))
+                            if sync.needs_snapshot:
+                                logger.warning("%s depth snapshot %s is older than the buffered diffs, refetching",
+                                               symbol, snapshot.get("lastUpdateId"))
+
+                    if events:
+                        engine.on_book_events(events)
+            logger.warning("Depth stream closed by server")
+        except (websockets.WebSocketException, OSError) as e:
+            logger.warning("Depth stream disconnected: %s", e)
+        finally:
+            if fetching is not None:
+                fetching.cancel()
 
-    async with websockets.connect(url, ssl = ssl_context) as ws:
-        async for message in ws:
-            data = json.loads(message)
-            price = float(data["p"])
-            # print(price)
-            engine.on_price(price)
\ No newline at end of file
+        if max_reconnects is not None and reconnects >= max_reconnects:
+            return book
+        reconnects += 1
+        logger.info("Reconnecting depth stream in %.1fs", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_reconnect_delay)
@@ -0,0 +1,331 @@
+"""
+Trade many symbols by sharding them across worker processes.
+
+Each worker process owns one shard of symbols: a single combined-stream
+connection, its own OrderGateway and a strategy/execution pair per symbol.
+A busy symbol can only slow down the symbols in its own shard, and a
+reconnect (or a crash) in one worker leaves the other shards' state alone.
+A crashed worker is restarted by ShardPool, which also collects the
+workers' performance snapshots (ShardPool.analytics).
+
+Order ids stay unique across workers and restarts: worker k of n numbers
+its orders base+k+1, base+k+1+n, base+k+1+2n, ... where base is n times
+its start time in microseconds (see execution.order_id_sequence).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+
+from analytics import PerformanceTracker
+from bars import BarStage
+from dispatch import StrategyLoop
+from engine import MultiStrategyEngine, TradingEngine
+from execution import ExecutionEngine, order_id_sequence
+from gateway import CPP_SIGNAL_ENDPOINT, OrderGateway
+from protocol import symbol_ids
+from scraper import (BINANCE_REST_URL, BINANCE_WS_URL, IngestStats, TradeDecoder, stream_binance_depth,
+                     stream_binance_multi)
+from snapshot import SnapshotWriter, bar_aggregators, warm_start
+from strategy import MovingAverageStrategy
+from tickstore import TickRecorder
+
+logger = logging.getLogger(__name__)
+
+
+def shard_symbols(symbols, workers):
+    """Split symbols round-robin into at most `workers` non-empty shards."""
+    symbols = [s.lower() for s in symbols]
+    shards = [symbols[i::workers] for i in range(min(workers, len(symbols)))]
+    return [shard for shard in shards if shard]
+
+
+@dataclass
+class ShardConfig:
+    """Everything a worker needs to run its shard (picklable, sent to the child process)."""
+    symbols: list
+    shard_index: int = 0
+    shard_count: int = 1
+    strategy_params: dict = field(default_factory=lambda: {"short_window": 2, "long_window": 5})
+    # name -> strategy params; when set, each symbol runs all of them on one MultiStrategyEngine
+    strategy_variants: dict | None = None
+    base_url: str = BINANCE_WS_URL
+    endpoint: str = CPP_SIGNAL_ENDPOINT
+    send_orders: bool = True
+    tick_store_dir: str | None = None
+    max_reconnects: int | None = None
+    decoder: str = "auto"           # see scraper.TradeDecoder
+    strategy_mode: str = "inline"   # "inline" (on the reader), or a dispatch.StrategyLoop mode
+    tick_queue_policy: str = "all"  # see dispatch.TickQueue
+    tick_queue_size: int = 10000
+    snapshot_dir: str | None = None  # restore from / periodically save to <dir>/<symbol>.snap
+    snapshot_interval: float = 5.0
+    depth_levels: int = 0           # > 0: also keep an L2 book per symbol, imbalance over this many levels
+    rest_url: str = BINANCE_REST_URL
+    bars: str | None = None         # e.g. "time:60": strategies run on completed bars, see bars.py
+    # symbol -> wire id (protocol.symbol_ids) over every symbol sharing the C++
+    # engine; default: the position in `symbols`
+    symbol_ids: dict | None = None
+    analytics_interval: float = 1.0  # seconds between performance reports from a child process
+
+
+def performance_snapshots(engines):
+    """Performance snapshot of every book of every symbol's engine, by "symbol" or "symbol/variant"."""
+    snapshots = {}
+    for symbol, engine in engines.items():
+        books = engine.books if isinstance(engine, MultiStrategyEngine) else {None: engine.execution}
+        for name, execution in books.items():
+            if execution.analytics is not None:
+                label = symbol if name is None else f"{symbol}/{name}"
+                snapshots[label] = execution.analytics.snapshot()
+    return snapshots
+
+
+def log_performance(engines):
+    """Log the performance snapshot of every book of every symbol's engine."""
+    for label, snapshot in performance_snapshots(engines).items():
+        logger.info("%s performance: %s", label, snapshot)
+
+
+def build_engines(config, gateway=None):
+    """
+    One TradingEngine per symbol (a MultiStrategyEngine with a book per
+    variant if config.strategy_variants is set), all numbering orders from
+    the shard's id sequence (see execution.order_id_sequence).
+    """
+    order_ids = order_id_sequence(config.shard_index, config.shard_count)
+    ids = config.symbol_ids or symbol_ids(config.symbols)
+    engines = {}
+    for symbol in config.symbols:
+        if config.strategy_variants:
+            engine = engines[symbol] = MultiStrategyEngine()
+            for name, params in config.strategy_variants.items():
+                engine.add(name, MovingAverageStrategy(**params),
+                           ExecutionEngine(gateway=gateway, symbol=symbol, order_ids=order_ids,
+                                           analytics=PerformanceTracker(), symbol_id=ids[symbol]))
+            continue
+        strategy = MovingAverageStrategy(**config.strategy_params)
+        execution = ExecutionEngine(gateway=gateway, symbol=symbol, order_ids=order_ids,
+                                    analytics=PerformanceTracker(), symbol_id=ids[symbol])
+        engines[symbol] = TradingEngine(strategy=strategy, execution=execution)
+    return engines
+
+
+def restore_engines(config, engines):
+    """
+    With config.snapshot_dir, warm-start the engines (snapshot, then the tick
+    store tail) and return the SnapshotWriters to deliver ticks to; otherwise
+    return the engines themselves.
+    """
+    if not config.snapshot_dir:
+        return engines
+    return warm_start(engines, config.snapshot_dir, config.tick_store_dir, config.snapshot_interval,
+                      bars=config.bars)
+
+
+def close_snapshots(targets):
+    """Write the final snapshot of every SnapshotWriter among targets."""
+    for target in targets.values():
+        if isinstance(target, SnapshotWriter):
+            target.close()
+
+
+async def _report_performance(config, engines, loop, report):
+    """Every config.analytics_interval seconds, hand the books' snapshots to report()."""
+    while True:
+        await asyncio.sleep(config.analytics_interval)
+        report(loop.analytics if config.strategy_mode == "process" else performance_snapshots(engines))
+
+
+async def run_shard(config, report=None):
+    """
+    Stream and trade one shard's symbols until the stream gives up. Returns the
+    engines (with strategy_mode="process" they live in the child and this
+    process's engines see no ticks). With `report`, it is called with the
+    books' performance snapshots (see performance_snapshots) every
+    config.analytics_interval seconds, and once more at the end.
+    """
+    gateway = None
+    if config.send_orders and config.strategy_mode != "process":
+        gateway = OrderGateway(endpoint=config.endpoint)
+        await gateway.start()
+
+    engines = build_engines(config, gateway)
+    # The process mode restores its own engines in the child
+    writers = restore_engines(config, engines) if config.strategy_mode != "process" else {}
+    recorders = {}
+    if config.tick_store_dir:
+        recorders = {symbol: TickRecorder(config.tick_store_dir, symbol) for symbol in config.symbols}
+
+    loop = None
+    targets = writers or engines
+    if config.strategy_mode != "inline":
+        loop = StrategyLoop(targets, policy=config.tick_queue_policy, maxsize=config.tick_queue_size,
+                            mode=config.strategy_mode, config=config)
+        await loop.start()
+        targets = loop.proxies
+    if config.bars:
+        # Ticks are aggregated on the ingest side; only completed bars are queued.
+        # After a warm restart the bar in progress at shutdown is finished first
+        resumed = loop.bar_aggregators if config.strategy_mode == "process" else bar_aggregators(writers)
+        targets = {symbol: BarStage(target, config.bars, resumed.get(symbol)) for symbol, target in targets.items()}
+
+    depth_tasks = []
+    if config.depth_levels:
+        if config.strategy_mode == "process":
+            logger.warning("Depth streams are not forwarded to a strategy process; not starting them")
+        else:
+            depth_tasks = [
+                asyncio.create_task(stream_binance_depth(symbol, engines[symbol], base_url=config.base_url,
+                                                         rest_url=config.rest_url, levels=config.depth_levels))
+                for symbol in config.symbols
+            ]
+
+    reporter = None
+    if report is not None:
+        reporter = asyncio.create_task(_report_performance(config, engines, loop, report))
+
+    stats = IngestStats()
+    try:
+        await stream_binance_multi(targets, recorders, base_url=config.base_url,
+                                   max_reconnects=config.max_reconnects,
+                                   decoder=TradeDecoder(config.decoder), stats=stats)
+    finally:
+        for task in depth_tasks:
+            task.cancel()
+        if reporter is not None:
+            reporter.cancel()
+        if loop is not None:
+            await loop.stop()
+            logger.info("Tick queue: %s", loop.stats())
+        if report is not None:
+            report(loop.analytics if config.strategy_mode == "process" else performance_snapshots(engines))
+        logger.info("Ingest stats: %s", stats.stats())
+        if config.strategy_mode != "process":
+            close_snapshots(writers)
+            log_performance(engines)
+        for recorder in recorders.values():
+            recorder.close()
+        if gateway is not None:
+            await gateway.close()
+    return engines
+
+
+def _worker(config, conn):
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s [%(levelname)s] [shard {config.shard_index}] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    def report(snapshots):
+        try:
+            conn.send(snapshots)
+        except OSError:
+            pass    # the pool went away; the worker is being stopped anyway
+
+    try:
+        asyncio.run(run_shard(config, report))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+class ShardPool:
+    """
+    Runs one worker process per shard and restarts any that die.
+
+    Workers are started with the "spawn" method so each gets a clean
+    interpreter (no ZeroMQ context or threads inherited from the parent).
+    They are not daemonic, so a worker can start its own strategy process
+    (strategy_mode="process"); stop() interrupts and reaps them instead.
+
+    Each worker sends its books' performance snapshots back over a pipe;
+    the latest ones, by "symbol" or "symbol/variant", are in `analytics`.
+    """
+
+    def __init__(self, symbols, workers, restart_delay=1.0, **options):
+        shards = shard_symbols(symbols, workers)
+        # Numbered over all symbols, so C++ gets the same ids from every shard
+        ids = symbol_ids(symbols)
+        self.configs = [
+            ShardConfig(symbols=shard, shard_index=i, shard_count=len(shards), symbol_ids=ids, **options)
+            for i, shard in enumerate(shards)
+        ]
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.analytics = {}
+        self._ctx = multiprocessing.get_context("spawn")
+        self._processes = [None] * len(self.configs)
+        self._conns = [None] * len(self.configs)
+
+    def _spawn(self, i):
+        config = self.configs[i]
+        if self._conns[i] is not None:
+            self._conns[i].close()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(target=_worker, args=(config, writer), name=f"shard-{i}", daemon=False)
+        process.start()
+        writer.close()
+        self._processes[i] = process
+        self._conns[i] = reader
+        logger.info("Shard %d (pid %d): %s", i, process.pid, ", ".join(config.symbols))
+
+    def start(self):
+        for i in range(len(self.configs)):
+            self._spawn(i)
+
+    def collect(self):
+        """Take in the performance snapshots the workers have sent since the last call."""
+        for i, conn in enumerate(self._conns):
+            if conn is None:
+                continue
+            try:
+                while conn.poll():
+                    self.analytics.update(conn.recv())
+            except (EOFError, OSError):
+                # The worker exited; a restarted one gets a new pipe
+                conn.close()
+                self._conns[i] = None
+
+    def run(self):
+        """Start the workers and supervise them until interrupted or all exit cleanly."""
+        self.start()
+        try:
+            while any(p is not None for p in self._processes):
+                self.collect()
+                for i, process in enumerate(self._processes):
+                    if process is None or process.is_alive():
+                        continue
+                    if process.exitcode == 0:
+                        self._processes[i] = None
+                        continue
+                    logger.error("Shard %d exited with code %s, restarting", i, process.exitcode)
+                    time.sleep(self.restart_delay)
+                    self.restarts += 1
+                    self._spawn(i)
+                time.sleep(0.5)
+        finally:
+            self.stop()
+
+    def stop(self, timeout=5.0):
+        """Interrupt the workers so they flush their recorders and gateways, then reap them."""
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                os.kill(process.pid, signal.SIGINT)
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+        self.collect()
+        for conn in self._conns:
+            if conn is not None:
+                conn.close()
+        self._processes = [None] * len(self.configs)
+        self._conns = [None] * len(self.configs)
@@ -0,0 +1,413 @@
+"""
+Warm restarts from binary snapshots of strategy and execution state.
+
+A snapshot holds everything a TradingEngine or MultiStrategyEngine needs to
+carry on where it stopped: the indicator windows and running sums, the
+crossover's previous averages, the cooldown, and each book's position, entry
+price and PnL. It is a fixed little-endian layout:
+
+    offset  size  field
+    0       4     magic b"TSNP"
+    4       1     version
+    5       1     kind (KIND_SINGLE / KIND_MULTI)
+    6       2     padding
+    8       8     saved at, int64 nanoseconds since the epoch
+    16      8     exchange time of the last tick processed (0 = unknown)
+    24      4     payload length
+    28      n     payload: the state fields in a fixed order, int64 / float64
+                  (None stored as NaN), windows as a count plus float64 array
+    28+n    4     CRC-32 of the payload
+
+Files are written to a temporary name and moved into place with os.replace,
+so a reader sees either the previous snapshot or the new one, never half of
+one. A snapshot only restores into an engine built with the same windows and
+periods; anything else raises SnapshotError and the caller falls back to
+rebuilding the indicators from the tick store.
+
+SnapshotWriter wraps an engine wherever its ticks are delivered and saves
+every `interval` seconds and right after any fill, so the saved books always
+match the orders sent to the C++ engine. warm_start() restores a whole set of
+engines at startup and catches them up on the ticks recorded since.
+"""
+import logging
+import math
+import os
+import struct
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+
+from bars import bar_objects, resume_aggregator, ticks_to_bars
+from engine import MultiStrategyEngine
+from models import Tick
+from tickstore import TickStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TSNP"
+VERSION = 1
+
+KIND_SINGLE = 1
+KIND_MULTI = 2
+
+HEADER_STRUCT = struct.Struct("<4sBB2xqqI")
+CRC_STRUCT = struct.Struct("<I")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_NAN = float("nan")
+
+# State fields per class, in file order: "q" int64, "d" float64, "o" float64
+# or None (NaN), "a" float64 array (length must match on restore)
+SMA_FIELDS = (("window", "q"), ("_pos", "q"), ("_count", "q"), ("_total", "d"), ("_comp", "d"),
+              ("value", "o"), ("_buf", "a"))
+RING_SMA_FIELDS = (("window", "q"), ("_count", "q"), ("_total", "d"), ("_comp", "d"), ("value", "o"))
+_RSI_SUMS = (("_count", "q"), ("_gain_sum", "d"), ("_gain_comp", "d"), ("_loss_sum", "d"),
+             ("_loss_comp", "d"), ("_gains", "q"), ("_losses", "q"), ("value", "o"))
+RSI_FIELDS = (("period", "q"), ("_pos", "q")) + _RSI_SUMS + (("_last_price", "o"), ("_changes", "a"))
+RING_RSI_FIELDS = (("period", "q"),) + _RSI_SUMS
+CROSSOVER_FIELDS = (("prev_fast", "o"), ("prev_slow", "o"), ("value", "q"))
+RING_FIELDS = (("capacity", "q"), ("_pos", "q"), ("count", "q"), ("_buf", "a"))
+STRATEGY_FIELDS = (("short_window", "q"), ("long_window", "q"), ("RSI_PERIOD", "q"),
+                   ("ticks", "q"), ("last_signal_tick", "q"))
+EXECUTION_FIELDS = (("position", "q"), ("entry_price", "o"), ("total_pnl", "d"), ("pnl_pct", "d"),
+                    ("next_order_id", "q"))
+
+# Fields that describe how the engine was built rather than its state
+_SHAPE_FIELDS = {"window", "period", "capacity", "short_window", "long_window", "RSI_PERIOD"}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+@dataclass
+class SnapshotInfo:
+    saved_at_ns: int
+    last_tick_ns: int
+
+
+def _pack(out, obj, fields):
+    for name, code in fields:
+        value = getattr(obj, name)
+        if code == "a":
+            out += _INT.pack(len(value))
+            out += array("d", value).tobytes()
+        elif code == "o":
+            out += _FLOAT.pack(_NAN if value is None else value)
+        elif code == "d":
+            out += _FLOAT.pack(value)
+        else:
+            out += _INT.pack(value)
+
+
+class _Reader:
+    """Unpacks state fields into a list of pending assignments, applied only if the whole payload parses."""
+
+    def __init__(self, payload):
+        self.view = memoryview(payload)
+        self.offset = 0
+        self.assignments = []
+
+    def _take(self, size):
+        end = self.offset + size
+        if end > len(self.view):
+            raise SnapshotError("snapshot payload is truncated")
+        chunk = self.view[self.offset:end]
+        self.offset = end
+        return chunk
+
+    def value(self, code):
+        if code == "q":
+            return _INT.unpack(self._take(8))[0]
+        value = _FLOAT.unpack(self._take(8))[0]
+        if code == "o" and math.isnan(value):
+            return None
+        return value
+
+    def read(self, obj, fields):
+        for name, code in fields:
+            if code == "a":
+                length = self.value("q")
+                if length != len(getattr(obj, name)):
+                    raise SnapshotError(f"{type(obj).__name__}.{name} holds {len(getattr(obj, name))} values, "
+                                        f"the snapshot {length}")
+                values = array("d")
+                values.frombytes(self._take(8 * length))
+                value = values.tolist()
+            else:
+                value = self.value(code)
+                if name in _SHAPE_FIELDS and value != getattr(obj, name):
+                    raise SnapshotError(f"{type(obj).__name__}.{name} is {getattr(obj, name)}, "
+                                        f"the snapshot has {value}")
+            self.assignments.append((obj, name, value))
+
+    def string(self):
+        return bytes(self._take(self.value("q"))).decode()
+
+    def apply(self):
+        if self.offset != len(self.view):
+            raise SnapshotError("snapshot payload has trailing bytes")
+        for obj, name, value in self.assignments:
+            setattr(obj, name, value)
+
+
+def _pack_strategy(out, strategy):
+    _pack(out, strategy, STRATEGY_FIELDS)
+    _pack(out, strategy.short_ma, SMA_FIELDS)
+    _pack(out, strategy.long_ma, SMA_FIELDS)
+    _pack(out, strategy.rsi, RSI_FIELDS)
+    _pack(out, strategy.crossover, CROSSOVER_FIELDS)
+
+
+def _read_strategy(reader, strategy):
+    reader.read(strategy, STRATEGY_FIELDS)
+    reader.read(strategy.short_ma, SMA_FIELDS)
+    reader.read(strategy.long_ma, SMA_FIELDS)
+    reader.read(strategy.rsi, RSI_FIELDS)
+    reader.read(strategy.crossover, CROSSOVER_FIELDS)
+
+
+def _pack_bank(out, bank):
+    _pack(out, bank, (("ticks", "q"),))
+    _pack(out, bank.ring, RING_FIELDS)
+    for group, fields in ((bank._smas, RING_SMA_FIELDS), (bank._rsis, RING_RSI_FIELDS)):
+        out += _INT.pack(len(group))
+        for indicator in group.values():
+            _pack(out, indicator, fields)
+    out += _INT.pack(len(bank._crossovers))
+    for (fast, slow), crossover in bank._crossovers.items():
+        out += _INT.pack(fast) + _INT.pack(slow)
+        _pack(out, crossover, CROSSOVER_FIELDS)
+
+
+def _read_bank(reader, bank):
+    reader.read(bank, (("ticks", "q"),))
+    reader.read(bank.ring, RING_FIELDS)
+    for group, fields in ((bank._smas, RING_SMA_FIELDS), (bank._rsis, RING_RSI_FIELDS)):
+        if reader.value("q") != len(group):
+            raise SnapshotError("the snapshot was taken with a different set of indicators")
+        for indicator in group.values():
+            reader.read(indicator, fields)
+    if reader.value("q") != len(bank._crossovers):
+        raise SnapshotError("the snapshot was taken with a different set of indicators")
+    for key, crossover in bank._crossovers.items():
+        if (reader.value("q"), reader.value("q")) != key:
+            raise SnapshotError("the snapshot was taken with a different set of indicators")
+        reader.read(crossover, CROSSOVER_FIELDS)
+
+
+def encode_state(engine):
+    """(kind, payload) for a TradingEngine or MultiStrategyEngine."""
+    out = bytearray()
+    if isinstance(engine, MultiStrategyEngine):
+        _pack_bank(out, engine.bank)
+        out += _INT.pack(len(engine.books))
+        for name, execution in engine.books.items():
+            encoded = name.encode()
+            out += _INT.pack(len(encoded)) + encoded
+            _pack(out, engine.strategies[name], STRATEGY_FIELDS)
+            _pack(out, execution, EXECUTION_FIELDS)
+        return KIND_MULTI, bytes(out)
+    _pack_strategy(out, engine.strategy)
+    _pack(out, engine.execution, EXECUTION_FIELDS)
+    return KIND_SINGLE, bytes(out)
+
+
+def decode_state(engine, kind, payload):
+    """Restore engine from a payload; on any mismatch nothing is changed and SnapshotError is raised."""
+    reader = _Reader(payload)
+    if isinstance(engine, MultiStrategyEngine):
+        if kind != KIND_MULTI:
+            raise SnapshotError("snapshot is of a single-strategy engine")
+        _read_bank(reader, engine.bank)
+        if reader.value("q") != len(engine.books):
+            raise SnapshotError("the snapshot was taken with a different set of strategies")
+        for name, execution in engine.books.items():
+            if reader.string() != name:
+                raise SnapshotError("the snapshot was taken with a different set of strategies")
+            reader.read(engine.strategies[name], STRATEGY_FIELDS)
+            reader.read(execution, EXECUTION_FIELDS)
+    else:
+        if kind != KIND_SINGLE:
+            raise SnapshotError("snapshot is of a multi-strategy engine")
+        _read_strategy(reader, engine.strategy)
+        reader.read(engine.execution, EXECUTION_FIELDS)
+    reader.apply()
+
+
+def save_snapshot(path, engine, last_tick_ns=0, fsync=False):
+    """
+    Atomically write engine's state to path. os.replace alone survives a crash
+    of this process; fsync=True also survives losing the machine.
+    """
+    kind, payload = encode_state(engine)
+    header = HEADER_STRUCT.pack(MAGIC, VERSION, kind, time.time_ns(), last_tick_ns, len(payload))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header + payload + CRC_STRUCT.pack(zlib.crc32(payload)))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, engine):
+    """Restore engine from the snapshot at path. Raises FileNotFoundError or SnapshotError."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER_STRUCT.size + CRC_STRUCT.size:
+        raise SnapshotError("snapshot is too short")
+    magic, version, kind, saved_at_ns, last_tick_ns, length = HEADER_STRUCT.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("not a snapshot file")
+    if version != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    start = HEADER_STRUCT.size
+    if len(data) != start + length + CRC_STRUCT.size:
+        raise SnapshotError("snapshot length does not match its header")
+    payload = data[start:start + length]
+    if CRC_STRUCT.unpack_from(data, start + length)[0] != zlib.crc32(payload):
+        raise SnapshotError("snapshot checksum mismatch")
+    decode_state(engine, kind, payload)
+    return SnapshotInfo(saved_at_ns, last_tick_ns)
+
+
+def warmup_depth(engine):
+    """Ticks it takes to fill every indicator window of the engine from scratch."""
+    if isinstance(engine, MultiStrategyEngine):
+        strategies = engine.strategies.values()
+    else:
+        strategies = (engine.strategy,)
+    return max((max(s.long_window, s.RSI_PERIOD + 1) + 1 for s in strategies), default=0)
+
+
+def rebuild_from_store(engine, store, after_ns=0, depth=None, bars=None):
+    """
+    Feed the engine's indicators the newest recorded ticks after after_ns
+    (at most `depth`, by default just enough to fill every window). Returns
+    (last_tick_ns, aggregator): the exchange time of the last tick fed, or
+    after_ns if there were none, and None. With a bar spec (see bars.py) the
+    engine runs on bars, so it is fed the newest `depth` completed bars
+    instead; the trades after the last of them (an unfinished bar) are not
+    fed but taken into the returned aggregator (bars.resume_aggregator), for
+    the BarStage to finish that bar with.
+    """
+    depth = warmup_depth(engine) if depth is None else depth
+    if bars is None:
+        tail = store.tail(depth, after_ns + 1)
+        ts_ns = tail["ts_ns"]
+        engine.warm([Tick(price, ts, qty=qty) for price, ts, qty
+                     in zip(tail["price"].tolist(), ts_ns.tolist(), tail["qty"].tolist())])
+        return (int(ts_ns[-1]) if len(ts_ns) else after_ns), None
+
+    # Ticks per bar are unknown up front: widen the tail until it holds more
+    # than `depth` bars (the first may be cut short) or the store runs out
+    count = max(depth, 1) * 64
+    while True:
+        tail = store.tail(count, after_ns + 1)
+        completed = ticks_to_bars(tail["ts_ns"], tail["price"], tail["qty"], bars)
+        if len(completed["close"]) > depth or len(tail["ts_ns"]) < count:
+            break
+        count *= 4
+    fed = bar_objects({name: column[-depth:] if depth else column[:0] for name, column in completed.items()})
+    engine.warm(fed)
+    aggregator = resume_aggregator(bars, tail["ts_ns"], tail["price"], tail["qty"])
+    return (fed[-1].exchange_ts_ns if fed else after_ns), aggregator
+
+
+def _books(engine):
+    if isinstance(engine, MultiStrategyEngine):
+        return engine.books.values()
+    return (engine.execution,)
+
+
+class SnapshotWriter:
+    """
+    Delivers ticks to an engine and snapshots it every `interval` seconds
+    and after every batch that changed a book. Use it in place of the
+    engine (it has the engine's on_ticks); close() writes a final snapshot.
+    bar_aggregator is the unfinished bar warm_start() recovered, if any.
+    """
+
+    def __init__(self, engine, path, interval=5.0, last_tick_ns=0, fsync=False, bar_aggregator=None):
+        self.engine = engine
+        self.bar_aggregator = bar_aggregator
+        self.path = path
+        self.interval = interval
+        self.fsync = fsync
+        self.last_tick_ns = last_tick_ns
+        self.saves = 0
+        self._books = tuple(_books(engine))
+        self._book_state = self._state()
+        self._next_save = time.monotonic() + interval
+
+    def _state(self):
+        return tuple((book.position, book.total_pnl) for book in self._books)
+
+    def on_ticks(self, ticks):
+        signals = self.engine.on_ticks(ticks)
+        if ticks:
+            self.last_tick_ns = ticks[-1].exchange_ts_ns or self.last_tick_ns
+        state = self._state()
+        if state != self._book_state or time.monotonic() >= self._next_save:
+            self._book_state = state
+            self.save()
+        return signals
+
+    def save(self):
+        try:
+            save_snapshot(self.path, self.engine, self.last_tick_ns, self.fsync)
+        except OSError as e:
+            logger.error("Could not write snapshot %s: %s", self.path, e)
+        else:
+            self.saves += 1
+        self._next_save = time.monotonic() + self.interval
+
+    def close(self):
+        self.save()
+
+
+def warm_start(engines, snapshot_dir, tick_store_dir=None, interval=5.0, fsync=False, bars=None):
+    """
+    Restore each symbol's engine from <snapshot_dir>/<symbol>.snap, then catch
+    its indicators up on the ticks recorded since (or, without a usable
+    snapshot, rebuild them from the newest recorded ticks), aggregated into
+    `bars` if the engines run on bars. Returns a SnapshotWriter per symbol to
+    deliver ticks to instead of the engines; with bars, each writer's
+    bar_aggregator holds the recorded trades of the bar still in progress,
+    for the BarStage (see bar_aggregators).
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    writers = {}
+    for symbol, engine in engines.items():
+        start = time.perf_counter()
+        path = os.path.join(snapshot_dir, f"{symbol}.snap")
+        last_tick_ns = 0
+        aggregator = None
+        try:
+            info = load_snapshot(path, engine)
+            last_tick_ns = info.last_tick_ns
+            source = "snapshot"
+        except FileNotFoundError:
+            source = "nothing"
+        except SnapshotError as e:
+            logger.warning("Ignoring snapshot %s: %s", path, e)
+            source = "nothing"
+        if tick_store_dir:
+            caught_up, aggregator = rebuild_from_store(engine, TickStore(tick_store_dir, symbol), last_tick_ns,
+                                                       bars=bars)
+            if caught_up != last_tick_ns:
+                source += " + tick store"
+                last_tick_ns = caught_up
+        positions = [book.position for book in _books(engine)]
+        logger.info("%s restored from %s in %.1f ms (positions %s)", symbol, source,
+                    (time.perf_counter() - start) * 1000, positions)
+        writers[symbol] = SnapshotWriter(engine, path, interval, last_tick_ns, fsync, aggregator)
+    return writers
+
+
+def bar_aggregators(writers):
+    """The recovered bar aggregator of each symbol that has one (see warm_start)."""
+    return {symbol: writer.bar_aggregator for symbol, writer in writers.items()
+            if isinstance(writer, SnapshotWriter) and writer.bar_aggregator is not None}
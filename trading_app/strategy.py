@@ -1,6 +1,5 @@
-from collections import deque
-from itertools import islice
 from models import Signal, Tick
+from indicators import SMA, RSI, Crossover
 
 
 class MovingAverageStrategy:
@@ -14,85 +13,85 @@ class MovingAverageStrategy:
     RSI_OVERSOLD = 30
     COOLDOWN_TICKS = 10
 
-    def __init__(self, short_window, long_window):
+    def __init__(self, short_window, long_window, rsi_period=None, rsi_overbought=None,
+                 rsi_oversold=None, cooldown_ticks=None):
         if short_window >= long_window:
             raise ValueError("short_window must be less than long_window")
 
         self.short_window = short_window
         self.long_window = long_window
-        # Deque must be large enough for both MA windows and RSI period
-        self.prices = deque(maxlen=max(long_window, self.RSI_PERIOD + 1))
 
-        self.prev_short_ma = None
-        self.prev_long_ma = None
-        self.ticks_since_signal = self.COOLDOWN_TICKS  # Start ready to signal
-
-    def _moving_average(self, window):
-        """Compute the moving average over the last 'window' prices."""
-        if len(self.prices) < window:
-            return None
-        # islice on reversed deque avoids allocating a full list copy
-        return sum(islice(reversed(self.prices), window)) / window
-
-    def _rsi(self):
+        # Optional per-instance overrides of the class-level tuning constants
+        if rsi_period is not None:
+            self.RSI_PERIOD = rsi_period
+        if rsi_overbought is not None:
+            self.RSI_OVERBOUGHT = rsi_overbought
+        if rsi_oversold is not None:
+            self.RSI_OVERSOLD = rsi_oversold
+        if cooldown_ticks is not None:
+            self.COOLDOWN_TICKS = cooldown_ticks
+
+        # Every indicator updates in O(1) per tick
+        self.short_ma = SMA(short_window)
+        self.long_ma = SMA(long_window)
+        self.rsi = RSI(self.RSI_PERIOD)
+        self.crossover = Crossover()
+        # Cooldown is counted in ticks: a signal is allowed COOLDOWN_TICKS after the last one
+        self.ticks = 0
+        self.last_signal_tick = -self.COOLDOWN_TICKS  # Start ready to signal
+        # Latest top of the order book (models.BookEvent), when a depth stream is running
+        self.book = None
+
+    def attach(self, bank):
         """
-        Compute RSI over RSI_PERIOD using simple average gains/losses.
-        Returns None if there isn't enough price history yet.
+        Read the indicators from a shared IndicatorBank instead of owning them.
+        The bank is then updated once per tick by its owner (MultiStrategyEngine),
+        which calls decide() rather than on_tick().
         """
-        if len(self.prices) < self.RSI_PERIOD + 1:
-            return None
-
-        prices = list(self.prices)[-(self.RSI_PERIOD + 1):]
-        gains, losses = [], []
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i - 1]
-            if change > 0:
-                gains.append(change)
-                losses.append(0.0)
-            else:
-                gains.append(0.0)
-                losses.append(abs(change))
-
-        avg_gain = sum(gains) / self.RSI_PERIOD
-        avg_loss = sum(losses) / self.RSI_PERIOD
+        self.short_ma = bank.sma(self.short_window)
+        self.long_ma = bank.sma(self.long_window)
+        self.rsi = bank.rsi(self.RSI_PERIOD)
+        self.crossover = bank.crossover(self.short_window, self.long_window)
 
-        if avg_loss == 0:
-            return 100.0  # All gains, maximally overbought
+    def on_book(self, event):
+        """Keep the latest top of book in self.book (the crossover rules do not use it)."""
+        self.book = event
 
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
+    @property
+    def ticks_since_signal(self):
+        return self.ticks - self.last_signal_tick
 
     def on_tick(self, tick):
-        self.prices.append(tick.price)
-        self.ticks_since_signal += 1
+        price = tick.price
+        self.ticks += 1
 
-        short_ma = self._moving_average(self.short_window)
-        long_ma = self._moving_average(self.long_window)
+        short_ma = self.short_ma.update(price)
+        long_ma = self.long_ma.update(price)
+        rsi = self.rsi.update(price)
 
         # Not enough data yet
         if short_ma is None or long_ma is None:
             return Signal.HOLD
 
-        signal = Signal.HOLD
-
-        if self.prev_short_ma is not None and self.prev_long_ma is not None:
-            if self.ticks_since_signal >= self.COOLDOWN_TICKS:
-                rsi = self._rsi()
-
-                # Bullish crossover: short MA crosses above long MA
-                if self.prev_short_ma <= self.prev_long_ma and short_ma > long_ma:
-                    # RSI confirmation: only buy if market is not overbought
-                    if rsi is None or rsi < self.RSI_OVERBOUGHT:
-                        signal = Signal.BUY
-                        self.ticks_since_signal = 0
-
-                # Bearish crossover: short MA crosses below long MA
-                elif self.prev_short_ma >= self.prev_long_ma and short_ma < long_ma:
-                    # RSI confirmation: only sell if market is not oversold
-                    if rsi is None or rsi > self.RSI_OVERSOLD:
-                        signal = Signal.SELL
-                        self.ticks_since_signal = 0
-
-        self.prev_short_ma = short_ma
-        self.prev_long_ma = long_ma
-        return signal
+        return self.decide(self.crossover.update(short_ma, long_ma), rsi, self.ticks)
+
+    def decide(self, cross, rsi, tick_number):
+        """Signal for a crossover result and RSI value seen on the given tick (counted from 1)."""
+        if cross == Crossover.NONE or tick_number - self.last_signal_tick < self.COOLDOWN_TICKS:
+            return Signal.HOLD
+
+        # Bullish crossover: short MA crosses above long MA
+        if cross == Crossover.BULLISH:
+            # RSI confirmation: only buy if market is not overbought
+            if rsi is None or rsi < self.RSI_OVERBOUGHT:
+                self.last_signal_tick = tick_number
+                return Signal.BUY
+
+        # Bearish crossover: short MA crosses below long MA
+        else:
+            # RSI confirmation: only sell if market is not oversold
+            if rsi is None or rsi > self.RSI_OVERSOLD:
+                self.last_signal_tick = tick_number
+                return Signal.SELL
+
+        return Signal.HOLD
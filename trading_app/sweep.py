@@ -0,0 +1,327 @@
+"""
+Parallel parameter sweep for MovingAverageStrategy.
+
+The price series is copied once into a shared memory block; every worker
+process attaches to it by name and reads it through a memoryview, so nothing
+but the parameter dict and the metrics travel over the pool's pipes.
+
+Results are appended to a CSV checkpoint as they arrive, so an interrupted
+sweep picks up where it stopped when run again with the same checkpoint.
+"""
+import argparse
+import csv
+import itertools
+import math
+import os
+import random
+import time
+from array import array
+from multiprocessing import Pool, shared_memory
+
+from models import Signal, Tick
+from strategy import MovingAverageStrategy
+
+PARAM_NAMES = (
+    "short_window",
+    "long_window",
+    "rsi_period",
+    "rsi_overbought",
+    "rsi_oversold",
+    "cooldown_ticks",
+)
+METRIC_NAMES = ("return_pct", "max_drawdown_pct", "trades", "win_rate")
+RESULT_FIELDS = PARAM_NAMES + ("ticks",) + METRIC_NAMES
+
+# Set in each worker by _attach_prices
+_shm = None
+_prices = None
+
+
+def grid(**ranges):
+    """
+    Cartesian product of the given parameter ranges.
+    Combinations with short_window >= long_window are skipped.
+    """
+    names = list(ranges)
+    combos = []
+    for values in itertools.product(*(ranges[name] for name in names)):
+        params = dict(zip(names, values))
+        if params["short_window"] >= params["long_window"]:
+            continue
+        combos.append(params)
+    return combos
+
+
+def random_sample(combos, n, seed=0):
+    """Pick n combinations uniformly at random (without replacement)."""
+    if n >= len(combos):
+        return list(combos)
+    return random.Random(seed).sample(combos, n)
+
+
+def backtest(prices, params):
+    """
+    Run one strategy configuration over a price sequence.
+
+    Mirrors ExecutionEngine's book (long one unit on BUY, flat on SELL) without
+    sending any orders. Returns the metrics as a dict.
+    """
+    strategy = MovingAverageStrategy(**params)
+    tick = Tick(price=0.0, timestamp=None)
+
+    position = 0
+    entry_price = 0.0
+    realized = 0.0
+    trades = 0
+    wins = 0
+    peak = 0.0
+    max_drawdown = 0.0
+    first_price = None
+    price = 0.0
+
+    for price in prices:
+        if first_price is None:
+            first_price = price
+        tick.price = price
+        signal = strategy.on_tick(tick)
+
+        if signal == Signal.BUY and position == 0:
+            position = 1
+            entry_price = price
+        elif signal == Signal.SELL and position == 1:
+            pnl = price - entry_price
+            realized += pnl
+            trades += 1
+            if pnl > 0:
+                wins += 1
+            position = 0
+
+        # Mark to market for the drawdown
+        equity = realized + (price - entry_price if position else 0.0)
+        if equity > peak:
+            peak = equity
+        elif peak - equity > max_drawdown:
+            max_drawdown = peak - equity
+
+    if not first_price:
+        return {"return_pct": 0.0, "max_drawdown_pct": 0.0, "trades": 0, "win_rate": 0.0}
+
+    equity = realized + (price - entry_price if position else 0.0)
+    return {
+        "return_pct": equity / first_price * 100,
+        "max_drawdown_pct": max_drawdown / first_price * 100,
+        "trades": trades,
+        "win_rate": (wins / trades * 100) if trades else 0.0,
+    }
+
+
+def _attach_prices(name, length):
+    """Pool initializer: map the shared price block into this worker."""
+    global _shm, _prices
+    _shm = shared_memory.SharedMemory(name=name)
+    _prices = _shm.buf.cast("d")[:length]
+
+
+def _evaluate(job):
+    params, ticks = job
+    metrics = backtest(_prices[:ticks], params)
+    return {**params, "ticks": ticks, **metrics}
+
+
+def _result_key(params, ticks):
+    return tuple(int(params[name]) for name in PARAM_NAMES if name in params) + (int(ticks),)
+
+
+def load_checkpoint(path):
+    """Read finished results from a checkpoint CSV, if it exists."""
+    results = {}
+    if not path or not os.path.exists(path):
+        return results
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            record = {name: int(row[name]) for name in PARAM_NAMES + ("ticks", "trades") if row.get(name)}
+            record.update({name: float(row[name]) for name in METRIC_NAMES if name != "trades"})
+            results[_result_key(record, record["ticks"])] = record
+    return results
+
+
+class SweepRunner:
+    """
+    Owns the shared price block and the worker pool for one sweep.
+
+    Use as a context manager so the shared memory is always released:
+
+        with SweepRunner(prices) as runner:
+            results = runner.run(grid(...))
+    """
+
+    def __init__(self, prices, workers=None, checkpoint=None):
+        self.length = len(prices)
+        self.workers = workers or os.cpu_count()
+        self.checkpoint = checkpoint
+        self.done = load_checkpoint(checkpoint)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(self.length, 1) * 8)
+        self._shm.buf.cast("d")[:self.length] = array("d", prices)
+        self._pool = None
+
+    def __enter__(self):
+        self._pool = Pool(
+            self.workers,
+            initializer=_attach_prices,
+            initargs=(self._shm.name, self.length),
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def run(self, combos, ticks=None):
+        """
+        Backtest every combination over the first `ticks` prices (all by default).
+        Combinations already in the checkpoint are not re-run.
+        """
+        ticks = min(ticks or self.length, self.length)
+        results = []
+        jobs = []
+        for params in combos:
+            key = _result_key(params, ticks)
+            if key in self.done:
+                results.append(self.done[key])
+            else:
+                jobs.append((params, ticks))
+
+        if not jobs:
+            return rank(results)
+
+        writer_file = None
+        writer = None
+        if self.checkpoint:
+            is_new = not os.path.exists(self.checkpoint)
+            writer_file = open(self.checkpoint, "a", newline="")
+            writer = csv.DictWriter(writer_file, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            if is_new:
+                writer.writeheader()
+
+        chunksize = max(1, len(jobs) // (self.workers * 16))
+        try:
+            for record in self._pool.imap_unordered(_evaluate, jobs, chunksize=chunksize):
+                self.done[_result_key(record, ticks)] = record
+                results.append(record)
+                if writer is not None:
+                    writer.writerow(record)
+                    writer_file.flush()
+        finally:
+            if writer_file is not None:
+                writer_file.close()
+
+        return rank(results)
+
+    def successive_halving(self, combos, eta=3, min_ticks=None):
+        """
+        Successive halving: run every combination on a short prefix of the
+        series, keep the best 1/eta, and re-run the survivors on eta times
+        more data until the full series is used.
+        """
+        rungs = max(1, math.ceil(math.log(max(len(combos), 1), eta)))
+        ticks = min_ticks or max(1, self.length // eta ** (rungs - 1))
+        survivors = list(combos)
+
+        while True:
+            ranked = self.run(survivors, ticks)
+            if ticks >= self.length:
+                return ranked
+            keep = max(1, len(ranked) // eta)
+            survivors = [{name: r[name] for name in PARAM_NAMES} for r in ranked[:keep]]
+            # The last survivor always gets the full series
+            ticks = self.length if keep == 1 else min(ticks * eta, self.length)
+
+
+def rank(results, by="return_pct"):
+    """Sort results best first."""
+    return sorted(results, key=lambda r: r[by], reverse=True)
+
+
+def format_table(results, top=20):
+    """Render the top results as a fixed-width text table."""
+    header = ("short", "long", "rsi", "ob", "os", "cool", "ticks", "return%", "maxdd%", "trades", "win%")
+    lines = [" ".join(f"{h:>8}" for h in header)]
+    for r in results[:top]:
+        lines.append(
+            f"{r['short_window']:>8} {r['long_window']:>8} {r['rsi_period']:>8} "
+            f"{r['rsi_overbought']:>8} {r['rsi_oversold']:>8} {r['cooldown_ticks']:>8} "
+            f"{r['ticks']:>8} {r['return_pct']:>8.2f} {r['max_drawdown_pct']:>8.2f} "
+            f"{r['trades']:>8} {r['win_rate']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def load_prices(path, column="price"):
+    """Load a price column from a CSV file into a float array."""
+    with open(path, newline="") as f:
+        return array("d", (float(row[column]) for row in csv.DictReader(f)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep for MovingAverageStrategy")
+    parser.add_argument("prices", help="CSV file with a price column")
+    parser.add_argument("--column", default="price")
+    parser.add_argument("--short", type=int, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--long", type=int, nargs="+", default=[20, 30, 50])
+    parser.add_argument("--rsi-period", type=int, nargs="+", default=[MovingAverageStrategy.RSI_PERIOD])
+    parser.add_argument("--overbought", type=int, nargs="+", default=[MovingAverageStrategy.RSI_OVERBOUGHT])
+    parser.add_argument("--oversold", type=int, nargs="+", default=[MovingAverageStrategy.RSI_OVERSOLD])
+    parser.add_argument("--cooldown", type=int, nargs="+", default=[MovingAverageStrategy.COOLDOWN_TICKS])
+    parser.add_argument("--search", choices=["grid", "random", "halving"], default="grid")
+    parser.add_argument("--samples", type=int, default=100, help="combinations for random search")
+    parser.add_argument("--eta", type=int, default=3, help="reduction factor for successive halving")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None, help="CSV file to resume from and append to")
+    parser.add_argument("--output", default=None, help="write the ranked table to this CSV")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    prices = load_prices(args.prices, args.column)
+    combos = grid(
+        short_window=args.short,
+        long_window=args.long,
+        rsi_period=args.rsi_period,
+        rsi_overbought=args.overbought,
+        rsi_oversold=args.oversold,
+        cooldown_ticks=args.cooldown,
+    )
+    if args.search == "random":
+        combos = random_sample(combos, args.samples)
+
+    print(f"Sweeping {len(combos)} combinations over {len(prices)} prices...")
+    start = time.perf_counter()
+    with SweepRunner(prices, workers=args.workers, checkpoint=args.checkpoint) as runner:
+        if args.search == "halving":
+            results = runner.successive_halving(combos, eta=args.eta)
+        else:
+            results = runner.run(combos)
+    elapsed = time.perf_counter() - start
+
+    print(format_table(results, args.top))
+    print(f"\n{len(results)} results in {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"📁 Results saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Append-only columnar tick store.
+
+Layout, one directory per symbol and UTC day:
+
+    <root>/<symbol>/<YYYY-MM-DD>/
+        ts_ns.i8          exchange trade time, int64 nanoseconds since the epoch
+        price.f8          float64
+        qty.f8            float64
+        trade_id.i8       int64
+        buyer_maker.u1    uint8 (1 if the buyer was the maker)
+        index.i8          sparse index: (ts_ns, row) int64 pairs every INDEX_STRIDE rows
+
+Columns are raw little-endian arrays, so readers map them straight into
+NumPy with np.memmap and never copy or parse anything.
+
+TickRecorder does the parsing and writing on a background thread; the
+streaming loop only pays for putting the raw message on a queue.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "ts_ns": ("ts_ns.i8", "q", np.int64),
+    "price": ("price.f8", "d", np.float64),
+    "qty": ("qty.f8", "d", np.float64),
+    "trade_id": ("trade_id.i8", "q", np.int64),
+    "buyer_maker": ("buyer_maker.u1", "B", np.uint8),
+}
+INDEX_FILE = "index.i8"
+INDEX_STRIDE = 4096
+
+
+def day_of(ts_ns):
+    """UTC day name (YYYY-MM-DD) for a nanosecond timestamp."""
+    return datetime.fromtimestamp(ts_ns // 1_000_000_000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+class _Segment:
+    """Open column files for one day, appended to by the recorder thread."""
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.files = {name: open(os.path.join(path, fname), "ab") for name, (fname, _, _) in COLUMNS.items()}
+        self.index = open(os.path.join(path, INDEX_FILE), "ab")
+        # Resume from the shortest column and drop any partial row a previous
+        # run left behind when it died mid-write
+        self.rows = min(
+            os.path.getsize(os.path.join(path, fname)) // array(code).itemsize
+            for fname, code, _ in COLUMNS.values()
+        )
+        for name, (_, code, _) in COLUMNS.items():
+            self.files[name].truncate(self.rows * array(code).itemsize)
+        self._truncate_index()
+
+    def _truncate_index(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        entries = array("q")
+        with open(index_path, "rb") as f:
+            entries.frombytes(f.read())
+        keep = 0
+        while keep + 1 < len(entries) and entries[keep + 1] < self.rows:
+            keep += 2
+        self.index.truncate(keep * entries.itemsize)
+
+    def write(self, columns):
+        ts = columns["ts_ns"]
+        entries = array("q")
+        first = self.rows
+        # Index every row whose number is a multiple of INDEX_STRIDE
+        row = first + (-first % INDEX_STRIDE)
+        while row < first + len(ts):
+            entries.append(ts[row - first])
+            entries.append(row)
+            row += INDEX_STRIDE
+
+        for name, data in columns.items():
+            data.tofile(self.files[name])
+        if entries:
+            entries.tofile(self.index)
+        self.rows += len(ts)
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+        self.index.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.index.close()
+
+
+class TickRecorder:
+    """
+    Persists every trade for one symbol into the tick store.
+
+    record() takes the raw Binance trade message and only enqueues it; parsing
+    the price/quantity strings and writing to disk happen on the recorder
+    thread, in batches of up to `batch_size` trades.
+    """
+
+    def __init__(self, root, symbol, batch_size=10000, flush_interval=1.0):
+        self.root = root
+        self.symbol = symbol.lower()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recorded = 0
+
+        self._queue = queue.SimpleQueue()
+        self._segments = {}
+        self._thread = threading.Thread(target=self._run, name=f"tick-recorder-{self.symbol}", daemon=True)
+        self._thread.start()
+
+    def record(self, msg):
+        """
+        Queue a Binance trade message: the dict with T, p, q, t, m, or the raw
+        message text (plain or combined-stream), which is parsed on the recorder thread.
+        """
+        self._queue.put(msg)
+
+    @property
+    def queue_depth(self):
+        """Trades queued but not yet written."""
+        return self._queue.qsize()
+
+    def close(self):
+        """Write everything still queued and close the segment files."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [] if first is None else [first]
+            stop = first is None
+            while len(batch) < self.batch_size:
+                try:
+                    msg = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if msg is None:
+                    stop = True
+                    break
+                batch.append(msg)
+
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Tick recorder failed to write %d trades", len(batch))
+
+            if stop:
+                for segment in self._segments.values():
+                    segment.close()
+                self._segments.clear()
+                return
+
+    def _write(self, batch):
+        by_day = {}
+        for msg in batch:
+            if not isinstance(msg, dict):
+                msg = json.loads(msg)
+                msg = msg.get("data", msg)
+            ts_ns = int(msg["T"]) * 1_000_000
+            day = day_of(ts_ns)
+            columns = by_day.get(day)
+            if columns is None:
+                columns = by_day[day] = {name: array(code) for name, (_, code, _) in COLUMNS.items()}
+            columns["ts_ns"].append(ts_ns)
+            columns["price"].append(float(msg["p"]))
+            columns["qty"].append(float(msg["q"]))
+            columns["trade_id"].append(int(msg["t"]))
+            columns["buyer_maker"].append(1 if msg["m"] else 0)
+
+        for day, columns in by_day.items():
+            segment = self._segments.get(day)
+            if segment is None:
+                # A new day has started; older segments will not be written again
+                for old in self._segments.values():
+                    old.close()
+                self._segments = {}
+                segment = self._segments[day] = _Segment(os.path.join(self.root, self.symbol, day))
+            segment.write(columns)
+            segment.flush()
+            self.recorded += len(columns["ts_ns"])
+
+
+class TickStore:
+    """Read-only, zero-copy access to recorded ticks for one symbol."""
+
+    def __init__(self, root, symbol):
+        self.path = os.path.join(root, symbol.lower())
+
+    def days(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(d for d in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, d)))
+
+    def load_day(self, day):
+        """
+        Map one day's columns as read-only NumPy arrays. All columns are
+        trimmed to the same length, so a row being written is never seen half done.
+        """
+        path = os.path.join(self.path, day)
+        maps = {}
+        for name, (fname, _, dtype) in COLUMNS.items():
+            file_path = os.path.join(path, fname)
+            size = os.path.getsize(file_path) // np.dtype(dtype).itemsize
+            maps[name] = np.memmap(file_path, dtype=dtype, mode="r", shape=(size,)) if size else np.empty(0, dtype)
+        rows = min(len(column) for column in maps.values())
+        return {name: column[:rows] for name, column in maps.items()}
+
+    def _index(self, day):
+        file_path = os.path.join(self.path, day, INDEX_FILE)
+        size = os.path.getsize(file_path) // 8 if os.path.exists(file_path) else 0
+        if size < 2:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.memmap(file_path, dtype=np.int64, mode="r", shape=(size // 2, 2))
+
+    def _row_range(self, day, columns, start_ns, end_ns):
+        """Rows of one day with start_ns <= ts < end_ns, using the sparse index to narrow the search."""
+        ts = columns["ts_ns"]
+        n = len(ts)
+        index = self._index(day)
+        index = index[index[:, 1] < n]
+
+        def locate(t):
+            if len(index) == 0:
+                return int(np.searchsorted(ts, t))
+            k = int(np.searchsorted(index[:, 0], t))
+            lo = int(index[k - 1, 1]) if k > 0 else 0
+            hi = int(index[k, 1]) + 1 if k < len(index) else n
+            return lo + int(np.searchsorted(ts[lo:hi], t))
+
+        return locate(start_ns), locate(end_ns)
+
+    def iter_range(self, start_ns, end_ns):
+        """Yield (day, columns) with zero-copy views for each day overlapping [start_ns, end_ns)."""
+        first_day = day_of(start_ns)
+        last_day = day_of(max(start_ns, end_ns - 1))
+        for day in self.days():
+            if day < first_day or day > last_day:
+                continue
+            columns = self.load_day(day)
+            lo, hi = self._row_range(day, columns, start_ns, end_ns)
+            if hi > lo:
+                yield day, {name: column[lo:hi] for name, column in columns.items()}
+
+    def tail(self, n, start_ns=0):
+        """
+        The newest n ticks with ts >= start_ns (fewer if there are fewer), oldest
+        first, as a dict of arrays. Only the days needed are mapped.
+        """
+        parts = []
+        first_day = day_of(start_ns)
+        for day in reversed(self.days()):
+            if n <= 0 or day < first_day:
+                break
+            columns = self.load_day(day)
+            lo, hi = self._row_range(day, columns, start_ns, 2**63 - 1)
+            lo = max(lo, hi - n)
+            if hi > lo:
+                parts.append({name: column[lo:hi] for name, column in columns.items()})
+                n -= hi - lo
+        parts.reverse()
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0, dtype)
+            for name, (_, _, dtype) in COLUMNS.items()
+        }
+
+    def query(self, start_ns, end_ns):
+        """
+        All ticks with start_ns <= ts < end_ns as a dict of arrays. A range inside
+        one day is returned as views of the mapped files; spanning days copies.
+        """
+        parts = [columns for _, columns in self.iter_range(start_ns, end_ns)]
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0, dtype)
+            for name, (_, _, dtype) in COLUMNS.items()
+        }